@@ -0,0 +1,330 @@
+# ==================== 进程内录取数据列式索引 ====================
+"""
+把 admission_records 的“窄列”常驻内存：整数列是 NumPy 数组，文本列做字典编码。
+/query、/analysis 用布尔掩码过滤，不再每个请求 q.all() 水合 ORM 对象。
+
+索引对象只读：管理员增删改时用 with_row()/without() 生成新索引再整体替换，
+正在处理的请求拿着旧对象也不会读到一半的数据。
+
+整数列里 0 表示空（页面和概率计算本来就把 None 当 0 / '' 处理）。
+
+多年数据按年份分区：partition(year) 给出只含这一年行的子索引（字典表共用），
+查询、概率、汇总都在分区里做，不再把几年的数据混在一起扫。
+近三年趋势（trends.py 导入时算好）用 with_trends() 挂成浮点列，NaN 表示没有。
+"""
+import copy
+from collections import namedtuple
+import numpy as np
+from ngram_index import NgramIndex
+from summaries import SummaryTable
+
+TEXT_FIELDS = ('year', 'batch', 'category', 'requirement', 'college_name', 'college_code',
+               'major_name', 'major_code', 'tuition', 'city')
+INT_FIELDS  = ('min_score', 'min_rank', 'avg_score', 'max_score')
+FIELDS      = ('id',) + TEXT_FIELDS + INT_FIELDS
+
+TREND_FIELDS = ('trend_years', 'rank_drift', 'score_volatility')
+TREND_KEY    = ('year', 'category', 'college_code', 'major_code')
+
+Row = namedtuple('Row', FIELDS)
+
+# 汇总表：按哪个字段分组 -> (代码字段, 城市字段)
+SUMMARY_SPECS = {'college_name': ('college_code', 'city'), 'major_name': ('major_code', None)}
+
+class StrColumn:
+    """字典编码的文本列：codes[i] 指向 values 里的字符串"""
+
+    def __init__(self, codes, values):
+        self.codes  = np.asarray(codes, dtype=np.int32)
+        self.values = list(values)
+        self.lookup = {v: i for i, v in enumerate(self.values)}
+        self._ngrams = [None]          # 子串倒排索引，按需构建；只换 codes 的副本共用同一份
+
+    @classmethod
+    def encode(cls, items):
+        lookup = {}
+        codes = np.fromiter((lookup.setdefault(v, len(lookup)) for v in items),
+                            dtype=np.int32, count=len(items))
+        return cls(codes, list(lookup))
+
+    def code_of(self, value):
+        """追加新值时用：返回 (code, 新 values)"""
+        code = self.lookup.get(value)
+        if code is None:
+            return len(self.values), self.values + [value]
+        return code, self.values
+
+    def equals(self, value, pos=None):
+        """== value 的掩码（给了 pos 就只算这些行）"""
+        codes = self.codes if pos is None else self.codes[pos]
+        code = self.lookup.get(value)
+        if code is None:
+            return np.zeros(len(codes), dtype=bool)
+        return codes == code
+
+    @property
+    def ngrams(self):
+        if self._ngrams[0] is None:
+            self._ngrams[0] = NgramIndex(self.values)
+        return self._ngrams[0]
+
+    def matching(self, needle):
+        """LIKE '%needle%' 命中的字典值（含未被任何行引用的旧值）"""
+        return [self.values[i] for i in self.ngrams.search(needle).tolist()]
+
+    def contains(self, needle, pos=None):
+        """LIKE '%needle%' 的掩码：倒排索引查出命中的 code，再按 code 展开"""
+        hit = np.zeros(len(self.values), dtype=bool)
+        hit[self.ngrams.search(needle)] = True
+        return hit[self.codes if pos is None else self.codes[pos]]
+
+
+class AdmissionIndex:
+    def __init__(self, ids, ints, texts, version=0, trends=None):
+        self.ids     = np.asarray(ids, dtype=np.int64)
+        self.ints    = ints            # 字段 -> int32 数组
+        self.texts   = texts           # 字段 -> StrColumn
+        self.version = version
+        self.trends  = trends or {}    # TREND_FIELDS -> float64 数组（NaN 为空）
+        self.year    = None            # 年份分区才有
+        self._by_avg = {}              # 科类 -> (按平均分排好的行位置, 对应平均分)，按需构建
+        self._summaries = {}           # 分组字段 -> SummaryTable，按需构建，改数据时增量更新
+        self._partitions = {}          # 年份 -> 分区索引，按需构建，改数据时增量更新
+        self._years  = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- 构建 ----------
+    @classmethod
+    def from_rows(cls, rows, version=0):
+        """rows: 按 FIELDS 顺序的元组（DB 查询结果），按 id 升序"""
+        cols = list(zip(*rows)) if rows else [()] * len(FIELDS)
+        data = dict(zip(FIELDS, cols))
+        ints  = {f: np.fromiter((v or 0 for v in data[f]), dtype=np.int32, count=len(data[f]))
+                 for f in INT_FIELDS}
+        texts = {f: StrColumn.encode([v or '' for v in data[f]]) for f in TEXT_FIELDS}
+        return cls(np.fromiter(data['id'], dtype=np.int64, count=len(data['id'])), ints, texts, version)
+
+    @classmethod
+    def from_snapshot(cls, snap, ids, version=0):
+        """直接用 snapshot.py 的列（导入后 ids 与快照行一一对应）"""
+        ints  = {f: np.where(snap.ints[f] < 0, 0, snap.ints[f]).astype(np.int32) for f in INT_FIELDS}
+        texts = {f: StrColumn(*snap.strs[f]) for f in TEXT_FIELDS}
+        return cls(ids, ints, texts, version)
+
+    # ---------- 年份分区 / 趋势 ----------
+    @property
+    def years(self):
+        """数据里出现的年份，按数值升序"""
+        if self._years is None:
+            col = self.texts['year']
+            self._years = sorted((col.values[c] for c in np.unique(col.codes).tolist() if col.values[c]),
+                                 key=_year_key)
+        return self._years
+
+    @property
+    def current_year(self):
+        return self.years[-1] if self.years else ''
+
+    def partition(self, year):
+        """只含 year 这一年的子索引（共用字典表），按需构建；有数据的年份才缓存，
+        不存在的年份每次给一个空分区，缓存不会随请求参数无限增长"""
+        part = self._partitions.get(year)
+        if part is None:
+            pos = np.flatnonzero(self.texts['year'].equals(year))
+            part = AdmissionIndex(self.ids[pos], {f: a[pos] for f, a in self.ints.items()},
+                                  {f: _with_codes(c, c.codes[pos]) for f, c in self.texts.items()},
+                                  self.version, {f: a[pos] for f, a in self.trends.items()})
+            part.year = year
+            if len(pos):
+                self._partitions[year] = part
+        return part
+
+    def warm(self):
+        """把按需构建的结构一次建好：各年份分区、汇总表、按平均分排序、子串索引。
+        gunicorn 预加载时在 fork 前调用，各 worker 直接共用（写时复制），不再各建一份"""
+        categories = [''] + [v for v in self.texts['category'].values if v]
+        for part in [self.partition(y) for y in self.years] or [self]:
+            for key in SUMMARY_SPECS:
+                part.summary(key)
+            for category in categories:
+                part.score_window(0, 0, category)
+        for field in ('college_name', 'major_name', 'requirement'):
+            self.texts[field].ngrams
+        return self
+
+    def with_trends(self, frame):
+        """挂上 programme_trends 表（trends.py 的输出）；已建好的分区一起换"""
+        new = copy.copy(self)
+        new.trends = _trend_arrays(self, frame)
+        new._partitions = {y: p.with_trends(frame) for y, p in self._partitions.items()}
+        return new
+
+    def _retag(self, version):
+        """数据没变、只换版本号的副本（缓存共用）"""
+        new = copy.copy(self)
+        new.version = version
+        new._partitions = {y: p._retag(version) for y, p in self._partitions.items()}
+        return new
+
+    def _carry_partitions(self, new, rid, row=None):
+        """把已建好的分区带到新索引：涉及的年份同样增量改，其余年份只换版本号"""
+        pos = int(np.searchsorted(self.ids, rid))
+        old_year = self.text('year', pos) if pos < len(self.ids) and self.ids[pos] == rid else None
+        new_year = (row.year or '') if row is not None else None
+        for year, part in self._partitions.items():
+            if year == new_year:
+                part = part.with_row(row, new.version)
+            elif year == old_year:
+                part = part.without(rid, new.version)
+            else:
+                part = part._retag(new.version)
+            new._partitions[year] = part
+
+    # ---------- 查询 ----------
+    def mask(self, college='', major='', category='', requirement='', pos=None):
+        """与原 SQL 过滤条件一致：college/major/requirement 子串匹配，category 精确匹配
+        给了 pos 就只对这些行求掩码"""
+        m = np.ones(len(self.ids) if pos is None else len(pos), dtype=bool)
+        if college:     m &= self.texts['college_name'].contains(college, pos)
+        if major:       m &= self.texts['major_name'].contains(major, pos)
+        if category:    m &= self.texts['category'].equals(category, pos)
+        if requirement: m &= self.texts['requirement'].contains(requirement, pos)
+        return m
+
+    def filter(self, **kw):
+        """满足条件的行位置（按 id 升序）"""
+        return np.flatnonzero(self.mask(**kw))
+
+    def scores(self, pos):
+        """(最低分, 平均分) 两列；没有平均分用最低分顶上（与原 r.avg_score or r.min_score 一致）"""
+        min_s, avg_s = self.ints['min_score'][pos], self.ints['avg_score'][pos]
+        return min_s, np.where(avg_s == 0, min_s, avg_s)
+
+    def score_window(self, lo, hi, category=''):
+        """平均分（空则最低分）落在 [lo, hi] 的行位置（按平均分升序）
+        每个科类预先按平均分排好序，区间用 searchsorted 二分，开销只和区间大小有关"""
+        if category not in self._by_avg:
+            pos = np.flatnonzero(self.texts['category'].equals(category)) if category \
+                else np.arange(len(self.ids))
+            avg = self.scores(pos)[1]
+            order = np.argsort(avg, kind='stable')
+            self._by_avg[category] = (pos[order], avg[order])
+        pos, avg = self._by_avg[category]
+        return pos[np.searchsorted(avg, lo, 'left'):np.searchsorted(avg, hi, 'right')]
+
+    def summary(self, key):
+        """院校（college_name）/ 专业（major_name）汇总表"""
+        if key not in self._summaries:
+            self._summaries[key] = SummaryTable.build(self, key, *SUMMARY_SPECS[key])
+        return self._summaries[key]
+
+    def matching(self, field, needle):
+        """field LIKE '%needle%' 命中的去重取值，给还走 SQL 的页面拼 IN 条件用"""
+        return self.texts[field].matching(needle)
+
+    def text(self, field, pos):
+        col = self.texts[field]
+        return np.asarray(col.values, dtype=object)[col.codes[pos]]
+
+    def column(self, field, pos):
+        """解码一列成 list；整数 0、趋势 NaN 还原成 None"""
+        if field == 'id':
+            return self.ids[pos].tolist()
+        if field in self.texts:
+            return self.text(field, pos).tolist()
+        if field in TREND_FIELDS:
+            arr = self.trends.get(field)
+            if arr is None:
+                return [None] * len(self.ids[pos])
+            cast = int if field == 'trend_years' else float
+            return [None if v != v else cast(v) for v in arr[pos].tolist()]
+        return [v or None for v in self.ints[field][pos].tolist()]
+
+    def rows(self, pos):
+        """把行位置解码成 Row"""
+        return [Row(*r) for r in zip(*(self.column(f, pos) for f in FIELDS))]
+
+    # ---------- 增量修改（返回新索引） ----------
+    def with_row(self, row, version=None):
+        """新增或覆盖一行；row 是带 FIELDS 属性的对象（如 AdmissionRecord）"""
+        rid = row.id
+        pos = int(np.searchsorted(self.ids, rid))
+        exists = pos < len(self.ids) and self.ids[pos] == rid
+
+        def put(arr, value):
+            if exists:
+                arr = arr.copy()
+                arr[pos] = value
+                return arr
+            return np.insert(arr, pos, value)
+
+        ids   = self.ids if exists else np.insert(self.ids, pos, rid)
+        ints  = {f: put(self.ints[f], getattr(row, f) or 0) for f in INT_FIELDS}
+        texts = {}
+        for f in TEXT_FIELDS:
+            col = self.texts[f]
+            code, values = col.code_of(getattr(row, f) or '')
+            codes = put(col.codes, code)
+            texts[f] = _with_codes(col, codes) if values is col.values else StrColumn(codes, values)
+        trends = {f: a if exists else np.insert(a, pos, np.nan) for f, a in self.trends.items()}
+        new = AdmissionIndex(ids, ints, texts, self.version if version is None else version, trends)
+        new.year = self.year
+        for key, tbl in self._summaries.items():
+            new._summaries[key] = tbl.patched(self, pos if exists else None, new, pos)
+        self._carry_partitions(new, rid, row)
+        return new
+
+    def without(self, rid, version=None):
+        """删掉一行"""
+        pos = int(np.searchsorted(self.ids, rid))
+        if pos >= len(self.ids) or self.ids[pos] != rid:
+            return self if version is None else self._retag(version)
+        ints  = {f: np.delete(self.ints[f], pos) for f in INT_FIELDS}
+        texts = {f: _with_codes(c, np.delete(c.codes, pos)) for f, c in self.texts.items()}
+        trends = {f: np.delete(a, pos) for f, a in self.trends.items()}
+        new = AdmissionIndex(np.delete(self.ids, pos), ints, texts,
+                             self.version if version is None else version, trends)
+        new.year = self.year
+        for key, tbl in self._summaries.items():
+            new._summaries[key] = tbl.patched(self, pos, new, None)
+        self._carry_partitions(new, rid)
+        return new
+
+
+# ---------- 稳定排序 + 游标分页 ----------
+def order_keys(prob, avg, ids):
+    """概率↓、平均分↓、id↑ 压成一个 int64，键越小越靠前；上一页最后一行的键就是游标"""
+    prob = np.clip(prob, 0, 127).astype(np.int64)
+    avg  = np.clip(avg, 0, 1023).astype(np.int64)
+    return ((127 - prob) << 42) | ((1023 - avg) << 32) | np.asarray(ids, dtype=np.int64)
+
+
+def page_after(keys, after=None, limit=None):
+    """键大于 after 的前 limit 个下标（按键升序）；只对候选做部分选择，不全排序"""
+    cand = np.arange(len(keys)) if after is None else np.flatnonzero(keys > after)
+    if limit is not None and len(cand) > limit:
+        cand = cand[np.argpartition(keys[cand], limit - 1)[:limit]]
+    return cand[np.argsort(keys[cand])]
+
+
+def _year_key(year):
+    return (int(year), year) if year.isdigit() else (-1, year)
+
+
+def _trend_arrays(index, frame):
+    """按 TREND_KEY 把趋势表对齐到索引的每一行；对不上的为 NaN"""
+    if frame is None or not len(frame):
+        return {}
+    lookup = {k: i for i, k in enumerate(frame[list(TREND_KEY)].itertuples(index=False, name=None))}
+    keys = zip(*(index.text(f, slice(None)).tolist() for f in TREND_KEY))
+    at = np.fromiter((lookup.get(k, -1) for k in keys), dtype=np.int64, count=len(index))
+    return {f: np.append(frame[f].to_numpy(dtype=np.float64), np.nan)[at] for f in TREND_FIELDS}
+
+
+def _with_codes(col, codes):
+    """共用字典表，只换 codes（不重建 lookup）"""
+    new = StrColumn.__new__(StrColumn)
+    new.codes, new.values, new.lookup, new._ngrams = codes, col.values, col.lookup, col._ngrams
+    return new
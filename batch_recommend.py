@@ -0,0 +1,187 @@
+# ==================== 整校批量推荐（进程池） ====================
+"""
+学校发来一份考生名单（CSV / Excel），给每个考生生成一张冲稳保垫志愿表，写进一个 CSV / XLSX：
+
+    python batch_recommend.py 学生.csv -o 推荐.xlsx [--workers 8] [--chunk 50] [--model rank]
+
+录取索引在主进程里只加载一次，再 fork 出进程池：子进程直接读继承来的 NumPy 数组
+（写时复制，只读就不会真的拷贝），不再各自查库。考生按块分给子进程，
+哪块先算完就先写哪块，进度里报“人/秒”。
+
+名单列（中英文都认，多余的列忽略）：学号/id、姓名/name、分数/score、科类/category、
+选科/subjects、位次/rank、城市/city、学费上限/tuition_max；每档个数见 planner.TIER_PARAMS。
+"""
+import os
+import sys
+import csv
+import time
+import argparse
+import multiprocessing as mp
+import pandas as pd
+
+# 名单列 -> 表头候选
+STUDENT_COLUMNS = {
+    'sid':         ['学号', '考号', 'id'],
+    'name':        ['姓名', 'name'],
+    'score':       ['分数', '高考分数', 'score'],
+    'rank':        ['位次', '全省位次', 'rank'],
+    'category':    ['科类', 'category'],
+    'subjects':    ['选科', '再选科目', 'subjects'],
+    'city':        ['城市', '意向城市', 'city'],
+    'tuition_max': ['学费上限', 'tuition_max'],
+}
+CATEGORY_MAP = {'物理': '物理类', '历史': '历史类'}
+
+OUTPUT_HEADER = ['学号', '姓名', '分数', '科类', '序号', '档位', '院校', '专业', '选科', '城市', '学费',
+                 '最低分', '最低位次', '平均分', '录取概率', '备注']
+
+CHUNK = 50                  # 每个任务的考生数
+
+# fork 前由主进程设置，子进程继承（只读）
+_idx = None
+_model = 'score'
+
+
+def read_students(path):
+    """读名单，统一成 STUDENT_COLUMNS 的键；空值为 ''"""
+    df = pd.read_excel(path, dtype=str) if path.lower().endswith(('.xlsx', '.xls')) \
+        else pd.read_csv(path, dtype=str, encoding='utf-8-sig')
+    df.columns = [str(c).strip() for c in df.columns]
+    out = pd.DataFrame(index=df.index)
+    for key, names in STUDENT_COLUMNS.items():
+        col = next((n for n in names if n in df.columns), None)
+        out[key] = df[col].fillna('').str.strip() if col else ''
+    out['category'] = out['category'].replace(CATEGORY_MAP)
+    # 其余列原样带上（如每档个数 chong/wen/bao/dian、per_college）
+    known = {n for names in STUDENT_COLUMNS.values() for n in names}
+    for c in df.columns:
+        if c not in known and c not in out.columns:
+            out[c] = df[c].fillna('').str.strip()
+    out['sid'] = [s or str(i + 1) for i, s in enumerate(out['sid'])]     # 没学号按行号编
+    return out.to_dict('records')
+
+
+def recommend_chunk(students):
+    """子进程里跑：一块考生 -> 输出行"""
+    from main import make_plan
+    rows = []
+    for s in students:
+        head = [s['sid'], s['name'], s['score'], s['category']]
+        args = dict(s, model=_model)
+        try:
+            pos, tiers, probs, rank = make_plan(_idx, args)
+        except ValueError as e:
+            rows.append(head + [''] * 11 + [str(e)])
+            continue
+        if not len(pos):
+            rows.append(head + [''] * 11 + ['没有符合条件的专业'])
+            continue
+        for i, (r, tier, p) in enumerate(zip(_idx.rows(pos), tiers, probs.tolist()), 1):
+            rows.append(head + [i, tier, r.college_name, r.major_name, r.requirement, r.city, r.tuition,
+                                r.min_score or '', r.min_rank or '', r.avg_score or '', p, ''])
+    return len(students), rows
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.f = open(path, 'w', newline='', encoding='utf-8-sig')   # 带 BOM，Excel 直接打开不乱码
+        self.w = csv.writer(self.f)
+        self.w.writerow(OUTPUT_HEADER)
+
+    def write(self, rows):
+        self.w.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+class XlsxSink:
+    """openpyxl 只写模式：行直接落盘，不在内存里攒整本工作簿"""
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+        self.path = path
+        self.wb = Workbook(write_only=True)
+        self.ws = self.wb.create_sheet('推荐')
+        self.ws.append(OUTPUT_HEADER)
+
+    def write(self, rows):
+        for r in rows:
+            self.ws.append(r)
+
+    def close(self):
+        self.wb.save(self.path)
+
+
+def open_sink(path):
+    return XlsxSink(path) if path.lower().endswith('.xlsx') else CsvSink(path)
+
+
+def print_progress(done, total, t0):
+    rate = done / max(time.perf_counter() - t0, 1e-9)
+    sys.stderr.write(f'\r推荐 {done}/{total}（{rate:.0f} 人/秒）')
+    if done >= total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+def run(students, out, workers=None, chunk=CHUNK, progress=None):
+    """students 分块并行推荐，边算边写 out；返回 (考生数, 输出行数)"""
+    chunks = [students[i:i + chunk] for i in range(0, len(students), chunk)]
+    sink = open_sink(out)
+    done = lines = 0
+    try:
+        if workers == 1:
+            results = map(recommend_chunk, chunks)
+            pool = None
+        else:
+            # fork：子进程共享主进程已加载的索引（写时复制）
+            pool = mp.get_context('fork').Pool(workers)
+            results = pool.imap_unordered(recommend_chunk, chunks)
+        for n, rows in results:
+            sink.write(rows)
+            done += n
+            lines += len(rows)
+            if progress:
+                progress(done, len(students))
+        if pool:
+            pool.close()
+            pool.join()
+    finally:
+        sink.close()
+    return done, lines
+
+
+# ==================== 命令行 ====================
+def main(argv=None):
+    global _idx, _model
+    ap = argparse.ArgumentParser(description='整校批量生成冲稳保垫志愿表')
+    ap.add_argument('students', help='考生名单 CSV / XLSX')
+    ap.add_argument('-o', '--output', default='推荐结果.csv', help='输出 .csv 或 .xlsx')
+    ap.add_argument('--workers', type=int, default=os.cpu_count(), help='进程数，1 表示不开进程池')
+    ap.add_argument('--chunk', type=int, default=CHUNK, help='每个任务的考生数')
+    ap.add_argument('--model', choices=('score', 'rank', 'trend'), default='score',
+                    help='只给分数时的分档方式：score 分差，rank / trend 按一分一段表换算位次')
+    ap.add_argument('--year', default=None, help='用哪一年的录取数据，默认最新一年')
+    ap.add_argument('--db', default=None, help='SQLite 文件，默认 /tmp/gaokao.db')
+    args = ap.parse_args(argv)
+
+    if args.db:
+        os.environ['GAOKAO_DB'] = args.db
+    import main as web
+
+    students = read_students(args.students)
+    with web.app.app_context():
+        _idx = web.year_index(args.year)
+    _model = args.model
+    if _model != 'score':
+        web.get_rank_table(_idx)              # fork 前建好一分一段表，子进程共用
+    t0 = time.perf_counter()
+    n, lines = run(students, args.output, args.workers, args.chunk,
+                   progress=lambda done, total: print_progress(done, total, t0))
+    elapsed = time.perf_counter() - t0
+    print(f'完成：{n} 名考生，{lines} 行，用时 {elapsed:.2f}s（{n / max(elapsed, 1e-9):.0f} 人/秒）-> {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,9 @@
+# ==================== 压测：合成数据 + 热点路由 ====================
+"""
+造不同规模的合成录取数据（synth.py），走正式导入路径入库，再对热点路由做压测（run.py），
+每个路由报 p50 / p95 / p99 延迟、吞吐和峰值 RSS，结果存 JSON，换提交后对比有没有变慢：
+
+    python -m bench run [--sizes 10000 100000 1000000] [--requests 200] [--routes query analysis ...]
+                        [--gunicorn --workers 2 --concurrency 8] [--cache] [-o 结果.json]
+    python -m bench compare 旧.json 新.json [--threshold 0.1]
+"""
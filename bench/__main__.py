@@ -0,0 +1,59 @@
+# ==================== 命令行 ====================
+import os
+import sys
+import json
+import argparse
+from bench import run as bench
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ['_dataset']:                 # 父进程为每个数据规模起的子进程
+        bench.run_dataset(json.loads(argv[1]))
+        return
+
+    ap = argparse.ArgumentParser(prog='python -m bench', description='合成数据压测')
+    sub = ap.add_subparsers(dest='cmd', required=True)
+    r = sub.add_parser('run', help='造数据、压测、写 JSON')
+    r.add_argument('--sizes', type=int, nargs='+', default=list(bench.SIZES), help='数据规模（行数）')
+    r.add_argument('--routes', nargs='+', choices=list(bench.ROUTES), default=list(bench.ROUTES))
+    r.add_argument('--requests', type=int, default=bench.REQUESTS, help='每个路由的请求数')
+    r.add_argument('--login-requests', type=int, default=bench.LOGIN_REQUESTS, help='登录的请求数（bcrypt 慢）')
+    r.add_argument('--gunicorn', action='store_true', help='起本机 gunicorn 走 HTTP 并发压测（默认 test client）')
+    r.add_argument('--workers', type=int, default=2, help='gunicorn worker 数')
+    r.add_argument('--concurrency', type=int, default=8, help='gunicorn 模式的并发请求数')
+    r.add_argument('--cache', action='store_true', help='保留页面缓存（默认关掉，测真实计算）')
+    r.add_argument('--years', type=int, default=3, help='合成数据的年份数')
+    r.add_argument('--seed', type=int, default=20250701)
+    r.add_argument('--keep-db', action='store_true', help='把生成的库留在仓库根目录 bench-<行数>.db')
+    r.add_argument('-o', '--output', default=None, help='结果 JSON，默认 bench/results/<提交号>-<模式>.json')
+    c = sub.add_parser('compare', help='对比两次结果')
+    c.add_argument('old')
+    c.add_argument('new')
+    c.add_argument('--threshold', type=float, default=0.10, help='变差超过这个比例算回退（退出码 1）')
+    args = ap.parse_args(argv)
+
+    if args.cmd == 'run':
+        report = bench.run(args.sizes, args.routes, args.requests, args.login_requests,
+                           'gunicorn' if args.gunicorn else 'client', args.workers, args.concurrency,
+                           args.cache, args.years, args.seed, args.keep_db)
+        out = args.output or bench.default_output(report)
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f'结果 -> {out}')
+    else:
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        print(f"{old['commit'][:10]} -> {new['commit'][:10]}")
+        lines, regressions = bench.compare(old, new, args.threshold)
+        print('\n'.join(lines))
+        for rows, route, metric, a, b in regressions:
+            print(f'回退：{rows} 行 {route} {metric} {a} -> {b}')
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
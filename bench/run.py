@@ -0,0 +1,334 @@
+# ---------- 压测驱动 ----------
+"""
+每个数据规模在单独的子进程里跑（main 在 import 时按 GAOKAO_DB 连库、建索引，一个进程只能对一个库）：
+
+1. synth.generate 造表 -> ingest.import_frame 入库 -> refresh_derived -> bump 版本号 -> 建内存索引，各步计时
+2. 按 ROUTES 逐个路由发请求：
+   - client（默认）：Flask test client，同进程顺序请求，测的是纯服务端耗时
+   - gunicorn：本机起 gunicorn main:app，多线程并发打 HTTP，测的是真实部署下的吞吐
+3. 每个路由记 p50 / p95 / p99 / 平均延迟、吞吐（请求/秒）、跑完该路由时的峰值 RSS
+
+结果写成 JSON（带 git 提交号），两次结果用 compare 对比。
+"""
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import resource
+import subprocess
+import tempfile
+import http.client
+from datetime import datetime
+from urllib.parse import quote, urlencode
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+SIZES    = (10000, 100000, 1000000)
+REQUESTS = 200             # 每个路由的请求数
+LOGIN_REQUESTS = 20        # 登录每次都要算 bcrypt，少发一些
+WARMUP   = 3               # 每个路由先发几次不计入（模板编译、一分一段表等首次开销）
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 路由名 -> 生成一个请求 (方法, 路径, 表单) 的函数；ctx 是从合成表里抽的院校 / 专业名
+ROUTES = {
+    'query':          lambda r, ctx: ('GET', '/query?' + urlencode(
+        {'score': _score(r), 'category': _category(r)})),
+    'query_filter':   lambda r, ctx: ('GET', '/query?' + urlencode(
+        {'score': _score(r), 'category': _category(r), 'college': _pick(r, ctx['cities']),
+         'major': _pick(r, ctx['majors'])[:2]})),
+    'analysis':       lambda r, ctx: ('GET', '/analysis?' + urlencode(
+        {'score': _score(r), 'category': _category(r)})),
+    'plan':           lambda r, ctx: ('GET', '/plan?' + urlencode(
+        {'score': _score(r), 'category': _category(r), 'subjects': '化生'})),
+    'colleges':       lambda r, ctx: ('GET', '/colleges'),
+    'colleges_search': lambda r, ctx: ('GET', '/colleges?' + urlencode({'search': _pick(r, ctx['cities'])})),
+    'majors':         lambda r, ctx: ('GET', '/majors'),
+    'college_detail': lambda r, ctx: ('GET', '/college/' + quote(_pick(r, ctx['colleges']))),
+    'major_detail':   lambda r, ctx: ('GET', '/major/' + quote(_pick(r, ctx['majors']))),
+    'api_query':      lambda r, ctx: ('GET', '/api/v1/query?' + urlencode(
+        {'score': _score(r), 'category': _category(r), 'format': 'columns'})),
+    'login':          lambda r, ctx: ('POST', '/login', {'username': 'user', 'password': '123456'}),
+}
+OK_STATUS = {200, 302}
+
+
+def _score(r):
+    return int(r.integers(430, 680))
+
+def _category(r):
+    return '物理类' if r.random() < 0.7 else '历史类'
+
+def _pick(r, items):
+    return items[int(r.integers(len(items)))]
+
+
+def git_commit():
+    """(提交号, 工作区是否有改动)；不在 git 仓库里返回 ('unknown', False)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit, bool(dirty)
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+
+
+def summarize(latencies, wall, errors, peak_rss_mb):
+    ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99]) if len(ms) else (0, 0, 0)
+    return {'n': len(ms), 'errors': errors, 'p50_ms': round(float(p50), 2), 'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2), 'mean_ms': round(float(ms.mean()), 2) if len(ms) else 0,
+            'rps': round(len(ms) / max(wall, 1e-9), 1), 'peak_rss_mb': round(peak_rss_mb, 1)}
+
+
+def self_peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024          # Linux 上单位是 KB
+
+
+# ---------- 驱动：Flask test client ----------
+class ClientDriver:
+    """同进程顺序请求；峰值 RSS 取本进程的高水位"""
+
+    def __init__(self, app):
+        self.app = app
+
+    def run(self, reqs):
+        client = self.app.test_client()          # 每个路由一个新客户端，登录的会话不串到别的路由
+        for req in reqs[:WARMUP]:
+            self._send(client, req)
+        latencies, errors = [], 0
+        t_start = time.perf_counter()
+        for req in reqs[WARMUP:]:
+            t0 = time.perf_counter()
+            status = self._send(client, req)
+            latencies.append(time.perf_counter() - t0)
+            errors += status not in OK_STATUS
+        return summarize(latencies, time.perf_counter() - t_start, errors, self_peak_rss_mb())
+
+    @staticmethod
+    def _send(client, req):
+        method, path, *form = req
+        resp = client.open(path, method=method, data=form[0] if form else None)
+        resp.get_data()                          # 流式响应要读完才算结束
+        status = resp.status_code
+        resp.close()
+        return status
+
+
+# ---------- 驱动：本机 gunicorn ----------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _process_tree(pid):
+    out, todo = [], [pid]
+    while todo:
+        p = todo.pop()
+        out.append(p)
+        try:
+            with open(f'/proc/{p}/task/{p}/children') as f:
+                todo.extend(int(c) for c in f.read().split())
+        except OSError:
+            pass
+    return out
+
+
+def _hwm_mb(pid):
+    """进程（含子进程）各自峰值 RSS 之和，读 /proc/<pid>/status 的 VmHWM"""
+    total = 0
+    for p in _process_tree(pid):
+        try:
+            with open(f'/proc/{p}/status') as f:
+                total += next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+        except (OSError, StopIteration):
+            pass
+    return total / 1024
+
+
+class GunicornDriver:
+    """起一个 gunicorn（仓库的 gunicorn.conf.py：预加载、gthread；环境变量沿用本进程的，指向同一个库），
+    concurrency 个线程并发请求。-b / -w 写在 -c 之后，覆盖配置文件里的端口和 worker 数"""
+
+    def __init__(self, workers=2, concurrency=8, extra_args=()):
+        self.port = _free_port()
+        self.concurrency = concurrency
+        t0 = time.perf_counter()
+        self.proc = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn.conf.py'),
+                                      'main:app', '-b', f'127.0.0.1:{self.port}',
+                                      '-w', str(workers), *extra_args], cwd=ROOT,
+                                     stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        while self._request(('GET', '/guide'), timeout=1) != 200:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f'gunicorn 启动失败（退出码 {self.proc.returncode}）')
+            if time.perf_counter() - t0 > 600:
+                raise RuntimeError('gunicorn 十分钟内没起来')
+            time.sleep(0.2)
+        self.startup_s = round(time.perf_counter() - t0, 2)
+
+    def _request(self, req, timeout=60):
+        method, path, *form = req
+        body = urlencode(form[0]) if form else None
+        headers = {'Content-Type': 'application/x-www-form-urlencoded'} if form else {}
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=timeout)
+        try:
+            conn.request(method, path, body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            return resp.status
+        except OSError:
+            return 0
+        finally:
+            conn.close()
+
+    def run(self, reqs):
+        for req in reqs[:WARMUP]:
+            self._request(req)
+
+        def timed(req):
+            t0 = time.perf_counter()
+            status = self._request(req)
+            return time.perf_counter() - t0, status
+
+        t_start = time.perf_counter()
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            got = list(pool.map(timed, reqs[WARMUP:]))
+        wall = time.perf_counter() - t_start
+        return summarize([t for t, _ in got], wall, sum(s not in OK_STATUS for _, s in got),
+                         _hwm_mb(self.proc.pid))
+
+    def close(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(30)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+
+
+# ---------- 子进程：一个数据规模 ----------
+def load_dataset(rows, years, seed):
+    """造表并走正式导入路径入库，返回 (main 模块, 合成表, 各步耗时)"""
+    from bench import synth
+    import ingest
+    timing = {}
+    t0 = time.perf_counter()
+    frame = synth.generate(rows, years=years, seed=seed)
+    timing['synth_s'] = time.perf_counter() - t0
+
+    import main as web
+    with web.app.app_context():
+        t0 = time.perf_counter()
+        ingest.import_frame(web.db.engine, web.admissions, frame,
+                            batch_size=web.app.config['IMPORT_BATCH_SIZE'], replace=True)
+        timing['import_s'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        web.refresh_derived()
+        web.data_version.bump()
+        timing['derived_s'] = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        web.get_index()
+        timing['index_s'] = time.perf_counter() - t0
+    timing = {k: round(v, 2) for k, v in timing.items()}
+    timing['rss_after_load_mb'] = round(self_peak_rss_mb(), 1)
+    return web, frame, timing
+
+
+def run_dataset(opts):
+    """子进程入口：opts 为父进程传来的参数，结果写到 opts['out']"""
+    db_file = opts['db']
+    os.environ.update(GAOKAO_DB=db_file, GAOKAO_AUTO_IMPORT='0',
+                      LOGIN_LIMIT_IP=str(10 ** 6), LOGIN_LIMIT_USER=str(10 ** 6))
+    if not opts['cache']:
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'          # 每次都真算，不测缓存命中
+    web, frame, timing = load_dataset(opts['rows'], opts['years'], opts['seed'])
+
+    latest = frame[frame['year'] == frame['year'].max()]
+    ctx = {'colleges': sorted(latest['college_name'].unique()), 'majors': sorted(latest['major_name'].unique()),
+           'cities': sorted(latest['city'].unique())}
+    rng = np.random.default_rng(opts['seed'])
+    if opts['mode'] == 'gunicorn':
+        driver = GunicornDriver(opts['workers'], opts['concurrency'])
+        timing['startup_s'] = driver.startup_s
+    else:
+        driver = ClientDriver(web.app)
+
+    routes = {}
+    try:
+        for name in opts['routes']:
+            n = (opts['login_requests'] if name == 'login' else opts['requests']) + WARMUP
+            reqs = [ROUTES[name](rng, ctx) for _ in range(n)]
+            routes[name] = driver.run(reqs)
+            _progress(f"  {opts['rows']:>9} 行 {name:<16} p50 {routes[name]['p50_ms']:>8.2f}ms  "
+                      f"p99 {routes[name]['p99_ms']:>8.2f}ms  {routes[name]['rps']:>8.1f} req/s")
+    finally:
+        if opts['mode'] == 'gunicorn':
+            driver.close()
+    result = {'rows': opts['rows'], 'colleges': len(ctx['colleges']), 'majors': len(ctx['majors']),
+              'load': timing, 'routes': routes}
+    with open(opts['out'], 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+def _progress(msg):
+    sys.stderr.write(msg + '\n')
+    sys.stderr.flush()
+
+
+# ---------- 父进程：逐个规模起子进程，汇总 ----------
+def run(sizes=SIZES, routes=tuple(ROUTES), requests=REQUESTS, login_requests=LOGIN_REQUESTS, mode='client',
+        workers=2, concurrency=8, cache=False, years=3, seed=20250701, keep_db=False):
+    commit, dirty = git_commit()
+    report = {'commit': commit, 'dirty': dirty, 'created': datetime.now().isoformat(timespec='seconds'),
+              'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+              'mode': mode, 'options': {'requests': requests, 'login_requests': login_requests, 'workers': workers,
+                                        'concurrency': concurrency, 'cache': cache, 'years': years, 'seed': seed},
+              'datasets': []}
+    with tempfile.TemporaryDirectory(prefix='gaokao-bench-') as tmp:
+        for rows in sizes:
+            opts = {'rows': rows, 'routes': list(routes), 'requests': requests, 'login_requests': login_requests,
+                    'mode': mode, 'workers': workers, 'concurrency': concurrency, 'cache': cache, 'years': years,
+                    'seed': seed, 'db': os.path.join(tmp, f'bench-{rows}.db'), 'out': os.path.join(tmp, f'{rows}.json')}
+            _progress(f'数据规模 {rows} 行 ...')
+            subprocess.run([sys.executable, '-m', 'bench', '_dataset', json.dumps(opts)], cwd=ROOT, check=True)
+            with open(opts['out'], encoding='utf-8') as f:
+                report['datasets'].append(json.load(f))
+            if keep_db:
+                os.replace(opts['db'], os.path.join(ROOT, f'bench-{rows}.db'))
+    return report
+
+
+def default_output(report):
+    name = report['commit'][:10] + ('-dirty' if report['dirty'] else '') + f"-{report['mode']}.json"
+    return os.path.join(RESULTS_DIR, name)
+
+
+# ---------- 对比两次结果 ----------
+COMPARE_METRICS = (('p50_ms', False), ('p95_ms', False), ('p99_ms', False), ('rps', True), ('peak_rss_mb', False))
+
+
+def compare(old, new, threshold=0.10):
+    """逐 (规模, 路由, 指标) 对比；返回 (表格行, 变差超过 threshold 的项)"""
+    lines, regressions = [], []
+    old_sets = {d['rows']: d for d in old['datasets']}
+    for d in new['datasets']:
+        base = old_sets.get(d['rows'])
+        if base is None:
+            continue
+        for route, m in d['routes'].items():
+            b = base['routes'].get(route)
+            if b is None:
+                continue
+            cells = []
+            for metric, higher_better in COMPARE_METRICS:
+                change = (m[metric] - b[metric]) / b[metric] if b[metric] else 0.0
+                worse = -change if higher_better else change
+                cells.append(f'{metric} {b[metric]:>9} -> {m[metric]:>9} ({change:+.0%})')
+                if worse > threshold:
+                    regressions.append((d['rows'], route, metric, b[metric], m[metric]))
+            lines.append(f"{d['rows']:>9} {route:<16} " + '  '.join(cells))
+    return lines, regressions
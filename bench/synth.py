@@ -0,0 +1,179 @@
+# ---------- 合成录取数据 ----------
+"""
+按真实数据的形状造一份任意行数的“清洗后”录取表（列同 ingest.RECORD_FIELDS），
+直接交给 ingest.import_frame 入库，走的就是正式导入路径。
+
+- 院校名 = 城市 + (修饰词) + 类型，院校层次决定整体分数段，城市 / 学费 / 标签跟着层次走
+- 专业按真实表里的出现频率（热门专业多）抽，每校每科类不重复；物理类专业多、历史类少
+- 多年份：同一专业逐年小幅漂移，近三年趋势、年份分区都有数据可算
+- 位次按分数走一分一段曲线（正态尾部），少量行故意缺分数 / 位次，覆盖空值路径
+
+同一个 seed 产出完全相同的表，不同提交之间的压测结果才可比。
+"""
+import math
+import numpy as np
+import pandas as pd
+from ingest import RECORD_FIELDS
+
+CITIES = ['北京', '上海', '天津', '重庆', '福州', '厦门', '泉州', '漳州', '莆田', '三明', '南平', '龙岩', '宁德',
+          '杭州', '宁波', '温州', '南京', '苏州', '无锡', '徐州', '合肥', '芜湖', '济南', '青岛', '烟台', '郑州',
+          '洛阳', '武汉', '宜昌', '长沙', '湘潭', '南昌', '赣州', '广州', '深圳', '汕头', '湛江', '南宁', '桂林',
+          '海口', '成都', '绵阳', '贵阳', '昆明', '西安', '兰州', '西宁', '银川', '乌鲁木齐', '拉萨', '太原',
+          '石家庄', '保定', '呼和浩特', '沈阳', '大连', '长春', '吉林', '哈尔滨', '齐齐哈尔']
+# 类型 -> 层次偏移（分）
+COLLEGE_TYPES = {
+    '大学': 10, '理工大学': 5, '师范大学': 0, '医科大学': 15, '财经大学': 8, '农林大学': -10, '工业大学': 3,
+    '科技大学': 0, '交通大学': 12, '外国语学院': -5, '学院': -25, '商学院': -20, '政法大学': 5, '中医药大学': 0,
+    '工程学院': -20, '职业技术大学': -45,
+}
+QUALIFIERS = ['', '海洋', '城市', '信息', '应用', '文理', '工商', '电子', '建筑', '航空', '石油', '传媒', '体育',
+              '轻工', '化工', '水利']
+# 专业 -> 相对频率（按专家版里的出现次数取整），热门程度也决定分数溢价
+MAJORS = {
+    '财务管理': 56, '国际经济与贸易': 54, '电子商务': 44, '金融学': 38, '英语': 37, '市场营销': 36, '会计学': 35,
+    '工商管理': 33, '法学': 32, '物流管理': 30, '商务英语': 28, '计算机科学与技术': 28, '电子信息工程': 28,
+    '日语': 27, '网络与新媒体': 27, '广告学': 25, '旅游管理': 25, '经济学': 24, '数据科学与大数据技术': 23,
+    '土木工程': 23, '汉语言文学': 22, '人力资源管理': 22, '国际商务': 22, '软件工程': 20, '电气工程及其自动化': 19,
+    '会展经济与管理': 19, '人工智能': 19, '工程管理': 19, '林学': 18, '风景园林': 17, '翻译': 17, '物联网工程': 17,
+    '通信工程': 17, '农学': 16, '机械设计制造及其自动化': 16, '投资学': 16, '环境工程': 16, '审计学': 15,
+    '光电信息科学与工程': 15, '金融工程': 15, '社会工作': 14, '建筑学': 14, '信息管理与信息系统': 14,
+    '行政管理': 13, '化学工程与工艺': 13, '城乡规划': 12, '供应链管理': 12, '动物科学': 12, '工程造价': 12,
+    '生物工程': 11, '食品科学与工程': 11, '工商管理类': 10, '新闻学': 10, '汉语国际教育': 10, '广播电视学': 10,
+    '知识产权': 10, '数字媒体技术': 10, '高分子材料与工程': 10, '材料科学与工程': 10, '网络空间安全': 10,
+    '临床医学': 9, '口腔医学': 5, '护理学': 9, '药学': 8, '中医学': 6, '预防医学': 5, '医学检验技术': 6,
+    '数学与应用数学': 9, '物理学': 7, '化学': 7, '生物科学': 7, '地理科学': 6, '历史学': 6, '思想政治教育': 6,
+    '小学教育': 8, '学前教育': 8, '心理学': 7, '统计学': 8, '自动化': 12, '车辆工程': 9, '微电子科学与工程': 8,
+    '集成电路设计与集成系统': 6, '智能制造工程': 8, '机器人工程': 6, '新能源科学与工程': 7, '应用化学': 8,
+    '水产养殖学': 4, '海洋科学': 4, '园林': 6, '园艺': 5, '茶学': 3, '哲学': 3, '社会学': 5, '税收学': 6,
+    '财政学': 6, '保险学': 5, '经济学类': 8, '外国语言文学类': 6, '计算机类': 9, '电子信息类': 8, '机械类': 7,
+}
+HOT_MAJORS = {'临床医学': 25, '口腔医学': 30, '计算机科学与技术': 15, '软件工程': 12, '人工智能': 12,
+              '电子信息工程': 10, '集成电路设计与集成系统': 14, '微电子科学与工程': 12, '法学': 8, '金融学': 8}
+HISTORY_SKIP = {'临床医学', '口腔医学', '药学', '预防医学', '医学检验技术', '物理学', '化学', '应用化学',
+                '车辆工程', '机械设计制造及其自动化', '微电子科学与工程', '集成电路设计与集成系统'}
+REQUIREMENTS = {'物理类': (['不限', '化', '化且生', '生', '地', '政'], [0.55, 0.39, 0.03, 0.015, 0.008, 0.007]),
+                '历史类': (['不限', '政', '地', '政且地', '生'], [0.82, 0.09, 0.06, 0.02, 0.01])}
+TUITIONS = {'public': (['5460', '5040', '4800', '5200', '6000', '6600'], [0.45, 0.15, 0.12, 0.1, 0.1, 0.08]),
+            'private': (['15000', '18000', '22000', '26840', '19800'], [0.3, 0.25, 0.2, 0.15, 0.1])}
+# 一分一段曲线：位次 = 考生数 × P(分数 > s)，正态近似
+RANK_CURVE = {'物理类': (170000, 470, 80), '历史类': (60000, 480, 75)}
+CATEGORY_SHARE = {'物理类': 1.0, '历史类': 0.4}     # 每校历史类专业数约为物理类的四成
+MEAN_MAJORS = 28                                  # 每校物理类专业数的均值
+
+
+def colleges(n, rng):
+    """n 所院校的 (名称, 城市, 类型)，名称不重复：先用简单的“城市+类型”，不够再加修饰词"""
+    out = []
+    for q in QUALIFIERS:
+        block = [(f'{c}{q}{t}', c, t) for c in CITIES for t in COLLEGE_TYPES]
+        rng.shuffle(block)
+        out.extend(block)
+        if len(out) >= n:
+            break
+    if len(out) < n:
+        raise ValueError(f'院校名不够用：最多 {len(out)} 所')
+    return [list(col) for col in zip(*out[:n])]
+
+
+def _ranks(category, scores):
+    total, mu, sigma = RANK_CURVE[category]
+    tail = np.array([0.5 * math.erfc((s - mu) / (sigma * math.sqrt(2))) for s in scores.tolist()])
+    return np.maximum(np.round(total * tail), 1).astype(np.int64)
+
+
+def programmes(n_colleges, rng):
+    """院校 × 科类 × 专业（与年份无关的部分），返回 DataFrame"""
+    names, cities, kinds = colleges(n_colleges, rng)
+    level = np.clip(rng.normal(520, 45, n_colleges) + [COLLEGE_TYPES[k] for k in kinds], 430, 670)
+    private = (level < 480) & (rng.random(n_colleges) < 0.5)
+    major_names = np.array(list(MAJORS))
+    weights = np.array(list(MAJORS.values()), dtype=np.float64)
+
+    parts = []
+    for category, share in CATEGORY_SHARE.items():
+        allowed = np.array([m not in HISTORY_SKIP for m in major_names]) if category == '历史类' \
+            else np.ones(len(major_names), dtype=bool)
+        p = np.where(allowed, weights, 0)
+        p /= p.sum()
+        counts = np.clip(rng.poisson(MEAN_MAJORS * share, n_colleges), 1, int(allowed.sum()))
+        college = np.repeat(np.arange(n_colleges), counts)
+        majors = np.concatenate([rng.choice(len(major_names), k, replace=False, p=p) for k in counts])
+        reqs, req_p = REQUIREMENTS[category]
+        parts.append(pd.DataFrame({
+            'college':     college,
+            'category':    category,
+            'major':       majors,
+            'major_code':  np.concatenate([np.arange(1, k + 1) for k in counts]),
+            'requirement': rng.choice(reqs, len(college), p=req_p),
+        }))
+    prog = pd.concat(parts, ignore_index=True)
+    c = prog['college'].to_numpy()
+    prog['college_name'] = np.array(names)[c]
+    prog['college_code'] = (1000 + c).astype(str)
+    prog['major_name'] = major_names[prog['major'].to_numpy()]
+    prog['major_code'] = prog['major_code'].map('{:02d}'.format)
+    hot = prog['major_name'].map(HOT_MAJORS).fillna(0).to_numpy()
+    prog['base'] = level[c] + hot + rng.normal(0, 10, len(prog))
+    prog['city'] = np.array(cities)[c]
+    pub, pub_p = TUITIONS['public']
+    pri, pri_p = TUITIONS['private']
+    fee = np.where(private, rng.choice(pri, n_colleges, p=pri_p), rng.choice(pub, n_colleges, p=pub_p))
+    prog['tuition'] = fee[c]
+    tags = np.select([level >= 620, level >= 580, level >= 540], ['985/211/双一流/国重点/保研资格',
+                     '211/双一流/保研资格', '省重点/保研资格'], '')
+    prog['college_info'] = np.where(private, '民办', tags)[c]
+    prog['major_info'] = np.where(rng.random(len(prog)) < 0.15, '(含：' + prog['major_name'] + '等)', '')
+    return prog
+
+
+def generate(rows, years=3, last_year=2025, seed=20250701):
+    """约 rows 行（按专业数取整后截断到正好 rows 行）的清洗后录取表"""
+    per_college = MEAN_MAJORS * sum(CATEGORY_SHARE.values())
+    n_colleges = max(int(math.ceil(rows / years / per_college * 1.05)), 10)
+    prog = programmes(n_colleges, np.random.default_rng(seed))
+    while len(prog) * years < rows:          # 泊松抽样偏少时多加几所
+        n_colleges = int(n_colleges * 1.1) + 1
+        prog = programmes(n_colleges, np.random.default_rng(seed))
+    rng = np.random.default_rng(seed + 1)
+
+    year_list = list(range(last_year - years + 1, last_year + 1))
+    shift = dict(zip(year_list, rng.normal(0, 6, years)))    # 每年整体难度
+    df = prog.loc[prog.index.repeat(years)].reset_index(drop=True)
+    df['year'] = np.tile(year_list, len(prog))
+    df = df.iloc[:rows].copy()
+    n = len(df)
+
+    min_score = np.round(df['base'].to_numpy() + df['year'].map(shift).to_numpy() + rng.normal(0, 5, n))
+    min_score = np.clip(min_score, 400, 700).astype(np.int64)
+    avg_score = np.minimum(min_score + rng.gamma(2.0, 2.0, n).round().astype(np.int64), 710)
+    max_score = np.minimum(avg_score + rng.gamma(2.0, 4.0, n).round().astype(np.int64), 720)
+    min_rank = np.zeros(n, dtype=np.int64)
+    for category in RANK_CURVE:
+        m = (df['category'] == category).to_numpy()
+        min_rank[m] = _ranks(category, min_score[m])
+
+    out = pd.DataFrame({
+        'year':         df['year'].astype(str),
+        'batch':        '本科批',
+        'category':     df['category'],
+        'requirement':  df['requirement'],
+        'college_name': df['college_name'],
+        'college_code': df['college_code'],
+        'college_info': df['college_info'],
+        'major_name':   df['major_name'],
+        'major_code':   df['major_code'],
+        'major_info':   df['major_info'],
+        'min_score':    pd.array(min_score, dtype='Int64'),
+        'min_rank':     pd.array(min_rank, dtype='Int64'),
+        'avg_score':    pd.array(avg_score, dtype='Int64'),
+        'max_score':    pd.array(max_score, dtype='Int64'),
+        'tuition':      df['tuition'],
+        'city':         df['city'],
+    })
+    # 真实表里约 2% 的行缺位次、0.5% 缺最低分（平均分照 ingest.normalize 用最低分顶上）
+    out.loc[rng.random(n) < 0.02, 'min_rank'] = pd.NA
+    out.loc[rng.random(n) < 0.005, ['min_score', 'avg_score']] = pd.NA
+    for f in ('year', 'batch', 'category', 'requirement', 'college_name', 'college_code', 'college_info',
+              'major_name', 'major_code', 'major_info', 'tuition', 'city'):
+        out[f] = out[f].astype('string')
+    return out[list(RECORD_FIELDS)].reset_index(drop=True)
@@ -0,0 +1,52 @@
+# ==================== 跨进程数据版本号 ====================
+"""
+录取数据每改一次（管理员增删改、批量导入）版本号 +1。
+
+版本号存在数据库旁边的小文件里，每次写入都 os.replace 成新文件，
+所以各 worker 只要 stat 一下就知道数据有没有变，不用碰 SQLite。
+"""
+import os
+import fcntl
+from contextlib import contextmanager
+
+
+@contextmanager
+def file_lock(path):
+    """独占文件锁（flock）：同一台机器上的多个进程依次执行 with 块，进程退出锁自动释放"""
+    with open(path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+class DataVersion:
+    def __init__(self, path):
+        self.path   = path
+        self._stamp = None
+        self._value = 0
+
+    def get(self):
+        """当前版本号（文件没变时只做一次 stat）"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        if stamp != self._stamp:
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    self._value = int(f.read().strip() or 0)
+            except (OSError, ValueError):
+                return self._value
+            self._stamp = stamp
+        return self._value
+
+    def bump(self):
+        """版本号 +1，返回 (旧值, 新值)；多进程同时 bump 也不会丢"""
+        with file_lock(self.path + '.lock'):
+            self._stamp = None
+            old = self.get()
+            tmp = f'{self.path}.{os.getpid()}.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(str(old + 1))
+            os.replace(tmp, self.path)
+        return old, old + 1
@@ -0,0 +1,171 @@
+# ==================== 院校 / 专业详情汇总（导入 / 改数据时预算） ====================
+"""
+院校详情页、专业详情页（及对应的 /api/v1/college、/api/v1/major）原来每次访问先 first_or_404()
+查一次库取基本信息，再把全部招生行拉出来，页面上也没有任何统计。
+
+这里按 (类型, 年份, 名称) 预先算好一个条目，写进 entity_details 表：
+
+- 基本信息：代码、城市（取出现最多的，并列取最小）、院校标签 / 专业简介（第一条非空）
+- 招生专业（开设院校）数，及各科类的个数
+- 最低分 / 平均分 / 最高分、最低位次的范围
+- 最低分分布直方图（每 HIST_STEP 分一档），详情页画柱状图用
+
+导入、后台上传后整表重算；管理员改一行只重算涉及的那一两个院校 / 专业。
+请求里不查库：DetailStore 按数据版本号整表读进内存，详情页和 API 都从这里取。
+"""
+import json
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+KINDS = {  # 类型 -> (名称字段, 代码字段, 城市字段, 长文本字段)
+    'college': ('college_name', 'college_code', 'city', 'college_info'),
+    'major':   ('major_name', 'major_code', None, 'major_info'),
+}
+HIST_STEP = 10
+SOURCE = ('id', 'year', 'category', 'college_name', 'college_code', 'city', 'college_info',
+          'major_name', 'major_code', 'major_info', 'min_score', 'avg_score', 'max_score', 'min_rank')
+COLUMNS = ('kind', 'year', 'name', 'code', 'city', 'info', 'programmes', 'by_category', 'min_score',
+           'avg_score', 'max_score', 'min_rank', 'max_rank', 'histogram')
+
+Detail = namedtuple('Detail', COLUMNS)
+
+
+def _first_per_group(df, col, order):
+    """每组（gid）col 的取值：order='mode' 出现最多（并列取最小），'first' 按 id 第一个非空"""
+    sub = df.loc[df[col] != '', ['gid', col]] if order == 'first' else df[['gid', col]]
+    if order == 'mode':
+        sub = sub.value_counts().rename('n').reset_index().sort_values(['gid', 'n', col],
+                                                                       ascending=[True, False, True])
+    return sub.drop_duplicates('gid').set_index('gid')[col]
+
+
+def _per_group_json(df, col):
+    """每组（gid）{col 取值: 行数} 或 [[分档, 行数], ...] 的 JSON"""
+    counts = df.groupby(['gid', col], sort=True).size()
+    out = {}
+    for (key, value), n in zip(counts.index.tolist(), counts.tolist()):
+        out.setdefault(key, []).append((value, n))
+    as_list = pd.api.types.is_numeric_dtype(df[col])
+    return pd.Series({k: json.dumps([list(p) for p in v] if as_list else dict(v), ensure_ascii=False)
+                      for k, v in out.items()}, dtype=object)
+
+
+def compute(frame):
+    """frame：SOURCE 各列（文本空值为 ''，分数 / 位次空值为 0 或 NaN），按 id 升序"""
+    df = frame.copy()
+    for f in ('min_score', 'avg_score', 'max_score', 'min_rank'):
+        df[f] = pd.to_numeric(df[f], errors='coerce').fillna(0).astype(np.int64)
+    # 与汇总表（summaries.py）口径一致：没有平均分用最低分，没有最高分用平均分 / 最低分
+    df['avg'] = df['avg_score'].where(df['avg_score'] > 0, df['min_score'])
+    df['high'] = df['max_score'].where(df['max_score'] > 0, df['avg'])
+    df['bin'] = df['min_score'] // HIST_STEP * HIST_STEP
+
+    parts = []
+    for kind, (name_f, code_f, city_f, info_f) in KINDS.items():
+        sub = df[df[name_f] != '']
+        if not len(sub):
+            continue
+        # (年份, 名称) 只分组编码一次，后面都按整数组号聚合
+        g = sub.groupby(['year', name_f], sort=True)
+        sub = sub.assign(gid=g.ngroup().to_numpy())
+        size = g.size()
+        scored = sub[sub['min_score'] > 0]
+        ranked = sub[sub['min_rank'] > 0]
+        out = pd.DataFrame({'year': size.index.get_level_values(0), 'name': size.index.get_level_values(1),
+                            'programmes': size.to_numpy()})
+        out['code'] = _first_per_group(sub, code_f, 'mode')
+        out['city'] = _first_per_group(sub, city_f, 'mode') if city_f else ''
+        out['info'] = _first_per_group(sub, info_f, 'first')
+        out['by_category'] = _per_group_json(sub[sub['category'] != ''], 'category')
+        out['min_score'] = scored.groupby('gid')['min_score'].min()
+        out['avg_score'] = sub[sub['avg'] > 0].groupby('gid')['avg'].mean().round(1)
+        out['max_score'] = sub[sub['high'] > 0].groupby('gid')['high'].max()
+        out['min_rank'] = ranked.groupby('gid')['min_rank'].min()
+        out['max_rank'] = ranked.groupby('gid')['min_rank'].max()
+        out['histogram'] = _per_group_json(scored, 'bin')
+        out['kind'] = kind
+        parts.append(out)
+    if not parts:
+        return pd.DataFrame(columns=list(COLUMNS))
+    out = pd.concat(parts, ignore_index=True)
+    for f in ('code', 'city', 'info'):
+        out[f] = out[f].fillna('')
+    for f in ('min_score', 'max_score', 'min_rank', 'max_rank'):
+        out[f] = out[f].astype('Int64')
+    out['by_category'] = out['by_category'].fillna('{}')
+    out['histogram'] = out['histogram'].fillna('[]')
+    return out[list(COLUMNS)]
+
+
+def _source(conn, records, where=None):
+    stmt = select(*(records.c[f] for f in SOURCE)).order_by(records.c.id)
+    if where is not None:
+        stmt = stmt.where(where)
+    frame = pd.DataFrame(conn.execute(stmt).all(), columns=list(SOURCE))
+    for f in SOURCE[1:10]:
+        frame[f] = frame[f].fillna('')
+    return frame
+
+
+def rebuild(engine, records, table, colleges=None, majors=None):
+    """重算 entity_details（一个事务），返回写入的条目数。
+    colleges / majors 都为 None 时整表重算；否则只重算这些院校 / 专业（管理员改一行时用）"""
+    with engine.begin() as conn:
+        if colleges is None and majors is None:
+            out = compute(_source(conn, records))
+            conn.execute(table.delete())
+        else:
+            names = {'college': {n for n in colleges or () if n}, 'major': {n for n in majors or () if n}}
+            parts = []
+            for kind, picked in names.items():
+                if not picked:
+                    continue
+                name_f = KINDS[kind][0]
+                conn.execute(table.delete().where(table.c.kind == kind, table.c.name.in_(picked)))
+                got = compute(_source(conn, records, records.c[name_f].in_(picked)))
+                parts.append(got[got['kind'] == kind])
+            out = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=list(COLUMNS))
+        if len(out):
+            obj = out.astype(object).where(out.notna(), None)
+            conn.execute(table.insert(), [dict(zip(COLUMNS, r)) for r in obj.itertuples(index=False, name=None)])
+    return len(out)
+
+
+class DetailStore:
+    """entity_details 整表常驻内存：(类型, 名称) -> {年份: Detail}"""
+
+    def __init__(self, details):
+        self._by_name = {}
+        for d in details:
+            self._by_name.setdefault((d.kind, d.name), {})[d.year] = d
+
+    @classmethod
+    def load(cls, engine, table):
+        with engine.connect() as conn:
+            rows = conn.execute(select(*(table.c[f] for f in COLUMNS))).all()
+        return cls(Detail(*r[:7], json.loads(r[7] or '{}'), *r[8:13], json.loads(r[13] or '[]')) for r in rows)
+
+    def get(self, kind, name, year):
+        """某一年的条目，没有返回 None"""
+        return self._by_name.get((kind, name), {}).get(year)
+
+    def latest(self, kind, name):
+        """有数据的最近一年的条目（页面在当年没有招生时展示基本信息用）"""
+        years = self._by_name.get((kind, name))
+        if not years:
+            return None
+        return years[max(years, key=lambda y: (len(y), y))]
+
+    def __len__(self):
+        return sum(len(v) for v in self._by_name.values())
+
+
+def histogram_series(hist, step=HIST_STEP):
+    """[[分档, 个数], ...] -> 补齐空档后的 (标签列表, 个数列表)，给详情页的柱状图用"""
+    if not hist:
+        return [], []
+    counts = {int(b): int(n) for b, n in hist}
+    bins = range(min(counts), max(counts) + step, step)
+    return [f'{b}-{b + step - 1}' for b in bins], [counts.get(b, 0) for b in bins]
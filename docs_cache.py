@@ -0,0 +1,84 @@
+# ==================== 填报指南 / 志愿技巧：预渲染 + 预压缩 ====================
+"""
+/guide、/skill 是截止日前访问量最大的页面。文档只在文件 mtime 变化时重读，
+整页按角色（未登录 / 考生 / 管理员）预渲染一次，同时存好 gzip（装了 brotli 再存一份 br），
+请求时按 Accept-Encoding 挑一份直接返回，带强 ETag，命中 If-None-Match 回 304。
+导航栏里的用户名不进预渲染的页面（由页面脚本从 /whoami 取来填上），
+所以同一角色的所有人共用同一份压缩好的字节，新用户登录不会再触发一次渲染 + 压缩。
+"""
+import os
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+from flask import Response
+
+try:
+    import brotli
+except ImportError:                 # brotli 是可选依赖
+    brotli = None
+
+MAX_VARIANTS = 16                   # 每个文档最多缓存多少种变体（按角色分，实际只有两三种）
+
+
+class RenderedPage:
+    """一份整页的各种编码"""
+
+    def __init__(self, html):
+        raw = html.encode('utf-8')
+        self.bodies = {'identity': raw, 'gzip': gzip.compress(raw, 9)}
+        if brotli is not None:
+            self.bodies['br'] = brotli.compress(raw, quality=11)
+        self.etag = hashlib.sha256(raw).hexdigest()[:32]
+
+    def response(self, request):
+        accepted = request.accept_encodings
+        encoding = next((e for e in ('br', 'gzip') if e in self.bodies and accepted[e]), 'identity')
+        etag = self.etag if encoding == 'identity' else f'{self.etag}-{encoding}'
+        headers = {'ETag': f'"{etag}"', 'Vary': 'Accept-Encoding, Cookie', 'Cache-Control': 'private, no-cache'}
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers=headers)
+        if encoding != 'identity':
+            headers['Content-Encoding'] = encoding
+        return Response(self.bodies[encoding], mimetype='text/html', headers=headers)
+
+
+class StaticDoc:
+    def __init__(self, path, render):
+        self.path     = path
+        self.render   = render          # render(文档文本, 角色) -> 整页 HTML
+        self._mtime   = None
+        self._text    = None
+        self._pages   = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def _load(self):
+        """文件没变就什么都不做；变了就重读并清掉已渲染的页面；文件不存在返回 False"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime != self._mtime:
+            with open(self.path, encoding='utf-8') as f:
+                text = f.read()
+            with self._lock:
+                self._text, self._mtime = text, mtime
+                self._pages.clear()
+        return True
+
+    def page(self, variant):
+        """variant：导航栏状态（角色）；文件不存在返回 None"""
+        if not self._load():
+            return None
+        with self._lock:
+            page = self._pages.get(variant)
+            if page is not None:
+                self._pages.move_to_end(variant)
+                return page
+            text = self._text
+        page = RenderedPage(self.render(text, variant))
+        with self._lock:
+            self._pages[variant] = page
+            while len(self._pages) > MAX_VARIANTS:
+                self._pages.popitem(last=False)
+        return page
@@ -0,0 +1,89 @@
+# ==================== 院校 / 专业实体表（去重文本 + 整数外键） ====================
+"""
+admission_records 原来一个招生专业一行，院校代码、城市、院校信息、专业代码、专业信息
+这些描述文本每行（每年）都重复一遍，库文件、页缓存和每次整表扫描都跟着变大。
+
+现在拆成三张表：
+
+- colleges（名称, 代码, 城市, 院校信息）、majors（名称, 代码, 专业信息）：每种取值组合只存一行，
+  唯一索引去重；一个院校的几百个招生专业共用同一行
+- admission_records 只留年份、批次、科类、选科、分数、位次、学费这些窄列，外加 college_id / major_id
+
+写：导入、后台上传仍按原来的宽表字段给数据，narrow() 先把取值组合对到实体 id（没有的新建）再写窄表。
+读：wide 把三张表 join 成与原来同名的列（子查询），索引、趋势、详情汇总、导出照旧按列名取；
+SQLite 会把子查询展开，只取窄列时不碰实体表的长文本。
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+# 宽表字段 -> 实体表字段
+COLLEGE = {'college_name': 'name', 'college_code': 'code', 'city': 'city', 'college_info': 'info'}
+MAJOR   = {'major_name': 'name', 'major_code': 'code', 'major_info': 'info'}
+FOREIGN_KEYS = {'college_id': COLLEGE, 'major_id': MAJOR}
+LOOKUP_BY_NAME = 1000       # 一批数据里的名称不超过这么多时只查这些名称的实体，否则整表读
+
+
+def _key_frame(frame, fields):
+    """实体字段取值（空值统一成 ''，与实体表的 NOT NULL DEFAULT '' 对齐）"""
+    return pd.DataFrame({f: frame[f].astype(object).where(frame[f].notna(), '').astype(str) for f in fields})
+
+
+class AdmissionTables:
+    """admission_records + colleges + majors 三张表（SQLAlchemy Core Table）"""
+
+    def __init__(self, records, colleges, majors):
+        self.records  = records
+        self.colleges = colleges
+        self.majors   = majors
+        self._wide    = None
+
+    def _entities(self):
+        return (('college_id', self.colleges, COLLEGE), ('major_id', self.majors, MAJOR))
+
+    @property
+    def wide(self):
+        """与原宽表同名的列：id、窄列、各实体字段"""
+        if self._wide is None:
+            r = self.records
+            cols = [c for c in r.c if c.name not in FOREIGN_KEYS]
+            src = r
+            for fk, table, fields in self._entities():
+                cols += [table.c[attr].label(f) for f, attr in fields.items()]
+                src = src.join(table, table.c.id == r.c[fk])
+            self._wide = select(*cols).select_from(src).subquery('admission_wide')
+        return self._wide
+
+    def lookup(self, conn, table, fields, names=None):
+        """实体表：{(名称, 代码, ...): id}；给了 names 只取这些名称的（走唯一索引的名称前缀）"""
+        stmt = select(table.c.id, *(table.c[a] for a in fields.values()))
+        if names is not None:
+            stmt = stmt.where(table.c.name.in_(names))
+        return {tuple(row[1:]): row[0] for row in conn.execute(stmt)}
+
+    def entity_ids(self, conn, table, fields, frame):
+        """frame 每行对应的实体 id；库里没有的取值组合先插入"""
+        keys = pd.MultiIndex.from_frame(_key_frame(frame, fields))
+        codes, uniques = pd.factorize(keys)
+        names = sorted({k[0] for k in uniques})
+        names = names if len(names) <= LOOKUP_BY_NAME else None
+        known = self.lookup(conn, table, fields, names)
+        missing = [k for k in uniques if k not in known]
+        if missing:
+            conn.execute(table.insert(), [dict(zip(fields.values(), k)) for k in missing])
+            known = self.lookup(conn, table, fields, names)
+        return np.asarray([known[k] for k in uniques], dtype=np.int64)[codes]
+
+    def narrow(self, conn, frame):
+        """宽表（ingest.normalize 的输出，可带 id）-> 写 admission_records 用的窄表"""
+        out = frame.drop(columns=[f for fields in FOREIGN_KEYS.values() for f in fields])
+        for fk, table, fields in self._entities():
+            out[fk] = self.entity_ids(conn, table, fields, frame) if len(frame) else pd.Series(dtype='int64')
+        return out
+
+    def prune(self, conn):
+        """删掉已没有招生行引用的院校 / 专业（改名、删行、覆盖导入之后）"""
+        n = 0
+        for fk, table, _ in self._entities():
+            n += conn.execute(table.delete().where(table.c.id.not_in(select(self.records.c[fk])))).rowcount
+        return n
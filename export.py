@@ -0,0 +1,113 @@
+# ==================== 导出 CSV / Excel（分块读库 + 流式下载） ====================
+"""
+/query/export、/plan/export 把当前条件下的全部结果（含现算的录取概率）导出成 CSV 或 XLSX，
+不再从页面表格手工复制。
+
+行的命中和排序照常在录取索引上算（只是几列 NumPy 数组）；完整的招生记录按 id 每 CHUNK 行
+查一次库，写完一块再查下一块，进程里同时只有一块行对象。响应不带 Content-Length，
+由 WSGI 服务器按块（chunked）发出去：
+
+- CSV：每块编码成字节直接发出，首块带 BOM，Excel 打开中文不乱码。
+- XLSX：openpyxl 只写模式，行直接落进临时文件，不建单元格对象；
+  xlsx 是 zip，要等整本写完才能发，所以先写到 TemporaryFile，再按 BLOCK 字节分块读出来发。
+"""
+import io
+import csv
+import tempfile
+from urllib.parse import quote
+from sqlalchemy import select
+
+CHUNK = 500                 # 每次查库的行数（SQLite 单条语句的参数个数有上限）
+BLOCK = 64 * 1024           # XLSX 临时文件每次读出发送的字节数
+
+# 招生记录字段 -> 表头（顺序即导出列顺序）
+FIELDS = {
+    'year':         '年份',
+    'batch':        '批次',
+    'category':     '科类',
+    'requirement':  '选科要求',
+    'college_name': '院校名称',
+    'college_code': '院校代码',
+    'college_info': '院校基础信息',
+    'major_name':   '专业名称',
+    'major_code':   '专业代码',
+    'major_info':   '专业基础信息',
+    'min_score':    '最低分',
+    'min_rank':     '最低位次',
+    'avg_score':    '平均分',
+    'max_score':    '最高分',
+    'tuition':      '学费',
+    'city':         '城市',
+}
+
+FORMATS = {
+    'csv':  'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _tolist(col):
+    """NumPy 切片转成 Python 数值（openpyxl / csv 都按内置类型写）"""
+    return col.tolist() if hasattr(col, 'tolist') else list(col)
+
+
+def iter_rows(engine, table, ids, lead=(), tail=()):
+    """按 ids 的顺序逐行产出 (*lead, *记录字段, *tail)。
+    lead / tail 是与 ids 等长的若干列（如序号、档位、概率）；导出途中被删掉的行跳过"""
+    cols = [table.c[f] for f in FIELDS]
+    with engine.connect() as conn:
+        for i in range(0, len(ids), CHUNK):
+            chunk = [int(x) for x in ids[i:i + CHUNK]]
+            got = {r[0]: r[1:] for r in conn.execute(select(table.c.id, *cols).where(table.c.id.in_(chunk)))}
+            heads = [_tolist(c[i:i + CHUNK]) for c in lead]
+            tails = [_tolist(c[i:i + CHUNK]) for c in tail]
+            for j, rid in enumerate(chunk):
+                rec = got.get(rid)
+                if rec is not None:
+                    yield (*(c[j] for c in heads), *rec, *(c[j] for c in tails))
+
+
+def csv_stream(header, rows):
+    """每 CHUNK 行编码一次发出；首块带 BOM"""
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    buf.write('\ufeff')
+    w.writerow(header)
+    for n, row in enumerate(rows, 1):
+        w.writerow(['' if v is None else v for v in row])
+        if n % CHUNK == 0:
+            yield buf.getvalue().encode('utf-8')
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode('utf-8')
+
+
+def xlsx_stream(header, rows, sheet='导出'):
+    """openpyxl 只写模式写进临时文件，写完再分块读出"""
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+    clean = lambda v: ILLEGAL_CHARACTERS_RE.sub('', v) if isinstance(v, str) else v   # 控制字符 openpyxl 不收
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet)
+    ws.append(header)
+    for row in rows:
+        ws.append([clean(v) for v in row])
+    with tempfile.TemporaryFile() as f:
+        wb.save(f)
+        f.seek(0)
+        while True:
+            block = f.read(BLOCK)
+            if not block:
+                break
+            yield block
+
+
+def stream(fmt, header, rows, sheet='导出'):
+    """fmt 为 FORMATS 的键：返回逐块产出字节的生成器"""
+    return xlsx_stream(header, rows, sheet) if fmt == 'xlsx' else csv_stream(header, rows)
+
+
+def attachment(filename):
+    """Content-Disposition：中文文件名按 RFC 5987 编码，另给一个 ASCII 兜底名"""
+    ext = filename.rsplit('.', 1)[-1]
+    return f"attachment; filename=\"export.{ext}\"; filename*=UTF-8''{quote(filename)}"
@@ -0,0 +1,36 @@
+# ==================== gunicorn 配置：预加载，初始化只做一次 ====================
+"""
+    gunicorn -c gunicorn.conf.py main:app
+
+preload_app：master 先 import main（建表、迁移、空库导入都在 main.INIT_LOCK 文件锁里，只做一次），
+再把录取索引、各年份分区、汇总表、一分一段表全部建好，然后才 fork worker。
+NumPy 数组和字典表在 fork 后是写时复制的共享页，加 worker 不再按倍数涨内存和启动时间；
+gc.freeze() 把这些对象移出 GC 扫描范围，免得垃圾回收改写对象头把共享页逐个复制出来。
+
+数据改了（版本号变化）之后各 worker 仍按原来的方式各自重建索引，那一份就是 worker 私有的了。
+
+gthread：每个 worker 开 threads 个请求线程。登录时请求线程把 bcrypt 交给 hashing.Hasher 的线程池后
+阻塞在 future.result() 上；同步 worker 只有这一个线程，整个进程就停住了，线程池和排队上限都形同虚设。
+多线程 worker 里其他请求照常处理，登录多了先排队，排不上再 503。
+"""
+import gc
+import os
+
+bind        = f"0.0.0.0:{os.getenv('PORT', 5000)}"
+workers     = int(os.getenv('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1) + 1))
+worker_class = 'gthread'
+threads     = int(os.getenv('GUNICORN_THREADS', 4))
+preload_app = True
+
+
+def when_ready(server):
+    """app 已在 master 里加载完、还没 fork 任何 worker"""
+    import main
+    main.before_fork()
+    gc.collect()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    import main
+    main.after_fork()
@@ -0,0 +1,108 @@
+# ==================== 密码哈希：有界线程池 + 限流 ====================
+"""
+出分当天上万考生同时登录，每次 bcrypt 都要占满一个 CPU 几百毫秒。原来在请求线程里直接算，
+登录一多，/query 就抢不到 CPU。
+
+- Hasher：专用线程池（bcrypt 计算时释放 GIL）。同时在算 + 排队的总数有上限，
+  等不到名额就抛 HashBusy，路由回 503 + Retry-After，不让登录请求无限堆积
+- 工作因子 BCRYPT_ROUNDS 可配；登录成功时发现库里的哈希用的是旧因子，顺手按新因子重算（rehash-on-login）
+- RateLimiter：按 IP、按用户名的滑动窗口计数，撞库请求在算哈希之前就被挡掉，不占哈希名额。
+  计数在进程内存里，每个 worker 各一份：gunicorn -w N 时同一 IP / 用户名实际最多能试 N 倍的次数
+  （请求落到哪个 worker 由内核分配），配置 LOGIN_LIMIT_* 时按 worker 数折算
+
+线程池只有在多线程 worker 下才起作用（gunicorn.conf.py 用 gthread）：同步 worker 的唯一线程
+阻塞在 future.result() 上，算哈希期间整个进程不接别的请求，也就不会有排队和 503。
+"""
+import os
+import time
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+HASH_WORKERS  = int(os.getenv('HASH_WORKERS', min(4, os.cpu_count() or 1)))
+HASH_QUEUE    = int(os.getenv('HASH_QUEUE', 16))       # 最多排队多少个
+HASH_WAIT     = float(os.getenv('HASH_WAIT', 2))       # 秒；排不上队就放弃
+
+
+class HashBusy(Exception):
+    """哈希线程池满了"""
+    retry_after = 2
+
+
+class Hasher:
+    def __init__(self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, queue=HASH_QUEUE, wait=HASH_WAIT):
+        self.rounds = rounds
+        self.wait   = wait
+        self._pool  = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue)
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            raise HashBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, pwd):
+        return self._run(lambda: bcrypt.hashpw(pwd.encode(), bcrypt.gensalt(self.rounds)).decode())
+
+    def check(self, pwd, hashed):
+        return self._run(lambda: bcrypt.checkpw(pwd.encode(), hashed.encode()))
+
+    def needs_rehash(self, hashed):
+        """库里的哈希工作因子与当前配置不同（形如 $2b$12$...）"""
+        try:
+            return int(hashed.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+
+class RateLimiter:
+    """滑动窗口：window 秒内最多 limit 次；最多记 max_keys 个键（LRU 淘汰）。
+    只在本进程内计数，多 worker 时整体上限是 limit × worker 数"""
+
+    def __init__(self, limit, window, max_keys=100000):
+        self.limit    = limit
+        self.window   = window
+        self.max_keys = max_keys
+        self._hits    = OrderedDict()
+        self._lock    = threading.Lock()
+
+    def _recent(self, key, now):
+        hits = self._hits.get(key)
+        if hits is None:
+            return None
+        while hits and hits[0] <= now - self.window:
+            hits.popleft()
+        return hits
+
+    def retry_after(self, key):
+        """还要等几秒才能再试；0 表示没超限"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if not hits or len(hits) < self.limit:
+                return 0
+            return max(int(hits[0] + self.window - now) + 1, 1)
+
+    def hit(self, key):
+        """记一次"""
+        now = time.monotonic()
+        with self._lock:
+            hits = self._recent(key, now)
+            if hits is None:
+                hits = self._hits[key] = deque()
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+            self._hits.move_to_end(key)
+            hits.append(now)
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
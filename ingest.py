@@ -0,0 +1,174 @@
+# ==================== 录取数据导入（整列清洗 + 分批写库） ====================
+"""
+把专家版 Excel 导入 admission_records（院校 / 专业字段去重写进 colleges / majors，见 entities.py）。
+
+整列做类型清洗（不再 iterrows），然后用 Core insert 分批 executemany 写入，
+整个导入在一个事务里完成。可独立运行，不必放在 web worker 里：
+
+    python ingest.py [xlsx] [--db /tmp/gaokao.db] [--batch-size 5000] [--replace] [--no-snapshot]
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+import pandas as pd
+import storage
+
+BATCH_SIZE = 5000
+
+# 目标字段 -> 表头候选（取第一个存在的列；专家版表头带“1”后缀）
+COLUMN_ALIASES = {
+    'year':         ['年份'],
+    'batch':        ['批次'],
+    'category':     ['科类'],
+    'requirement':  ['选科要求'],
+    'college_name': ['院校名称'],
+    'college_code': ['院校代码'],
+    'college_info': ['院校基础信息', '院校标签'],
+    'major_name':   ['专业名称'],
+    'major_code':   ['专业代码'],
+    'major_info':   ['专业基础信息', '专业备注'],
+    'min_score':    ['最低分1', '最低分'],
+    'min_rank':     ['最低位次', '最低位次1'],
+    'avg_score':    ['平均分', '平均分1'],
+    'max_score':    ['最高分', '最高分1'],
+    'tuition':      ['学费'],
+    'city':         ['城市'],
+}
+INT_FIELDS  = ('min_score', 'min_rank', 'avg_score', 'max_score')
+RECORD_FIELDS = tuple(COLUMN_ALIASES)
+
+# 专家版科类写“物理/历史”，系统里统一用“物理类/历史类”
+CATEGORY_MAP = {'物理': '物理类', '历史': '历史类'}
+
+
+def read_workbook(path):
+    """读原始表（第 3 行是表头）"""
+    return pd.read_excel(path, header=2, engine='openpyxl')
+
+
+def _pick(df, field):
+    for col in COLUMN_ALIASES[field]:
+        if col in df.columns:
+            return df[col]
+    return None
+
+
+def _int_column(s):
+    """整列转可空整数：非数字/空 -> <NA>，小数截断（与 int() 一致）"""
+    s = pd.to_numeric(s, errors='coerce')
+    return s.where(s.isna(), np.trunc(s)).astype('Int64')
+
+
+def _text_column(s):
+    """整列转字符串：空 -> ''，整数型代码去掉 '.0'"""
+    if pd.api.types.is_float_dtype(s):
+        s = _int_column(s)
+    return s.astype('string').fillna('').str.strip()
+
+
+def normalize(df):
+    """原始表 -> 与 AdmissionRecord 字段同名的整洁表"""
+    name = _pick(df, 'college_name')
+    if name is None:
+        raise ValueError('表格缺少“院校名称”列')
+    df = df[name.notna()]
+    out = pd.DataFrame(index=df.index)
+    for field in RECORD_FIELDS:
+        s = _pick(df, field)
+        if field in INT_FIELDS:
+            out[field] = _int_column(s) if s is not None else pd.array([pd.NA] * len(df), dtype='Int64')
+        else:
+            out[field] = _text_column(s) if s is not None else ''
+    out.loc[out['year'] == '', 'year'] = '2025'
+    out['category'] = out['category'].replace(CATEGORY_MAP)
+    # 没有平均分就用最低分顶上
+    out['avg_score'] = out['avg_score'].fillna(out['min_score'])
+    return out.reset_index(drop=True)
+
+
+def load_frame(path, use_snapshot=True):
+    """取清洗后的表：默认走 snapshot.py 的内容哈希快照，Excel 没变就不再解析"""
+    if use_snapshot:
+        import snapshot
+        return snapshot.load_or_build(path).to_frame()
+    return normalize(read_workbook(path))
+
+
+def iter_batches(frame, batch_size=BATCH_SIZE):
+    """按批产出 executemany 参数（dict 列表，<NA> -> None）"""
+    obj = frame.astype(object).where(frame.notna(), None)
+    cols = list(obj.columns)
+    for start in range(0, len(obj), batch_size):
+        chunk = obj.iloc[start:start + batch_size]
+        yield [dict(zip(cols, row)) for row in chunk.itertuples(index=False, name=None)]
+
+
+def bulk_insert(conn, table, frame, batch_size=BATCH_SIZE, progress=None):
+    """分批 Core insert；progress(done, total) 每批回调一次"""
+    total, done = len(frame), 0
+    for params in iter_batches(frame, batch_size):
+        conn.execute(table.insert(), params)
+        done += len(params)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def import_xlsx(engine, tables, path, batch_size=BATCH_SIZE, progress=None, replace=False,
+                use_snapshot=True):
+    """读表 + 清洗 + 单事务分批写入，返回导入条数"""
+    return import_frame(engine, tables, load_frame(path, use_snapshot), batch_size, progress, replace)
+
+
+def import_frame(engine, tables, frame, batch_size=BATCH_SIZE, progress=None, replace=False):
+    """清洗好的表单事务分批写入；tables 为 entities.AdmissionTables，院校 / 专业字段先换成实体 id"""
+    with engine.begin() as conn:
+        if replace:
+            conn.execute(tables.records.delete())
+        n = bulk_insert(conn, tables.records, tables.narrow(conn, frame), batch_size, progress)
+        if replace:
+            tables.prune(conn)
+        storage.analyze(conn)                # 院校 / 专业要先查实体表再走外键索引，规划器得有统计信息
+        return n
+
+
+def print_progress(done, total):
+    sys.stderr.write(f'\r导入 {done}/{total} ({done * 100 // max(total, 1)}%)')
+    if done >= total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
+
+# ==================== 命令行 ====================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='导入专家版录取数据')
+    ap.add_argument('xlsx', nargs='?', default=None, help='Excel 路径，默认用 main.XLSX')
+    ap.add_argument('--db', default=None, help='SQLite 文件，默认 /tmp/gaokao.db')
+    ap.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    ap.add_argument('--replace', action='store_true', help='先清空已有录取数据')
+    ap.add_argument('--no-snapshot', action='store_true', help='不用快照，直接解析 Excel')
+    args = ap.parse_args(argv)
+
+    if args.db:
+        os.environ['GAOKAO_DB'] = args.db
+    os.environ['GAOKAO_AUTO_IMPORT'] = '0'      # 别让 main 在 import 时自己再导一遍
+    from main import app, db, AdmissionRecord, XLSX, data_version, refresh_derived, admissions
+
+    path = args.xlsx or XLSX
+    t0 = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        if not args.replace and AdmissionRecord.query.count():
+            ap.error('库里已有录取数据，如需覆盖请加 --replace')
+        n = import_xlsx(db.engine, admissions, path,
+                        batch_size=args.batch_size, progress=print_progress, replace=args.replace,
+                        use_snapshot=not args.no_snapshot)
+        refresh_derived()                       # 近三年趋势、详情汇总整表重算
+        data_version.bump()                     # 通知各 worker 重建内存索引
+    print(f'完成：{n} 条，用时 {time.perf_counter() - t0:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
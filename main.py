@@ -2,22 +2,59 @@
 import os
 import math
 import re
-import bcrypt
+import time
+import hashlib
+import tempfile
+from functools import wraps
+import numpy as np
 import pandas as pd
-from flask import Flask, request, redirect, session, jsonify, url_for
+import ingest
+import snapshot
+import rank_model
+import pages
+import planner
+import upsert
+import trends
+import details
+import suggest
+import export
+import entities
+import storage
+import hashing
+from admission_index import AdmissionIndex, FIELDS as INDEX_FIELDS, TREND_FIELDS, order_keys, page_after
+from dataversion import DataVersion, file_lock
+from response_cache import ResponseCache
+from docs_cache import StaticDoc
+from flask import Flask, abort, request, redirect, session, jsonify, url_for, Response, stream_with_context, g, render_template
+from jinja2 import DictLoader
+from markupsafe import escape
 from flask_sqlalchemy import SQLAlchemy
 
 # ==================== 2. 基础配置 ====================
-DB_FILE = '/tmp/gaokao.db'
+DB_FILE = os.getenv('GAOKAO_DB', '/tmp/gaokao.db')
 XLSX    = '福建2025年专家版大数据.xlsx'
 TXT     = '填报指南.txt'
 TIP_FILE= '志愿技巧.txt'          # 新增技巧文件
+AUTO_IMPORT = os.getenv('GAOKAO_AUTO_IMPORT', '1') == '1'   # 空库启动时自动导 Excel；也可用 python ingest.py 单独导
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_FILE}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-key-123')
+app.config['BCRYPT_ROUNDS'] = hashing.BCRYPT_ROUNDS           # 改了之后老密码在下次登录时按新因子重算
+app.config['LOGIN_LIMIT_IP']   = int(os.getenv('LOGIN_LIMIT_IP', 30))     # 每 IP 每分钟登录 / 注册次数
+app.config['LOGIN_LIMIT_USER'] = int(os.getenv('LOGIN_LIMIT_USER', 5))    # 每用户名每分钟失败次数
+app.config['IMPORT_BATCH_SIZE'] = int(os.getenv('IMPORT_BATCH_SIZE', ingest.BATCH_SIZE))
+app.config['QUERY_PAGE_SIZE'] = 50        # /query 默认每页条数
+app.config['QUERY_MAX_PAGE_SIZE'] = 500
+app.config['RESPONSE_CACHE_SIZE'] = int(os.getenv('RESPONSE_CACHE_SIZE', 512))   # 每个 worker 缓存的页面数
+app.config['RESPONSE_CACHE_TTL']  = int(os.getenv('RESPONSE_CACHE_TTL', 300))    # 秒
+app.config['RESPONSE_CACHE_DIR']  = os.getenv('RESPONSE_CACHE_DIR')              # 设了就多 worker 共享文件缓存
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024   # 上传 Excel 上限
+app.json.ensure_ascii = False             # JSON 里的中文直接输出，不转 \uXXXX，体积小一半
 db = SQLAlchemy(app)
+data_version = DataVersion(DB_FILE + '.version')   # 录取数据版本号（跨 worker）
+UPLOAD_STATE = DB_FILE + '.upload.json'            # 后台导入任务的进度（跨 worker）
 
 # ==================== 3. 数据模型（完全对齐文档）=======
 class User(db.Model):
@@ -27,26 +64,103 @@ class User(db.Model):
     password = db.Column(db.String(120), nullable=False)   # 已存 bcrypt 密文
     role     = db.Column(db.String(20), default='user')   # user/admin
 
+class College(db.Model):
+    """院校实体：名称、代码、城市、院校信息每种组合一行，招生行按 college_id 引用（见 entities.py）"""
+    __tablename__ = 'colleges'
+    __table_args__ = (db.Index('ux_college', 'name', 'code', 'city', 'info', unique=True),)
+    id          = db.Column(db.Integer, primary_key=True)
+    name        = db.Column(db.String(100), nullable=False, default='')
+    code        = db.Column(db.String(20), nullable=False, default='')
+    city        = db.Column(db.String(50), nullable=False, default='')
+    info        = db.deferred(db.Column(db.Text, nullable=False, default=''))   # 长文本，用到才读
+
+class Major(db.Model):
+    """专业实体：名称、代码、专业信息每种组合一行"""
+    __tablename__ = 'majors'
+    __table_args__ = (db.Index('ux_major', 'name', 'code', 'info', unique=True),)
+    id          = db.Column(db.Integer, primary_key=True)
+    name        = db.Column(db.String(100), nullable=False, default='')
+    code        = db.Column(db.String(20), nullable=False, default='')
+    info        = db.deferred(db.Column(db.Text, nullable=False, default=''))
+
+def entity_field(rel, attr):
+    """实体上的字段挂成招生行的只读属性，沿用原来的宽表字段名（r.college_name 等）"""
+    return property(lambda self: getattr(getattr(self, rel), attr))
+
 class AdmissionRecord(db.Model):
     __tablename__ = 'admission_records'
+    __table_args__ = (
+        db.Index('ix_admission_category_avg', 'category', 'avg_score'),          # /analysis：科类内按平均分区间扫
+        db.Index('ix_admission_college_category', 'college_id', 'category'),     # 某院校（某科类）的全部专业
+        db.Index('ix_admission_natural_key', 'year', 'category', 'college_id', 'major_id'),
+    )
     id          = db.Column(db.Integer, primary_key=True)
     year        = db.Column(db.String(10))
     batch       = db.Column(db.String(50))
     category    = db.Column(db.String(50))   # 物理类/历史类
     requirement = db.Column(db.String(100))  # 选科要求
-    college_name= db.Column(db.String(100), index=True)
-    college_code= db.Column(db.String(20))
-    college_info= db.Column(db.Text)
-    major_name  = db.Column(db.String(100), index=True)
-    major_code  = db.Column(db.String(20))
-    major_info  = db.Column(db.Text)
+    college_id  = db.Column(db.Integer, db.ForeignKey('colleges.id'), nullable=False)
+    major_id    = db.Column(db.Integer, db.ForeignKey('majors.id'), nullable=False, index=True)
     min_score   = db.Column(db.Integer)
     min_rank    = db.Column(db.Integer)
     avg_score   = db.Column(db.Integer)
     max_score   = db.Column(db.Integer)
     tuition     = db.Column(db.String(50))
+    # 录取概率因人而异，按请求现算（calc_probabilities），不落库；旧库里的 probability 列由迁移 4 重建表时去掉（见 storage.py）
+    college     = db.relationship(College, lazy='joined', innerjoin=True)
+    major       = db.relationship(Major, lazy='joined', innerjoin=True)
+
+    college_name = entity_field('college', 'name')
+    college_code = entity_field('college', 'code')
+    college_info = entity_field('college', 'info')
+    city         = entity_field('college', 'city')
+    major_name   = entity_field('major', 'name')
+    major_code   = entity_field('major', 'code')
+    major_info   = entity_field('major', 'info')
+
+    def assign(self, **fields):
+        """按宽表字段赋值：院校 / 专业那几个字段换成对应实体（库里没有这种取值组合就新建）"""
+        for rel, model, mapping in (('college', College, entities.COLLEGE), ('major', Major, entities.MAJOR)):
+            key = {attr: fields.pop(f, None) or '' for f, attr in mapping.items()}
+            setattr(self, rel, model.query.filter_by(**key).first() or model(**key))
+        for f, value in fields.items():
+            setattr(self, f, value)
+        return self
+
+class ProgrammeTrend(db.Model):
+    """同一专业近三年的趋势，导入 / 改数据后整表重算（见 trends.py）"""
+    __tablename__ = 'programme_trends'
+    __table_args__ = (db.Index('ix_trend_key', 'year', 'category', 'college_code', 'major_code'),)
+    id          = db.Column(db.Integer, primary_key=True)
+    year        = db.Column(db.String(10))
+    category    = db.Column(db.String(50))
+    college_code= db.Column(db.String(20))
+    major_code  = db.Column(db.String(20))
+    trend_years = db.Column(db.Integer)      # 近三年有数据的年数
+    rank_drift  = db.Column(db.Float)        # 最低位次每年变化，正数 = 越来越好进
+    score_volatility = db.Column(db.Float)   # 近三年最低分标准差
+
+class EntityDetail(db.Model):
+    """院校 / 专业详情页的预算汇总，每 (类型, 年份, 名称) 一行（见 details.py）"""
+    __tablename__ = 'entity_details'
+    __table_args__ = (db.Index('ix_entity_detail_name', 'kind', 'name'),)
+    id          = db.Column(db.Integer, primary_key=True)
+    kind        = db.Column(db.String(10))       # college / major
+    year        = db.Column(db.String(10))
+    name        = db.Column(db.String(100))
+    code        = db.Column(db.String(20))
     city        = db.Column(db.String(50))
-    probability = db.Column(db.Integer)      # 录取概率（0-100），后台计算
+    info        = db.Column(db.Text)             # 院校标签 / 专业简介
+    programmes  = db.Column(db.Integer)          # 招生专业数 / 开设院校数
+    by_category = db.Column(db.Text)             # JSON：{科类: 个数}
+    min_score   = db.Column(db.Integer)
+    avg_score   = db.Column(db.Float)
+    max_score   = db.Column(db.Integer)
+    min_rank    = db.Column(db.Integer)
+    max_rank    = db.Column(db.Integer)
+    histogram   = db.Column(db.Text)             # JSON：[[最低分分档, 个数], ...]
+
+admissions = entities.AdmissionTables(AdmissionRecord.__table__, College.__table__, Major.__table__)
 
 # ==================== 4. 工具函数 ====================
 def calc_probability(user_score, min_s, avg_s):
@@ -62,95 +176,281 @@ def calc_probability(user_score, min_s, avg_s):
         return 40
     return 10
 
-def set_prob(records, user_score):
-    """给一组记录补算/补写 probability，永不出现 None"""
-    for r in records:
-        # 如果拿不到有效分数，直接给 0，避免 None
-        r.probability = calc_probability(
-            user_score,
-            r.min_score or 0,
-            r.avg_score or r.min_score or 0
-        )
-    db.session.commit()
-    return records
+def calc_probabilities(user_score, min_s, avg_s):
+    """calc_probability 的向量版：min_s/avg_s 为整列数组（0 表示空），一次算完，同样 ±25 分段"""
+    min_s, avg_s = np.asarray(min_s), np.asarray(avg_s)
+    gap = user_score - avg_s
+    prob = np.select([gap >= 25, gap >= 0, gap >= -25], [95, 70, 40], 10)
+    return np.where((min_s == 0) | (avg_s == 0), 0, prob)
+
+# 可选概率模型：score=分差（默认，±25 分段），rank=位次（一分一段表 + min_rank），
+# trend=位次 + 近三年趋势（按位次漂移外推到今年，分数波动大的降一档）
+PROB_MODELS = {'score': '分差模型', 'rank': '位次模型', 'trend': '趋势模型'}
+_rank_table = None
+
+def get_rank_table(idx):
+    """一分一段表；从录取数据拟合时随索引版本、年份分区一起更新"""
+    global _rank_table
+    key = (idx.version, idx.year)
+    if _rank_table is None or _rank_table[0] != key:
+        _rank_table = (key, rank_model.ScoreRankTable.load(idx))
+    return _rank_table[1]
+
+def score_probabilities(idx, pos, user_score, model='score'):
+    """按所选模型给索引里 pos 这些行整列打分"""
+    if model == 'rank':
+        return rank_model.probabilities(get_rank_table(idx), user_score, idx, pos)
+    if model == 'trend':
+        return rank_model.trend_probabilities(get_rank_table(idx), user_score, idx, pos)
+    return calc_probabilities(user_score, *idx.scores(pos))
+
+# ---------- 密码哈希：专用有界线程池 + 登录限流（见 hashing.py） ----------
+hasher = hashing.Hasher(app.config['BCRYPT_ROUNDS'])
+login_by_ip    = hashing.RateLimiter(app.config['LOGIN_LIMIT_IP'], 60)
+login_failures = hashing.RateLimiter(app.config['LOGIN_LIMIT_USER'], 60)
 
 def hash_pwd(pwd):
-    return bcrypt.hashpw(pwd.encode(), bcrypt.gensalt()).decode()
+    return hasher.hash(pwd)
 
 def check_pwd(pwd, hashed):
-    return bcrypt.checkpw(pwd.encode(), hashed.encode())
+    return hasher.check(pwd, hashed)
+
+def login_wait(username=None):
+    """限流：还要等几秒（0 表示可以试）"""
+    wait = login_by_ip.retry_after(request.remote_addr)
+    return max(wait, login_failures.retry_after(username)) if username else wait
+
+def verify_login(user, username, pwd):
+    """校验密码并计数；成功且工作因子变了就按新因子重算"""
+    login_by_ip.hit(request.remote_addr)
+    if user is None or not check_pwd(pwd, user.password):
+        login_failures.hit(username)
+        return False
+    login_failures.reset(username)
+    if hasher.needs_rehash(user.password):
+        user.password = hash_pwd(pwd)
+        db.session.commit()
+    return True
+
+# ---------- 进程内录取索引（见 admission_index.py） ----------
+_index = None
+
+def load_index():
+    """从库里读窄列重建索引（先取版本号再查库，宁可多重建一次也不把旧数据标成新版本）"""
+    version = data_version.get()
+    w = admissions.wide
+    rows = db.session.execute(db.select(*(w.c[f] for f in INDEX_FIELDS)).order_by(w.c.id)).all()
+    return AdmissionIndex.from_rows(rows, version).with_trends(load_trends())
+
+def get_index():
+    """当前索引；别的 worker 改过数据（版本号变了）就重建"""
+    global _index
+    idx = _index
+    if idx is None or idx.version != data_version.get():
+        idx = _index = load_index()
+    return idx
+
+class UnknownYear(LookupError):
+    """请求的年份库里没有数据"""
+
+def year_index(year=None):
+    """某一年的分区（默认最新一年）：查询、概率、汇总都只扫这一年。
+    year 不在数据年份里抛 UnknownYear（页面 / API 回 404），不为随便一个参数值建分区"""
+    idx = get_index()
+    if year and year not in idx.years:
+        raise UnknownYear(year)
+    return idx.partition(year or idx.current_year)
+
+@app.errorhandler(UnknownYear)
+def _unknown_year(e):
+    years = get_index().years
+    message = f'没有 {e.args[0]} 年的数据，可选年份：{"、".join(years)}'
+    if request.path.startswith('/api/'):
+        return jsonify({'error': message, 'years': years}), 404
+    return bs_html(f'<div class="alert alert-warning">{escape(message)}</div>'), 404
+
+def load_trends():
+    return trends.load(db.engine, ProgrammeTrend.__table__)
+
+def refresh_derived(colleges=None, majors=None):
+    """录取数据写库之后、bump 版本号之前调用：整表重算近三年趋势；
+    详情汇总给了院校 / 专业名就只重算这几个（管理员改一行），否则整表重算"""
+    trends.rebuild(db.engine, admissions.wide, ProgrammeTrend.__table__)
+    details.rebuild(db.engine, admissions.wide, EntityDetail.__table__, colleges, majors)
+
+_details = None
+
+def get_details():
+    """详情页汇总（details.DetailStore），数据版本号变了就整表重读"""
+    global _details
+    version = data_version.get()
+    if _details is None or _details[0] != version:
+        _details = (version, details.DetailStore.load(db.engine, EntityDetail.__table__))
+    return _details[1]
+
+_suggesters = {}
+
+def get_suggester(idx, field):
+    """输入联想键表（见 suggest.py），按 (索引版本, 年份, 字段) 缓存；拼音按名称缓存，数据改了重建也快"""
+    key = (idx.version, idx.year, field)
+    s = _suggesters.get(key)
+    if s is None:
+        if len(_suggesters) >= 8:
+            _suggesters.clear()
+        s = _suggesters[key] = suggest.Suggester.from_summary(idx.summary(field), idx.texts[field])
+    return s
+
+def index_changed(patch):
+    """录取数据已 commit 后调用：版本号 +1，本进程直接打补丁，其他进程自己重建
+    patch(idx, version) -> 新索引"""
+    global _index
+    old, new = data_version.bump()
+    idx = _index
+    _index = patch(idx, new) if idx is not None and idx.version == old else None
 
 # ==================== 5. 应用初始化（gunicorn 安全）=======
+# 建表、迁移、默认账号、空库导入都在文件锁里做：不开预加载时每个 worker 都会跑 create_app，
+# 第一个拿到锁的导入，其余的等它做完再看到“库里已有数据”，不会重复导入 / 重复建账号。
+# 开了预加载（gunicorn.conf.py）就只在 master 里跑一次，fork 出的 worker 直接继承建好的索引。
+INIT_LOCK = DB_FILE + '.init.lock'
+
 def create_app():
-    with app.app_context():
+    global _index
+    with app.app_context(), file_lock(INIT_LOCK):
+        storage.configure(db.engine)          # 每个连接：WAL + 调优 PRAGMA（见 storage.py）
+        fresh = not db.inspect(db.engine).has_table(AdmissionRecord.__tablename__)
         db.create_all()
+        if fresh:
+            storage.stamp(db.engine)          # 新库按最新模型建好，直接记成最新 schema 版本
+        else:
+            storage.migrate(db.engine)        # 已有库补索引 / 改结构
         # 默认账号
         if User.query.count() == 0:
             db.session.add(User(username='admin', password=hash_pwd('123456'), role='admin'))
             db.session.add(User(username='user',  password=hash_pwd('123456'), role='user'))
             db.session.commit()
-        # 空库自动导 Excel
-        if AdmissionRecord.query.count() == 0 and os.path.exists(XLSX):
-            df = pd.read_excel(XLSX, header=2, engine='openpyxl')
-            for _, row in df.iterrows():
-                if pd.isna(row.get('院校名称')): continue
-                min_s = int(row['最低分1']) if '最低分1' in row and pd.notna(row['最低分1']) else None
-                avg_s = int(row['平均分']) if '平均分' in row and pd.notna(row['平均分']) else min_s
-                rec = AdmissionRecord(
-                    year=str(row.get('年份', '2025')),
-                    batch=row.get('批次', ''),
-                    category=row.get('科类', ''),
-                    requirement=row.get('选科要求', ''),
-                    college_name=row['院校名称'],
-                    college_code=str(row.get('院校代码', '')),
-                    college_info=str(row.get('院校基础信息', '')),
-                    major_name=row.get('专业名称', ''),
-                    major_code=str(row.get('专业代码', '')),
-                    major_info=str(row.get('专业基础信息', '')),
-                    min_score=min_s,
-                    min_rank=int(row['最低位次']) if '最低位次' in row and pd.notna(row['最低位次']) else None,
-                    avg_score=avg_s,
-                    max_score=int(row['最高分']) if '最高分' in row and pd.notna(row['最高分']) else None,
-                    tuition=str(row.get('学费', '')),
-                    city=str(row.get('城市', ''))
-                )
-                db.session.add(rec)
-            db.session.commit()
+        # 空库自动导 Excel（走内容哈希快照 + 分批写库，见 ingest.py / snapshot.py）
+        if AUTO_IMPORT and AdmissionRecord.query.count() == 0 and os.path.exists(XLSX):
+            snap = snapshot.load_or_build(XLSX)
+            n = ingest.import_frame(db.engine, admissions, snap.to_frame(),
+                                    batch_size=app.config['IMPORT_BATCH_SIZE'])
+            app.logger.info('已导入 %d 条录取数据', n)
+            refresh_derived()
+            # 刚导入的行与快照一一对应，索引直接用快照列，不再回读整表
+            ids = db.session.execute(db.select(AdmissionRecord.id).order_by(AdmissionRecord.id)).scalars().all()
+            _, v = data_version.bump()
+            _index = AdmissionIndex.from_snapshot(snap, ids, v).with_trends(load_trends())
+        elif AdmissionRecord.query.first() is not None and \
+                (ProgrammeTrend.query.first() is None or EntityDetail.query.first() is None):
+            refresh_derived()                   # 老库升级：补算一次趋势 / 详情汇总
+            data_version.bump()
+        get_index()
     return app
 
+def before_fork():
+    """gunicorn master 在 fork worker 之前调用（预加载模式）：
+    把 worker 会用到的只读结构全部建好，断开 master 的数据库连接"""
+    with app.app_context():
+        idx = get_index().warm()
+        if idx.years:
+            get_rank_table(year_index())        # 一分一段表（位次 / 趋势模型）
+            for field in SUGGEST_FIELDS.values():
+                get_suggester(year_index(), field)   # 输入联想键表（含拼音）
+        get_details()
+        db.session.remove()
+        db.engine.dispose()                     # SQLite 连接不能跨 fork 共用
+
+def after_fork():
+    """worker 刚 fork 出来时调用：继承来的连接池、哈希线程池都不能用，换新的"""
+    global hasher
+    with app.app_context():
+        db.engine.dispose(close=False)          # 只丢掉引用，不去关 master 的连接
+    hasher = hashing.Hasher(app.config['BCRYPT_ROUNDS'])     # 线程不会跟着 fork 过来
+
 create_app()
 
 # ==================== 6. 路由 =================================================
-from flask import render_template_string as _r
+# ---------- 页面模板：启动时编译（见 pages.py），渲染耗时写进 Server-Timing ----------
+app.jinja_loader = DictLoader(pages.TEMPLATES)
+for _name in pages.TEMPLATES:
+    app.jinja_env.get_template(_name)
+_navbars = {}                                  # (用户名, 角色) -> 导航栏 HTML
+route_timing = {}                              # endpoint -> [次数, 总耗时 ms, 渲染耗时 ms, 最大耗时 ms]
+
+def _add_render_time(t0):
+    g.render_ms = g.get('render_ms', 0.0) + (time.perf_counter() - t0) * 1000
 
-def bs_html(content):
+def navbar(key=None):
+    """key：(用户名, 角色)，默认取当前登录状态；用户名给 '' 时只按角色渲染，用户名由页面脚本从 /whoami 填上"""
+    key = key or (session.get('username'), session.get('role'))
+    html = _navbars.get(key)
+    if html is None:
+        if len(_navbars) > 4096:
+            _navbars.clear()
+        html = _navbars[key] = render_template('navbar.html', username=key[0], role=key[1])
+    return html
+
+def rows_macro(name, *args):
+    """调用 rows.html 里编译好的宏"""
+    t0 = time.perf_counter()
+    html = str(getattr(app.jinja_env.get_template('rows.html').module, name)(*args))   # 转成普通 str，免得拼接时被二次转义
+    _add_render_time(t0)
+    return html
+
+def bs_parts(nav=None):
+    """Bootstrap5 外壳的前后两段（流式输出时先发前段）；nav 默认为当前登录状态的导航栏"""
+    return pages.SHELL_HEAD + (nav or navbar()) + pages.CONTAINER_OPEN, pages.SHELL_TAIL
+
+def bs_html(content, nav=None):
     """套 Bootstrap5 外壳"""
-    return _r('''
-<!doctype html><html lang="zh">
-<head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
-<title>福建高考志愿系统</title>
-<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
-<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-</head>
-<body class="bg-light">
-<nav class="navbar navbar-dark bg-primary">
-  <div class="container-fluid">
-    <a class="navbar-brand" href="/">福建高考志愿系统</a>
-    <div>
-      {% if session.username %}
-        <span class="text-white me-3">{{ session.username }} ({{ session.role }})</span>
-        <a class="btn btn-sm btn-outline-light" href="/logout">退出</a>
-      {% else %}
-        <a class="btn btn-sm btn-outline-light" href="/login">登录</a>
-      {% endif %}
-      <a class="btn btn-sm btn-outline-light ms-2" href="/colleges">院校库</a>
-      <a class="btn btn-sm btn-outline-light ms-2" href="/majors">专业库</a>
-      <a class="btn btn-sm btn-outline-light ms-2" href="/skill">填报技巧</a>
-    </div>
-  </div>
-</nav>
-<div class="container mt-4">''' + content + '''</div>
-</body></html>''', session=session)
+    t0 = time.perf_counter()
+    head, tail = bs_parts(nav)
+    html = head + content + tail
+    _add_render_time(t0)
+    return html
+
+@app.before_request
+def _start_timer():
+    g.t0 = time.perf_counter()
+
+@app.after_request
+def _server_timing(resp):
+    total = (time.perf_counter() - g.t0) * 1000 if 't0' in g else 0.0
+    render = g.get('render_ms', 0.0)
+    resp.headers['Server-Timing'] = f'app;dur={total:.2f}, render;dur={render:.2f}'
+    stat = route_timing.setdefault(request.endpoint or '-', [0, 0.0, 0.0, 0.0])
+    stat[0] += 1; stat[1] += total; stat[2] += render; stat[3] = max(stat[3], total)
+    return resp
+
+# ---------- 公开页面缓存：键 = 规范化参数 + 数据版本号，附带 ETag ----------
+response_cache = ResponseCache(app.config['RESPONSE_CACHE_SIZE'], app.config['RESPONSE_CACHE_TTL'],
+                               app.config['RESPONSE_CACHE_DIR'])
+
+def cached_view(view):
+    """只缓存 GET 的 200 响应（流式输出除外）；If-None-Match 命中直接 304，连缓存都不用查"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != 'GET':
+            return view(*args, **kwargs)
+        version = data_version.get()
+        response_cache.sync_version(version)
+        params = sorted((k, v) for k, v in request.args.items(multi=True) if v)
+        # 导航栏随登录状态变化，所以用户名/角色也算进键里
+        key  = repr((request.endpoint, sorted(kwargs.items()), params, session.get('username'), session.get('role')))
+        etag = f'v{version}-{hashlib.sha1(key.encode()).hexdigest()[:20]}'
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'private, no-cache'}
+        if etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+        hit = response_cache.get(etag)
+        if hit is not None:
+            body, mimetype = hit
+            return Response(body, mimetype=mimetype, headers=headers)
+        resp = app.make_response(view(*args, **kwargs))
+        if resp.status_code == 200 and not resp.is_streamed:
+            response_cache.set(etag, (resp.get_data(), resp.mimetype))
+            resp.headers.update(headers)
+        return resp
+    return wrapper
 
 @app.route('/')
 def index():
@@ -160,14 +460,27 @@ def index():
   <a class="btn btn-primary me-2" href="/register">用户注册</a>
   <a class="btn btn-success me-2" href="/login">学生/家长登录</a>
   <a class="btn btn-warning me-2" href="/admin/login">管理员登录</a>
-  <a class="btn btn-info" href="/query">直接查询</a>
+  <a class="btn btn-info me-2" href="/query">直接查询</a>
+  <a class="btn btn-outline-primary" href="/plan">冲稳保垫方案</a>
 </div>''')
 
+# ---------- 登录限流 / 哈希繁忙 ----------
+def too_many(wait):
+    return bs_html(f'<div class="alert alert-warning">尝试次数过多，请 {wait} 秒后再试</div>'), 429, {'Retry-After': str(wait)}
+
+@app.errorhandler(hashing.HashBusy)
+def _hash_busy(e):
+    return bs_html('<div class="alert alert-warning">登录人数较多，请稍后再试</div>'), 503, {'Retry-After': str(e.retry_after)}
+
 # ---------- 注册 ----------
 @app.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         u, p = request.form['username'], request.form['password']
+        wait = login_wait()
+        if wait:
+            return too_many(wait)
+        login_by_ip.hit(request.remote_addr)
         if User.query.filter_by(username=u).first():
             return bs_html('<div class="alert alert-danger">用户名已存在</div>')
         db.session.add(User(username=u, password=hash_pwd(p), role='user'))
@@ -186,8 +499,11 @@ def register():
 def login():
     if request.method == 'POST':
         u, p = request.form['username'], request.form['password']
+        wait = login_wait(u)
+        if wait:
+            return too_many(wait)
         user = User.query.filter_by(username=u).first()
-        if user and check_pwd(p, user.password):
+        if verify_login(user, u, p):
             session['username'] = u
             session['role'] = user.role
             return redirect('/query')
@@ -205,68 +521,181 @@ def logout():
     session.clear()
     return redirect('/')
 
-# ---------- 查询（已支持 GET/POST 组合过滤） ----------
+@app.route('/whoami')
+def whoami():
+    """当前登录用户（共用一份的预渲染页面在浏览器里填导航栏用户名）"""
+    resp = jsonify(username=session.get('username'), role=session.get('role'))
+    resp.headers['Cache-Control'] = 'private, no-store'
+    return resp
+
+# ---------- 查询（已支持 GET/POST 组合过滤；游标分页 / 流式输出） ----------
+def query_rows_html(records, probs):
+    return rows_macro('query_rows', records, probs)
+
+def form_int(args, name, label, default=0):
+    """整数参数；空值取 default，不是整数抛 ValueError('<label>必须是整数')。
+    错误信息会原样显示给用户，所以只带字段名，不带用户填的原值"""
+    raw = (args.get(name) or '').strip()
+    if not raw:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        raise ValueError(f'{label}必须是整数') from None
+
+def query_params(args):
+    """/query 与 /api/v1/query 共用的参数解析；整数参数不对抛 ValueError"""
+    page_size = form_int(args, 'page_size', '每页条数', app.config['QUERY_PAGE_SIZE'])
+    return dict(
+        user_score = form_int(args, 'score', '高考分数'),
+        filters    = dict(college=args.get('college', '').strip(), major=args.get('major', '').strip(),
+                          category=args.get('category', '').strip(), requirement=args.get('requirement', '').strip()),
+        page_size  = min(max(page_size, 1), app.config['QUERY_MAX_PAGE_SIZE']),
+        after      = int(args['after']) if args.get('after', '').isdigit() else None,   # 游标：上一页最后一行的排序键
+        model      = args.get('model') if args.get('model') in PROB_MODELS else 'score',
+        year       = args.get('year', '').strip(),
+    )
+
+def query_matches(idx, user_score, model='score', **filters):
+    """命中行位置、概率（没分数为 None）、排序键"""
+    pos = idx.filter(**filters)
+    min_s, avg_s = idx.scores(pos)
+    # 有分数才算概率（按请求整列现算，只读，不写回共享的录取记录）
+    prob = score_probabilities(idx, pos, user_score, model) if user_score else None
+    keys = order_keys(prob if prob is not None else 0, avg_s, idx.ids[pos])
+    return pos, prob, keys
+
 @app.route('/query', methods=['GET', 'POST'])
+@cached_view
 def query():
     # 统一取参数，POST 优先，GET 兜底
-    user_score = int((request.form if request.method=='POST' else request.args).get('score', 0))
-    college    = (request.form if request.method=='POST' else request.args).get('college', '').strip()
-    major      = (request.form if request.method=='POST' else request.args).get('major', '').strip()
-    category   = (request.form if request.method=='POST' else request.args).get('category', '').strip()
-    requirement= (request.form if request.method=='POST' else request.args).get('requirement', '').strip()
-
-    q = AdmissionRecord.query
-    if college:     q = q.filter(AdmissionRecord.college_name.contains(college))
-    if major:       q = q.filter(AdmissionRecord.major_name.contains(major))
-    if category:    q = q.filter(AdmissionRecord.category == category)
-    if requirement: q = q.filter(AdmissionRecord.requirement.contains(requirement))
-
-    records = q.all()
-    if user_score:               # 有分数才算概率
-        records = set_prob(records, user_score)
-
-    # 生成表格
-    tbl = '\n'.join(f'''
-        <tr>
-          <td><a href="/college/{r.college_name}">{r.college_name}</a></td>
-          <td><a href="/major/{r.major_name}">{r.major_name}</a></td>
-          <td>{r.category}</td><td>{r.min_score or ''}</td><td>{r.avg_score or ''}</td>
-          <td><span class="badge {"bg-success" if (r.probability or 0)>80 else "bg-warning" if (r.probability or 0)>40 else "bg-danger"}">{r.probability}%</span></td>
-        </tr>''' for r in records)
+    args = request.form if request.method=='POST' else request.args
+    try:
+        p      = query_params(args)
+    except ValueError as e:
+        return bs_html(f'<div class="alert alert-danger">{escape(e)}</div>'), 400
+    user_score, filters, page_size, after, model, year = (p['user_score'], p['filters'], p['page_size'],
+                                                          p['after'], p['model'], p['year'])
+    college, major, category, requirement = (filters['college'], filters['major'],
+                                             filters['category'], filters['requirement'])
+    stream     = args.get('stream') == '1'
+    url_filters= {k: v for k, v in filters.items() if v}
+    if model != 'score':
+        url_filters['model'] = model
+    if year:
+        url_filters['year'] = year
+    years      = get_index().years
 
     # 返回页面（GET/POST 同模板）
-    return bs_html(f'''
+    head = f'''
 <h4>志愿查询</h4>
 <form method="get" class="row g-3 mb-3">   <!-- 改用 GET，方便分享 -->
   <div class="col-md-2"><label>高考分数</label><input type="number" class="form-control" name="score" value="{user_score or ''}"></div>
-  <div class="col-md-2"><label>院校名称</label><input class="form-control" name="college" value="{college}"></div>
-  <div class="col-md-2"><label>专业名称</label><input class="form-control" name="major" value="{major}"></div>
+  <div class="col-md-2 position-relative"><label>院校名称</label><input class="form-control" name="college" value="{escape(college)}" data-suggest="college" autocomplete="off" placeholder="如 xmdx"></div>
+  <div class="col-md-2 position-relative"><label>专业名称</label><input class="form-control" name="major" value="{escape(major)}" data-suggest="major" autocomplete="off"></div>
   <div class="col-md-2"><label>科类</label>
       <select class="form-select" name="category"><option value="">全部</option><option{" selected" if category=="物理类" else ""}>物理类</option><option{" selected" if category=="历史类" else ""}>历史类</option></select></div>
-  <div class="col-md-2"><label>选科要求</label><input class="form-control" name="requirement" value="{requirement}" placeholder="如 化"></div>
+  <div class="col-md-2"><label>选科要求</label><input class="form-control" name="requirement" value="{escape(requirement)}" placeholder="如 化"></div>
+  <div class="col-md-2"><label>概率模型</label>
+      <select class="form-select" name="model">{''.join(f'<option value="{k}"{" selected" if model==k else ""}>{v}</option>' for k, v in PROB_MODELS.items())}</select></div>
+  {'<div class="col-md-2"><label>年份</label><select class="form-select" name="year">' + ''.join(f'<option{" selected" if (year or years[-1])==y else ""}>{y}</option>' for y in reversed(years)) + '</select></div>' if len(years) > 1 else ''}
   <div class="col-md-2 align-self-end"><button class="btn btn-primary">查询</button></div>
-</form>
-{('<table class="table table-bordered table-sm"><thead class="table-light"><tr><th>院校</th><th>专业</th><th>科类</th><th>最低分</th><th>平均分</th><th>录取概率</th></tr></thead><tbody>' + tbl + '</tbody></table>') if records else '<div class="alert alert-info">暂无数据，请调整条件</div>'}''')
+</form>''' + pages.SUGGEST_SCRIPT
+    thead = '<table class="table table-bordered table-sm"><thead class="table-light"><tr><th>院校</th><th>专业</th><th>科类</th><th>最低分</th><th>平均分</th><th>录取概率</th></tr></thead><tbody>'
+    empty = '<div class="alert alert-info">暂无数据，请调整条件</div>'
+
+    if stream:
+        # 流式：先把页头发出去，再边排序边分块输出全部命中行，首字节时间与结果多少无关
+        shell_head, shell_tail = bs_parts()
+        idx = year_index(year)                  # 年份不对在发出页头之前就报 404
+        def generate():
+            yield shell_head + head
+            pos, prob, keys = query_matches(idx, user_score, model, **filters)
+            order = page_after(keys, after, page_size if 'page_size' in args else None)
+            if not len(order):
+                yield empty
+            else:
+                yield thead
+                for i in range(0, len(order), 200):
+                    chunk = order[i:i + 200]
+                    yield query_rows_html(idx.rows(pos[chunk]), [None] * len(chunk) if prob is None else prob[chunk].tolist())
+                yield '</tbody></table>'
+            yield shell_tail
+        return Response(stream_with_context(generate()), mimetype='text/html')
+
+    idx = year_index(year)
+    pos, prob, keys = query_matches(idx, user_score, model, **filters)
+    order = page_after(keys, after, page_size)
+    records = idx.rows(pos[order])
+    probs = [None] * len(order) if prob is None else prob[order].tolist()
+    more = len(order) == page_size and bool((keys > keys[order[-1]]).any())
+    link = lambda **kw: url_for('query', score=user_score or None, page_size=page_size, **url_filters, **kw)
+    pager = f'''
+<div class="d-flex align-items-center gap-3 mb-4">
+  <span class="text-muted">共 {len(pos)} 条，每页 {page_size} 条</span>
+  {f'<a class="btn btn-sm btn-outline-primary" href="{link()}">第一页</a>' if after is not None else ''}
+  {f'<a class="btn btn-sm btn-primary" href="{link(after=int(keys[order[-1]]))}">下一页</a>' if more else ''}
+  <a class="btn btn-sm btn-outline-secondary" href="{url_for('query', score=user_score or None, stream=1, **url_filters)}">显示全部</a>
+  {''.join(f'<a class="btn btn-sm btn-outline-success" href="{url_for("query_export", format=f, score=user_score or None, **url_filters)}">导出 {t}</a>' for f, t in EXPORT_LABELS.items())}
+</div>'''
+    return bs_html(head + ((thead + query_rows_html(records, probs) + '</tbody></table>' + pager) if records else empty))
+
+# ---------- 导出 CSV / Excel（分块读库、流式下载，见 export.py） ----------
+EXPORT_LABELS = {'csv': 'CSV', 'xlsx': 'Excel'}
+
+def export_format(args):
+    fmt = args.get('format', 'csv')
+    if fmt not in export.FORMATS:
+        abort(400)
+    return fmt
+
+def export_response(fmt, filename, header, rows, sheet):
+    """不带 Content-Length 的流式下载，按块发出"""
+    return Response(stream_with_context(export.stream(fmt, header, rows, sheet)), mimetype=export.FORMATS[fmt],
+                    headers={'Content-Disposition': export.attachment(f'{filename}.{fmt}')})
+
+@app.route('/query/export')
+def query_export():
+    """与 /query 同样的条件和排序，导出全部命中行"""
+    fmt = export_format(request.args)
+    try:
+        p = query_params(request.args)
+    except ValueError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    idx = year_index(p['year'])
+    pos, prob, keys = query_matches(idx, p['user_score'], p['model'], **p['filters'])
+    order  = page_after(keys)
+    header = list(export.FIELDS.values()) + (['录取概率'] if prob is not None else [])
+    rows   = export.iter_rows(db.engine, admissions.wide, idx.ids[pos[order]],
+                              tail=(prob[order],) if prob is not None else ())
+    return export_response(fmt, f'志愿查询-{idx.year}', header, rows, '志愿查询')
 
 # ---------- 智能分析报告 ----------
+def analysis_top(idx, score, college='', major='', category='', model='score', limit=30):
+    """分数±25 内概率最高的 limit 行：(行位置, 概率)"""
+    # 概率区间 ±25：按科类预排序的平均分上二分取窗口，其余条件只在窗口内过滤
+    pos = idx.score_window(score - 25, score + 25, category)
+    pos = pos[idx.mask(college=college, major=major, pos=pos)]
+    probs = score_probabilities(idx, pos, score, model)
+    # 取概率最高的 limit 个（同概率按 id），部分选择，不全排序
+    top = page_after(((127 - probs.astype(np.int64)) << 32) | idx.ids[pos], limit=limit)
+    return pos[top], probs[top]
+
 @app.route('/analysis')
+@cached_view
 def analysis():
-    score   = int(request.args.get('score', 0))
+    try:
+        score = form_int(request.args, 'score', '高考分数')
+    except ValueError as e:
+        return bs_html(f'<div class="alert alert-danger">{escape(e)}</div>'), 400
     college = request.args.get('college', '')
     major   = request.args.get('major', '')
     category= request.args.get('category', '')
-    q = AdmissionRecord.query
-    if college:  q = q.filter(AdmissionRecord.college_name.contains(college))
-    if major:    q = q.filter(AdmissionRecord.major_name.contains(major))
-    if category: q = q.filter(AdmissionRecord.category == category)
-    records = q.all()
-    # 概率区间 ±25
-    data = []
-    for r in records:
-        p = calc_probability(score, r.min_score, r.avg_score or r.min_score)
-        if (score - 25) <= (r.avg_score or r.min_score or 0) <= (score + 25):
-            data.append({'school': r.college_name, 'prob': p})
-    data = sorted(data, key=lambda x: x['prob'], reverse=True)[:30]
+    model   = request.args.get('model') if request.args.get('model') in PROB_MODELS else 'score'
+    idx = year_index(request.args.get('year'))
+    top, probs = analysis_top(idx, score, college, major, category, model)
+    schools = idx.text('college_name', top).tolist()
+    data = [{'school': s, 'prob': int(p)} for s, p in zip(schools, probs)]
     chart_data = {
         'labels': [d['school'] for d in data],
         'datasets': [{
@@ -278,7 +707,7 @@ def analysis():
     return bs_html(f'''
 <h4>智能分析报告</h4>
 <p>您的分数：<strong>{score}</strong> 分</p>
-<p>分析范围：分数±25 分内的院校</p>
+<p>分析范围：{idx.year} 年分数±25 分内的院校（{PROB_MODELS[model]}）</p>
 <canvas id="probChart" height="100"></canvas>
 <script>
 var ctx = document.getElementById('probChart').getContext('2d');
@@ -288,123 +717,215 @@ new Chart(ctx, {{type: 'bar', data: {chart_data},
 </script>
 <a class="btn btn-secondary" href="/query">返回查询</a>''')
 
-# ---------- 填报指南 ----------
+# ---------- 冲稳保垫志愿方案（见 planner.py） ----------
+def make_plan(idx, args):
+    """按请求参数排志愿表：返回 (行位置, 档位名列表, 概率, 用到的位次)；参数不对抛 ValueError"""
+    score    = form_int(args, 'score', '高考分数')
+    rank     = form_int(args, 'rank', '全省位次')
+    category = args.get('category', '').strip()
+    if category not in ('物理类', '历史类'):
+        raise ValueError('请选择科类')
+    if not score and not rank:
+        raise ValueError('请填写分数或位次')
+    if not rank and args.get('model') in ('rank', 'trend'):
+        rank = get_rank_table(idx).rank(category, score)
+    subjects    = planner.parse_subjects(args['subjects']) if args.get('subjects') else None
+    cities      = {c for c in re.split(r'[,，\s]+', args.get('city', '')) if c}
+    tuition_max = form_int(args, 'tuition_max', '学费上限')
+    per_college = max(form_int(args, 'per_college', '同校最多', planner.PER_COLLEGE), 1)
+    slots = {t: min(max(form_int(args, k, f'{t}档志愿数', planner.DEFAULT_SLOTS[t]), 0), planner.MAX_SLOTS)
+             for t, k in planner.TIER_PARAMS.items()}
+
+    pos = planner.candidates(idx, category, subjects, cities, tuition_max)
+    margin, bands = planner.margins(idx, pos, score, rank)
+    tier = planner.tiers_of(margin, bands)
+    prob = rank_model.rank_probabilities(rank, idx.ints['min_rank'][pos]) if rank \
+        else calc_probabilities(score, *idx.scores(pos))
+    plan = planner.select(idx, pos, tier, prob, slots, per_college)[:planner.MAX_SLOTS]
+    chosen = np.asarray([i for i, _ in plan], dtype=np.int64)
+    return pos[chosen], [planner.TIERS[t] for _, t in plan], prob[chosen], rank
+
+@app.route('/plan')
+@cached_view
+def plan():
+    args = request.args
+    val = lambda k, default='': escape(args.get(k, default))     # 回显进 value="..."，先转义
+    form = f'''
+<h4>冲稳保垫志愿方案</h4>
+<form method="get" class="row g-3 mb-3">
+  <div class="col-md-2"><label>高考分数</label><input type="number" class="form-control" name="score" value="{val('score')}"></div>
+  <div class="col-md-2"><label>全省位次（可选）</label><input type="number" class="form-control" name="rank" value="{val('rank')}"></div>
+  <div class="col-md-2"><label>科类</label>
+      <select class="form-select" name="category"><option{" selected" if val('category')=="物理类" else ""}>物理类</option><option{" selected" if val('category')=="历史类" else ""}>历史类</option></select></div>
+  <div class="col-md-2"><label>再选科目</label><input class="form-control" name="subjects" value="{val('subjects')}" placeholder="如 化生"></div>
+  <div class="col-md-2"><label>意向城市</label><input class="form-control" name="city" value="{val('city')}" placeholder="如 福州,厦门"></div>
+  <div class="col-md-2"><label>学费上限（元）</label><input type="number" class="form-control" name="tuition_max" value="{val('tuition_max')}"></div>
+  {''.join(f'<div class="col-md-1"><label>{t}</label><input type="number" min="0" class="form-control" name="{k}" value="{val(k, planner.DEFAULT_SLOTS[t])}"></div>'
+           for t, k in planner.TIER_PARAMS.items())}
+  <div class="col-md-2"><label>同校最多</label><input type="number" min="1" class="form-control" name="per_college" value="{val('per_college', planner.PER_COLLEGE)}"></div>
+  <div class="col-md-2 align-self-end"><button class="btn btn-primary">生成方案</button></div>
+</form>'''
+    if not args.get('score') and not args.get('rank'):
+        return bs_html(form + '<div class="alert alert-info">填写分数（或位次）和科类后生成；有位次时按位次分档，否则按分差分档</div>')
+    try:
+        idx = year_index(args.get('year'))
+        pos, tiers, probs, rank = make_plan(idx, args)
+    except ValueError as e:
+        return bs_html(form + f'<div class="alert alert-danger">{escape(e)}</div>')
+    if not len(pos):
+        return bs_html(form + '<div class="alert alert-info">没有符合条件的专业，请放宽城市 / 学费 / 选科条件</div>')
+    counts = '，'.join(f'{t} {tiers.count(t)} 个' for t in planner.TIERS)
+    return bs_html(form + f'''
+<p class="text-muted">共 {len(pos)} 个志愿（{counts}），{"按位次 " + str(rank) + " 分档" if rank else "按分差分档"}
+  {''.join(f'<a class="btn btn-sm btn-outline-success ms-2" href="{url_for("plan_export", **{**args.to_dict(), "format": f})}">导出 {t}</a>' for f, t in EXPORT_LABELS.items())}</p>
+<table class="table table-bordered table-sm">
+  <thead class="table-light"><tr><th>#</th><th>档位</th><th>院校</th><th>专业</th><th>选科</th><th>城市</th><th>学费</th><th>最低分</th><th>最低位次</th><th>平均分</th><th>录取概率</th></tr></thead>
+  <tbody>''' + rows_macro('plan_rows', idx.rows(pos), tiers, probs.tolist()) + '''
+</tbody></table>''')
+
+@app.route('/plan/export')
+def plan_export():
+    """导出与 /plan 页面相同的志愿表（序号、档位在前，概率在后）"""
+    fmt = export_format(request.args)
+    try:
+        idx = year_index(request.args.get('year'))
+        pos, tiers, probs, rank = make_plan(idx, request.args)
+    except ValueError as e:
+        return Response(str(e), status=400, mimetype='text/plain')
+    header = ['序号', '档位'] + list(export.FIELDS.values()) + ['录取概率']
+    rows   = export.iter_rows(db.engine, admissions.wide, idx.ids[pos],
+                              lead=(range(1, len(pos) + 1), tiers), tail=(probs,))
+    who    = request.args.get('score') or f"位次{request.args.get('rank')}"
+    return export_response(fmt, f"志愿方案-{request.args.get('category')}-{who}", header, rows, '志愿方案')
+
+# ---------- 填报指南 / 志愿技巧（预渲染 + 预压缩，见 docs_cache.py） ----------
+def doc_page(title):
+    """按角色渲染：导航栏不带用户名，同一角色的所有人共用同一份预压缩的页面"""
+    return lambda txt, role: bs_html(f'<h4>{title}</h4><div class="border p-3">{txt.replace(chr(10), "<br>")}</div><a class="btn btn-secondary mt-3" href="/query">返回</a>',
+                                     nav=navbar(('', role)))
+
+guide_doc = StaticDoc(TXT, doc_page('填报指南'))
+skill_doc = StaticDoc(TIP_FILE, doc_page('志愿填报技巧'))
+
 @app.route('/guide')
 def guide():
-    if not os.path.exists(TXT):
+    page = guide_doc.page(session.get('role'))
+    if page is None:
         return bs_html('<div class="alert alert-warning">暂无填报指南</div>')
-    with open(TXT, encoding='utf-8') as f:
-        txt = f.read().replace('\n', '<br>')
-    return bs_html(f'<h4>填报指南</h4><div class="border p-3">{txt}</div><a class="btn btn-secondary mt-3" href="/query">返回</a>')
+    return page.response(request)
 
 # ---------- 志愿填报技巧 ----------
 @app.route('/skill')
 def skill():
-    if not os.path.exists(TIP_FILE):
+    page = skill_doc.page(session.get('role'))
+    if page is None:
         return bs_html('<div class="alert alert-warning">暂无志愿技巧</div>')
-    with open(TIP_FILE, encoding='utf-8') as f:
-        txt = f.read().replace('\n', '<br>')
-    return bs_html(f'<h4>志愿填报技巧</h4><div class="border p-3">{txt}</div><a class="btn btn-secondary mt-3" href="/query">返回</a>')
+    return page.response(request)
 
-# ---------- 院校库 ----------
+# ---------- 院校库（常驻汇总表，见 summaries.py） ----------
 @app.route('/colleges')
+@cached_view
 def colleges():
     kw = request.args.get('search', '').strip()
-    q = db.session.query(AdmissionRecord.college_name,
-                         AdmissionRecord.college_code,
-                         AdmissionRecord.city,
-                         db.func.count(AdmissionRecord.id).label('cnt'))\
-                  .group_by(AdmissionRecord.college_name)
-    if kw:
-        q = q.filter(AdmissionRecord.college_name.contains(kw))
-    rows = q.all()
+    idx = year_index(request.args.get('year'))
+    rows = idx.summary('college_name').list(idx.matching('college_name', kw) if kw else None)
     return bs_html(f'''
 <h4>院校库</h4>
 <form class="row g-2 mb-3">
-  <div class="col-auto"><input class="form-control" name="search" placeholder="院校名称" value="{kw}"></div>
+  <div class="col-auto"><input class="form-control" name="search" placeholder="院校名称" value="{escape(kw)}"></div>
   <div class="col-auto"><button class="btn btn-primary">搜索</button></div>
 </form>
 <table class="table table-bordered table-sm">
-  <thead class="table-light"><tr><th>院校名称</th><th>院校代码</th><th>所在城市</th><th>招生专业数</th></tr></thead>
-  <tbody>''' + '\n'.join(f'''<tr>
-      <td><a href="/college/{r.college_name}">{r.college_name}</a></td>
-      <td>{r.college_code or ''}</td><td>{r.city or ''}</td><td>{r.cnt}</td>
-    </tr>''' for r in rows) + '''
+  <thead class="table-light"><tr><th>院校名称</th><th>院校代码</th><th>所在城市</th><th>招生专业数</th><th>分数范围</th></tr></thead>
+  <tbody>''' + rows_macro('college_rows', rows) + '''
 </tbody></table>''')
 
 # ---------- 专业库 ----------
 @app.route('/majors')
+@cached_view
 def majors():
     kw = request.args.get('search', '').strip()
-    q = db.session.query(AdmissionRecord.major_name,
-                         AdmissionRecord.major_code,
-                         db.func.count(AdmissionRecord.id).label('cnt'))\
-                  .group_by(AdmissionRecord.major_name)
-    if kw:
-        q = q.filter(AdmissionRecord.major_name.contains(kw))
-    rows = q.all()
+    idx = year_index(request.args.get('year'))
+    rows = idx.summary('major_name').list(idx.matching('major_name', kw) if kw else None)
     return bs_html(f'''
 <h4>专业库</h4>
 <form class="row g-2 mb-3">
-  <div class="col-auto"><input class="form-control" name="search" placeholder="专业名称" value="{kw}"></div>
+  <div class="col-auto"><input class="form-control" name="search" placeholder="专业名称" value="{escape(kw)}"></div>
   <div class="col-auto"><button class="btn btn-primary">搜索</button></div>
 </form>
 <table class="table table-bordered table-sm">
-  <thead class="table-light"><tr><th>专业名称</th><th>专业代码</th><th>开设院校数</th></tr></thead>
-  <tbody>''' + '\n'.join(f'''<tr>
-      <td><a href="/major/{r.major_name}">{r.major_name}</a></td>
-      <td>{r.major_code or ''}</td><td>{r.cnt}</td>
-    </tr>''' for r in rows) + '''
+  <thead class="table-light"><tr><th>专业名称</th><th>专业代码</th><th>开设院校数</th><th>分数范围</th></tr></thead>
+  <tbody>''' + rows_macro('major_rows', rows) + '''
 </tbody></table>''')
 
 # ---------- 院校详情页 ----------
+def detail_entry(kind, name):
+    """(分区, 预算汇总)：取请求年份的；那一年没招生就退到有数据的最近一年，分区也换成那一年的。
+    都没有时汇总为 None"""
+    idx = year_index(request.args.get('year'))
+    store = get_details()
+    d = store.get(kind, name, idx.year) or store.latest(kind, name)
+    if d is not None and d.year != idx.year:
+        idx = year_index(d.year)
+    return idx, d
+
+def detail_view(kind, name):
+    """详情页数据：分区和预算汇总（见 detail_entry，都没有 404）、
+    该年的招生行及每行的近三年趋势；整个过程不查库"""
+    idx, d = detail_entry(kind, name)
+    if d is None:
+        abort(404)
+    pos = np.flatnonzero(idx.texts[details.KINDS[kind][0]].equals(name))
+    cols = {f: idx.column(f, pos) for f in TREND_FIELDS}
+    return idx, d, idx.rows(pos), [dict(zip(cols, t)) for t in zip(*cols.values())]
+
+def detail_stats(d, unit):
+    labels, counts = details.histogram_series(d.histogram)
+    return rows_macro('entity_stats', d, unit, labels, counts)
+
 @app.route('/college/<path:name>')
+@cached_view
 def college_detail(name):
-    c = AdmissionRecord.query.filter_by(college_name=name).first_or_404()
-    # 把同一个学校的所有专业拉出来
-    majors = AdmissionRecord.query.filter_by(college_name=name).all()
+    # 当年这个学校的所有专业 + 预算好的概况
+    idx, d, majors, trend = detail_view('college', name)
     return bs_html(f'''
 <h4>{name} 介绍</h4>
 <div class="card mb-4">
   <div class="card-body">
     <h5>基本信息</h5>
-    <p><strong>院校代码：</strong>{c.college_code or ''}</p>
-    <p><strong>所在城市：</strong>{c.city or ''}</p>
-    <p><strong>院校标签：</strong>{c.college_info or ''}</p>
+    <p><strong>院校代码：</strong>{d.code}</p>
+    <p><strong>所在城市：</strong>{d.city}</p>
+    <p><strong>院校标签：</strong>{d.info}</p>
   </div>
 </div>
-<h5>招生专业（{len(majors)} 个）</h5>
+''' + detail_stats(d, '招生专业') + f'''
+<h5>{idx.year} 年招生专业（{len(majors)} 个）</h5>
 <table class="table table-bordered table-sm">
-  <thead class="table-light"><tr><th>专业</th><th>科类</th><th>选科</th><th>最低分</th><th>平均分</th></tr></thead>
-  <tbody>''' + '\n'.join(f'''<tr>
-      <td><a href="/major/{m.major_name}">{m.major_name}</a></td><td>{m.category}</td><td>{m.requirement}</td>
-      <td>{m.min_score or ''}</td><td>{m.avg_score or ''}</td>
-    </tr>''' for m in majors) + '''
+  <thead class="table-light"><tr><th>专业</th><th>科类</th><th>选科</th><th>最低分</th><th>平均分</th><th>近三年位次趋势</th><th>近三年分数波动</th></tr></thead>
+  <tbody>''' + rows_macro('programme_rows', majors, 'major', trend) + '''
 </tbody></table>
 <a class="btn btn-secondary" href="/colleges">返回院校库</a>''')
 
 # ---------- 专业详情页 ----------
 @app.route('/major/<path:name>')
+@cached_view
 def major_detail(name):
-    m = AdmissionRecord.query.filter_by(major_name=name).first_or_404()
-    # 把开这个专业的所有学校拉出来
-    schools = AdmissionRecord.query.filter_by(major_name=name).all()
+    # 当年开这个专业的所有学校 + 预算好的概况
+    idx, d, schools, trend = detail_view('major', name)
     return bs_html(f'''
 <h4>{name} 介绍</h4>
 <div class="card mb-4">
   <div class="card-body">
     <h5>基本信息</h5>
-    <p><strong>专业代码：</strong>{m.major_code or ''}</p>
-    <p><strong>专业简介：</strong>{m.major_info or ''}</p>
+    <p><strong>专业代码：</strong>{d.code}</p>
+    <p><strong>专业简介：</strong>{d.info}</p>
   </div>
 </div>
-<h5>开设院校（{len(schools)} 所）</h5>
+''' + detail_stats(d, '开设院校') + f'''
+<h5>{idx.year} 年开设院校（{len(schools)} 所）</h5>
 <table class="table table-bordered table-sm">
-  <thead class="table-light"><tr><th>院校</th><th>科类</th><th>选科</th><th>最低分</th><th>平均分</th></tr></thead>
-  <tbody>''' + '\n'.join(f'''<tr>
-      <td><a href="/college/{s.college_name}">{s.college_name}</a></td><td>{s.category}</td><td>{s.requirement}</td>
-      <td>{s.min_score or ''}</td><td>{s.avg_score or ''}</td>
-    </tr>''' for s in schools) + '''
+  <thead class="table-light"><tr><th>院校</th><th>科类</th><th>选科</th><th>最低分</th><th>平均分</th><th>近三年位次趋势</th><th>近三年分数波动</th></tr></thead>
+  <tbody>''' + rows_macro('programme_rows', schools, 'college', trend) + '''
 </tbody></table>
 <a class="btn btn-secondary" href="/majors">返回专业库</a>''')
 
@@ -413,8 +934,11 @@ def major_detail(name):
 def admin_login():
     if request.method == 'POST':
         u, p = request.form['username'], request.form['password']
+        wait = login_wait(u)
+        if wait:
+            return too_many(wait)
         user = User.query.filter_by(username=u, role='admin').first()
-        if user and check_pwd(p, user.password):
+        if verify_login(user, u, p):
             session['username'] = u
             session['role'] = 'admin'
             return redirect('/admin/dashboard')
@@ -452,8 +976,39 @@ def admin_dashboard():
       </div>
     </div>
   </div>
+  <div class="col-md-4">
+    <div class="card">
+      <div class="card-body">
+        <h5 class="card-title">页面耗时</h5>
+        <p class="card-text">本 worker 各页面的平均耗时 / 渲染耗时</p>
+        <a href="/admin/timing" class="btn btn-primary">进入</a>
+      </div>
+    </div>
+  </div>
+  <div class="col-md-4 mt-3">
+    <div class="card">
+      <div class="card-body">
+        <h5 class="card-title">导入新数据</h5>
+        <p class="card-text">上传新一年的专家版 Excel，后台按自然键增量更新</p>
+        <a href="/admin/upload" class="btn btn-primary">进入</a>
+      </div>
+    </div>
+  </div>
 </div>''')
 
+# ---------- 页面耗时（本 worker，重启清零） ----------
+@app.route('/admin/timing')
+def admin_timing():
+    if session.get('role') != 'admin':
+        return redirect('/admin/login')
+    rows = sorted(route_timing.items(), key=lambda kv: -kv[1][1])
+    return bs_html('''
+<h4>页面耗时</h4>
+<table class="table table-bordered table-sm">
+  <thead class="table-light"><tr><th>路由</th><th>次数</th><th>平均耗时 ms</th><th>平均渲染 ms</th><th>最大耗时 ms</th></tr></thead>
+  <tbody>''' + rows_macro('timing_rows', rows) + '''
+</tbody></table>''')
+
 # ---------- 用户管理 ----------
 @app.route('/admin/users')
 def admin_users():
@@ -465,14 +1020,7 @@ def admin_users():
 <a class="btn btn-success mb-3" href="/admin/user/add">+ 添加新用户</a>
 <table class="table table-bordered table-sm">
   <thead class="table-light"><tr><th>ID</th><th>用户名</th><th>角色</th><th>操作</th></tr></thead>
-  <tbody>''' + '\n'.join(f'''
-    <tr>
-      <td>{u.id}</td><td>{u.username}</td><td>{u.role}</td>
-      <td>
-        <a class="btn btn-sm btn-warning" href="/admin/user/edit/{u.id}">编辑</a>
-        <a class="btn btn-sm btn-danger" href="/admin/user/del/{u.id}" onclick="return confirm('确定删除吗？')">删除</a>
-      </td>
-    </tr>''' for u in users) + '''
+  <tbody>''' + rows_macro('user_rows', users) + '''
 </tbody></table>''')
 
 @app.route('/admin/user/add', methods=['GET', 'POST'])
@@ -529,30 +1077,28 @@ def admin_data():
     if session.get('role') != 'admin':
         return redirect('/admin/login')
     keyword = request.args.get('search', '')
-    page = int(request.args.get('page', 1))
+    try:
+        page = form_int(request.args, 'page', '页码', 1)
+    except ValueError as e:
+        return bs_html(f'<div class="alert alert-danger">{escape(e)}</div>'), 400
     q = AdmissionRecord.query
     if keyword:
-        q = q.filter(AdmissionRecord.college_name.contains(keyword))
+        q = q.filter(AdmissionRecord.college_id.in_(
+            db.select(College.id).where(College.name.in_(get_index().matching('college_name', keyword)))))
     records = q.paginate(page=page, per_page=20, error_out=False)
     return bs_html(f'''
 <h4>录取数据管理</h4>
 <form class="row g-2 mb-3">
-  <div class="col-auto"><input class="form-control" name="search" placeholder="院校名称" value="{keyword}"></div>
+  <div class="col-auto"><input class="form-control" name="search" placeholder="院校名称" value="{escape(keyword)}"></div>
   <div class="col-auto"><button class="btn btn-primary">搜索</button></div>
 </form>
 <a class="btn btn-success mb-3" href="/admin/data/add">+ 新增数据</a>
+<a class="btn btn-outline-primary mb-3 ms-2" href="/admin/upload">批量导入 Excel</a>
 <table class="table table-bordered table-sm">
   <thead class="table-light"><tr>
     <th>ID</th><th>院校</th><th>专业</th><th>科类</th><th>最低分</th><th>操作</th>
   </tr></thead>
-  <tbody>''' + '\n'.join(f'''
-    <tr>
-      <td>{r.id}</td><td>{r.college_name}</td><td>{r.major_name}</td><td>{r.category}</td><td>{r.min_score or ""}</td>
-      <td>
-        <a class="btn btn-sm btn-warning" href="/admin/data/edit/{r.id}">编辑</a>
-        <a class="btn btn-sm btn-danger" href="/admin/data/del/{r.id}" onclick="return confirm('确定删除吗？')">删除</a>
-      </td>
-    </tr>''' for r in records.items) + f'''
+  <tbody>''' + rows_macro('admin_data_rows', records.items) + f'''
 </tbody></table>
 <nav><ul class="pagination">
   <li class="page-item {"disabled" if not records.has_prev else ""}">
@@ -563,24 +1109,28 @@ def admin_data():
   </li>
 </ul></nav>''')
 
+def record_form(f):
+    """新增 / 编辑表单 -> 宽表字段（分数、位次留空为 None）；分数、位次不是整数抛 ValueError"""
+    return {k: form_int(f, k, export.FIELDS[k], None) if k in ingest.INT_FIELDS else f[k] for k in ingest.RECORD_FIELDS}
+
+def record_form_error(e):
+    return bs_html(f'<div class="alert alert-danger">{escape(e)}</div>'
+                   '<a class="btn btn-secondary" href="javascript:history.back()">返回修改</a>'), 400
+
 @app.route('/admin/data/add', methods=['GET', 'POST'])
 def admin_data_add():
     if session.get('role') != 'admin':
         return redirect('/admin/login')
     if request.method == 'POST':
-        f = request.form
-        r = AdmissionRecord(
-            year=f['year'], batch=f['batch'], category=f['category'], requirement=f['requirement'],
-            college_name=f['college_name'], college_code=f['college_code'], college_info=f['college_info'],
-            major_name=f['major_name'], major_code=f['major_code'], major_info=f['major_info'],
-            min_score=int(f['min_score']) if f['min_score'] else None,
-            min_rank=int(f['min_rank']) if f['min_rank'] else None,
-            avg_score=int(f['avg_score']) if f['avg_score'] else None,
-            max_score=int(f['max_score']) if f['max_score'] else None,
-            tuition=f['tuition'], city=f['city']
-        )
+        try:
+            fields = record_form(request.form)
+        except ValueError as e:
+            return record_form_error(e)
+        r = AdmissionRecord().assign(**fields)
         db.session.add(r)
         db.session.commit()
+        refresh_derived([r.college_name], [r.major_name])
+        index_changed(lambda idx, v: idx.with_row(r, v).with_trends(load_trends()))
         return redirect('/admin/data')
     return bs_html('''
 <h4>新增录取数据</h4>
@@ -612,16 +1162,17 @@ def admin_data_edit(rid):
         return redirect('/admin/login')
     r = AdmissionRecord.query.get_or_404(rid)
     if request.method == 'POST':
-        f = request.form
-        r.year        = f['year']; r.batch     = f['batch']; r.category  = f['category']; r.requirement = f['requirement']
-        r.college_name= f['college_name']; r.college_code = f['college_code']; r.college_info = f['college_info']
-        r.major_name  = f['major_name']; r.major_code   = f['major_code'];   r.major_info   = f['major_info']
-        r.min_score   = int(f['min_score']) if f['min_score'] else None
-        r.min_rank    = int(f['min_rank'])  if f['min_rank']  else None
-        r.avg_score   = int(f['avg_score']) if f['avg_score'] else None
-        r.max_score   = int(f['max_score']) if f['max_score'] else None
-        r.tuition     = f['tuition']; r.city = f['city']
+        try:
+            fields = record_form(request.form)
+        except ValueError as e:
+            return record_form_error(e)
+        old_names = (r.college_name, r.major_name)
+        r.assign(**fields)
+        db.session.flush()
+        admissions.prune(db.session.connection())   # 改名后旧的院校 / 专业取值没人引用了就删掉
         db.session.commit()
+        refresh_derived([old_names[0], r.college_name], [old_names[1], r.major_name])
+        index_changed(lambda idx, v: idx.with_row(r, v).with_trends(load_trends()))
         return redirect('/admin/data')
     return bs_html(f'''
 <h4>编辑数据</h4>
@@ -651,11 +1202,229 @@ def admin_data_edit(rid):
 def admin_data_del(rid):
     if session.get('role') != 'admin':
         return redirect('/admin/login')
+    w = admissions.wide
+    row = db.session.execute(db.select(w.c.college_name, w.c.major_name).where(w.c.id == rid)).first()
     AdmissionRecord.query.filter_by(id=rid).delete()
+    admissions.prune(db.session.connection())
     db.session.commit()
+    refresh_derived(*(([row.college_name], [row.major_name]) if row else ([], [])))
+    index_changed(lambda idx, v: idx.without(rid, v).with_trends(load_trends()))
     return redirect('/admin/data')
 
-# ==================== 8. 启动（仅本地） ====================
+# ---------- 批量导入 Excel（后台 upsert，见 upsert.py） ----------
+def run_upload(job, path):
+    """后台线程：解析 -> 比对（都在写库之前，不占写锁）-> 分批写暂存表 -> 一个事务发布
+    -> bump 版本号并重建本进程索引；失败时正式表不变、不 bump"""
+    try:
+        with app.app_context():
+            job.update(stage='parsing')
+            incoming = ingest.normalize(ingest.read_workbook(path))
+            job.update(stage='diffing')
+            fields = ('id',) + ingest.RECORD_FIELDS
+            rows = db.session.execute(db.select(*(admissions.wide.c[f] for f in fields))).all()
+            existing = pd.DataFrame(rows, columns=list(fields))
+            inserts, updates, stats = upsert.diff(existing, incoming)
+            job.update(stage='writing', total=len(inserts) + len(updates), stats=stats)
+            if len(inserts) or len(updates):
+                upsert.apply(db.engine, admissions, inserts, updates, batch_size=app.config['IMPORT_BATCH_SIZE'],
+                             progress=lambda done, _: job.update(done=done),
+                             on_publish=lambda: job.update(stage='publishing'))
+                refresh_derived()
+                # 发布提交之后才换版本号：之前的请求一直读旧索引，之后整体切到新数据
+                data_version.bump()
+                get_index()
+            job.update(stage='done')
+    finally:
+        os.remove(path)
+
+@app.route('/admin/upload', methods=['GET', 'POST'])
+def admin_upload():
+    if session.get('role') != 'admin':
+        return redirect('/admin/login')
+    if request.method == 'POST':
+        f = request.files.get('file')
+        if not f or not f.filename.lower().endswith('.xlsx'):
+            return bs_html('<div class="alert alert-danger">请选择 .xlsx 文件</div><a class="btn btn-secondary" href="/admin/upload">返回</a>')
+        job = upsert.claim(UPLOAD_STATE, f.filename)     # 已有任务在跑（哪个 worker 上的都算）就不再开
+        if job is None:
+            return redirect('/admin/upload/status')
+        try:
+            fd, path = tempfile.mkstemp(suffix='.xlsx', dir=os.path.dirname(DB_FILE) or None)
+            with os.fdopen(fd, 'wb') as out:
+                f.save(out)
+        except Exception as e:
+            job.update(stage='failed', error=f'{type(e).__name__}: {e}')
+            raise
+        job.start(lambda job: run_upload(job, path))
+        return redirect('/admin/upload/status')
+    return bs_html(f'''
+<h4>批量导入 Excel</h4>
+<p class="text-muted">表格格式同专家版（第 3 行是表头）。按 年份+科类+院校代码+专业代码 比对：新行插入、有变化的行更新，库里其余数据不动。
+导入在后台进行，先分批写进暂存表，最后一次性发布：完成前查询页面照常使用旧数据，失败则数据保持原样。</p>
+<form method="post" enctype="multipart/form-data" class="mb-3">
+  <input type="file" class="form-control mb-2" name="file" accept=".xlsx" required>
+  <button class="btn btn-primary">上传并导入</button>
+</form>
+{'<a href="/admin/upload/status">查看最近一次导入</a>' if upsert.current(UPLOAD_STATE) else ''}''')
+
+@app.route('/admin/upload/status')
+def admin_upload_status():
+    if session.get('role') != 'admin':
+        return redirect('/admin/login')
+    state = upsert.current(UPLOAD_STATE)
+    if state is None:
+        return redirect('/admin/upload')
+    alive = upsert.running(UPLOAD_STATE)
+    pct = state['done'] * 100 // state['total'] if state['total'] else (100 if state['stage'] == 'done' else 0)
+    stats = state['stats']
+    return bs_html(f'''
+<h4>导入进度：{state['file']}</h4>
+<p>阶段：<strong>{upsert.STAGES.get(state['stage'], state['stage'])}</strong>（{time.strftime('%H:%M:%S', time.localtime(state['started']))} 开始）</p>
+<div class="progress mb-3"><div class="progress-bar" style="width: {pct}%">{state['done']}/{state['total']}</div></div>
+{f"<p>表中 {stats['total']} 条：新增 {stats['inserted']}，更新 {stats['updated']}，未变 {stats['unchanged']}，重复 {stats['duplicates']}</p>" if stats else ''}
+{f'<div class="alert alert-danger">{state["error"]}</div>' if state['error'] else ''}
+{'<script>setTimeout(function () { location.reload(); }, 1000);</script>' if alive else ''}
+{'' if state['stage'] not in ('done', 'failed') else '<a class="btn btn-primary" href="/admin/upload">再导入一份</a> <a class="btn btn-secondary" href="/admin/data">返回数据管理</a>'}
+{'<p class="text-warning">任务长时间没有进度，可能已中断，可重新上传</p>' if not alive and state['stage'] not in ('done', 'failed') else ''}''')
+
+# ==================== 8. JSON API（小程序用，v1） ====================
+"""
+与 HTML 路由共用同一套过滤、概率和排序，只是不出页面：
+- fields=college_name,major_name,probability  只返回这些字段（默认见各接口）
+- format=columns  按列返回 {"字段": [值, ...]}，不再每行一个对象
+- /api/v1/query 用游标分页：把上次返回的 next 作为 after 传回来
+- year=2024 查某一年（默认最新一年），返回里的 year 是实际用的年份
+"""
+API_FIELDS = INDEX_FIELDS + TREND_FIELDS + ('probability',)
+API_QUERY_FIELDS  = ('id', 'college_name', 'major_name', 'category', 'requirement', 'min_score', 'avg_score', 'probability')
+API_DETAIL_FIELDS = ('id', 'college_name', 'major_name', 'category', 'requirement', 'min_score', 'min_rank', 'avg_score', 'max_score',
+                     'trend_years', 'rank_drift', 'score_volatility')
+API_ANALYSIS_MAX  = 200
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+@app.errorhandler(ApiError)
+def _api_error(e):
+    return jsonify({'error': str(e)}), e.status
+
+def api_fields(default):
+    """解析 fields= 参数；未知字段报 400"""
+    raw = request.args.get('fields', '')
+    if not raw:
+        return default
+    fields = [f.strip() for f in raw.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in API_FIELDS]
+    if unknown:
+        raise ApiError(f'未知字段: {",".join(unknown)}；可选: {",".join(API_FIELDS)}')
+    return fields
+
+def api_int(name, default=0):
+    try:
+        return int(request.args.get(name) or default)
+    except ValueError:
+        raise ApiError(f'{name} 必须是整数')
+
+def api_rows(idx, pos, fields, prob=None):
+    """按字段投影：format=columns 返回 {字段: 列}，否则返回每行一个对象"""
+    cols = {f: ([None] * len(pos) if prob is None else prob.tolist()) if f == 'probability'
+               else idx.column(f, pos) for f in fields}
+    if request.args.get('format') == 'columns':
+        return {'columns': cols}
+    return {'rows': [dict(zip(fields, r)) for r in zip(*cols.values())]}
+
+@app.route('/api/v1/query')
+@cached_view
+def api_query():
+    try:
+        p = query_params(request.args)
+    except ValueError as e:
+        raise ApiError(str(e))
+    fields = api_fields(API_QUERY_FIELDS)
+    idx = year_index(p['year'])
+    pos, prob, keys = query_matches(idx, p['user_score'], p['model'], **p['filters'])
+    order = page_after(keys, p['after'], p['page_size'])
+    more = len(order) == p['page_size'] and bool((keys > keys[order[-1]]).any())
+    return jsonify(version=idx.version, year=idx.year, total=len(pos), page_size=p['page_size'], fields=list(fields),
+                   next=str(keys[order[-1]]) if more else None,
+                   **api_rows(idx, pos[order], fields, None if prob is None else prob[order]))
+
+@app.route('/api/v1/analysis')
+@cached_view
+def api_analysis():
+    score = api_int('score')
+    if not score:
+        raise ApiError('缺少 score')
+    limit = min(max(api_int('limit', 30), 1), API_ANALYSIS_MAX)
+    model = request.args.get('model') if request.args.get('model') in PROB_MODELS else 'score'
+    fields = api_fields(('college_name', 'major_name', 'avg_score', 'probability'))
+    idx = year_index(request.args.get('year'))
+    top, probs = analysis_top(idx, score, request.args.get('college', ''), request.args.get('major', ''),
+                              request.args.get('category', ''), model, limit)
+    return jsonify(version=idx.version, year=idx.year, score=score, model=model, fields=list(fields),
+                   **api_rows(idx, top, fields, probs))
+
+def api_entity(kind, name):
+    """院校 / 专业：预算汇总（见 details.py）+ 基本信息 + 该年全部招生行。
+    与详情页一样，请求的年份没有招生就退到有数据的最近一年，year 字段是实际返回的年份"""
+    idx, d = detail_entry(kind, name)
+    if d is None:
+        raise ApiError(f'{name} 不存在', 404)
+    fields = api_fields(API_DETAIL_FIELDS)
+    name_field, _, city_field, info_field = details.KINDS[kind]
+    info = {city_field: d.city or None} if city_field else {}
+    info[info_field] = d.info or None
+    pos = np.flatnonzero(idx.texts[name_field].equals(name))
+    return jsonify(version=idx.version, year=idx.year, name=name, code=d.code or None, count=d.programmes,
+                   by_category=d.by_category, min_score=d.min_score, avg_score=d.avg_score, max_score=d.max_score,
+                   min_rank=d.min_rank, max_rank=d.max_rank, histogram=d.histogram, **info,
+                   fields=list(fields), **api_rows(idx, pos, fields))
+
+SUGGEST_FIELDS = {'college': 'college_name', 'major': 'major_name'}
+
+@app.route('/api/v1/suggest')
+def api_suggest():
+    """输入联想：q 为名称 / 全拼 / 拼音首字母的前缀，按招生数排序。
+    不走页面缓存：键太分散会把缓存里的大页面挤掉，本身也不到 1 毫秒"""
+    field = SUGGEST_FIELDS.get(request.args.get('field', 'college'))
+    if field is None:
+        raise ApiError(f'field 只能是 {" / ".join(SUGGEST_FIELDS)}')
+    limit = min(max(api_int('limit', suggest.LIMIT), 1), suggest.MAX_LIMIT)
+    q = request.args.get('q', '')
+    idx = year_index(request.args.get('year'))
+    items = get_suggester(idx, field).search(q, limit)
+    return jsonify(version=idx.version, year=idx.year, q=q, items=[{'name': n, 'count': c} for n, c in items])
+
+@app.route('/api/v1/plan')
+@cached_view
+def api_plan():
+    fields = api_fields(('college_name', 'major_name', 'requirement', 'city', 'tuition', 'avg_score', 'probability'))
+    idx = year_index(request.args.get('year'))
+    try:
+        pos, tiers, probs, rank = make_plan(idx, request.args)
+    except ValueError as e:
+        raise ApiError(str(e))
+    body = api_rows(idx, pos, fields, probs)
+    if 'columns' in body:
+        body['columns']['tier'] = tiers
+    else:
+        for row, t in zip(body['rows'], tiers):
+            row['tier'] = t
+    return jsonify(version=idx.version, year=idx.year, rank=rank or None, fields=list(fields) + ['tier'], **body)
+
+@app.route('/api/v1/college/<path:name>')
+@cached_view
+def api_college(name):
+    return api_entity('college', name)
+
+@app.route('/api/v1/major/<path:name>')
+@cached_view
+def api_major(name):
+    return api_entity('major', name)
+
+# ==================== 9. 启动（仅本地） ====================
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,54 @@
+# ==================== 子串搜索：字符 1/2-gram 倒排索引 ====================
+"""
+院校名、专业名、选科要求的“包含”搜索。
+
+倒排表建在去重后的字符串上（几百到几千个），单字查询直接取 1-gram 倒排，
+多字查询取各 2-gram 倒排求交，再用 in 复核，结果与 SQL 的 LIKE '%kw%' 完全一致：
+ASCII 字母不区分大小写，kw 里的 % / _ 仍按通配符处理（这种少见情况走正则全扫）。
+"""
+import re
+import numpy as np
+
+# SQLite 的 LIKE 只对 ASCII 字母不区分大小写
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+_EMPTY = np.zeros(0, dtype=np.int32)
+
+
+def like_fold(s):
+    return s.translate(_ASCII_LOWER)
+
+
+def like_regex(needle):
+    """LIKE '%needle%' -> 正则（% 任意串，_ 任意单字符）"""
+    parts = ['.*' if ch == '%' else '.' if ch == '_' else re.escape(ch) for ch in like_fold(needle)]
+    return re.compile(''.join(parts), re.S)
+
+
+class NgramIndex:
+    def __init__(self, values):
+        self.folded = [like_fold(v) for v in values]
+        grams = {}
+        for i, v in enumerate(self.folded):
+            for g in set(v) | {v[k:k + 2] for k in range(len(v) - 1)}:
+                grams.setdefault(g, []).append(i)
+        self.postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in grams.items()}
+
+    def search(self, needle):
+        """包含 needle 的字符串下标（升序）"""
+        if not needle:
+            return np.arange(len(self.folded), dtype=np.int32)
+        if '%' in needle or '_' in needle:
+            pat = like_regex(needle)
+            return np.asarray([i for i, v in enumerate(self.folded) if pat.search(v)], dtype=np.int32)
+        needle = like_fold(needle)
+        if len(needle) == 1:
+            return self.postings.get(needle, _EMPTY)
+        lists = sorted((self.postings.get(needle[k:k + 2], _EMPTY) for k in range(len(needle) - 1)), key=len)
+        cand = lists[0]
+        for ids in lists[1:]:
+            if not len(cand):
+                break
+            cand = np.intersect1d(cand, ids, assume_unique=True)
+        if len(needle) == 2:
+            return cand
+        return np.asarray([i for i in cand.tolist() if needle in self.folded[i]], dtype=np.int32)
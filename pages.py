@@ -0,0 +1,196 @@
+# ==================== 页面模板（启动时编译一次） ====================
+"""
+原来 bs_html() 把整页拼好再 render_template_string，每个响应都要 Jinja 重新解析编译。
+现在：
+- 外壳（head / 尾部）是固定字符串，导航栏按登录状态渲染一次后缓存
+- 表格行走 rows.html 里的宏，模板在启动时编译好，数据只做转义填充
+正文不再经过模板引擎，用户输入也就不会被当成模板语法执行。
+"""
+
+SHELL_HEAD = '''
+<!doctype html><html lang="zh">
+<head><meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
+<title>福建高考志愿系统</title>
+<link href="https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css" rel="stylesheet">
+<script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+</head>
+<body class="bg-light">
+'''
+CONTAINER_OPEN = '<div class="container mt-4">'
+SHELL_TAIL = '''</div>
+</body></html>'''
+
+# 输入联想：带 data-suggest="college|major" 的输入框，停顿 120ms 后查 /api/v1/suggest，下拉里点选填入
+SUGGEST_SCRIPT = '''
+<script>
+document.querySelectorAll('input[data-suggest]').forEach(function (input) {
+  var box = document.createElement('div'), timer;
+  box.className = 'list-group position-absolute shadow-sm';
+  box.style.zIndex = 1000;
+  input.after(box);
+  input.addEventListener('input', function () {
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var q = input.value.trim(), year = input.form.elements.year;
+      if (!q) { box.innerHTML = ''; return; }
+      fetch('/api/v1/suggest?field=' + input.dataset.suggest + '&q=' + encodeURIComponent(q) +
+            (year ? '&year=' + encodeURIComponent(year.value) : ''))
+        .then(function (r) { return r.json(); })
+        .then(function (d) {
+          if (input.value.trim() !== q) return;          // 返回前又改了，丢掉旧结果
+          box.innerHTML = '';
+          (d.items || []).forEach(function (it) {
+            var item = document.createElement('button');
+            item.type = 'button';
+            item.className = 'list-group-item list-group-item-action py-1';
+            item.textContent = it.name + '（' + it.count + '）';
+            item.onmousedown = function (e) { e.preventDefault(); input.value = it.name; box.innerHTML = ''; };
+            box.appendChild(item);
+          });
+        });
+    }, 120);
+  });
+  input.addEventListener('blur', function () { box.innerHTML = ''; });
+});
+</script>'''
+
+TEMPLATES = {
+    'navbar.html': '''<nav class="navbar navbar-dark bg-primary">
+  <div class="container-fluid">
+    <a class="navbar-brand" href="/">福建高考志愿系统</a>
+    <div>
+      {% if role %}
+        <span class="text-white me-3" id="nav-user">{{ username ~ ' (' ~ role ~ ')' if username }}</span>
+        <a class="btn btn-sm btn-outline-light" href="/logout">退出</a>
+        {%- if not username %}
+        <script>fetch('/whoami').then(r => r.json()).then(u => { if (u.username) document.getElementById('nav-user').textContent = `${u.username} (${u.role})`; });</script>
+        {%- endif %}
+      {% else %}
+        <a class="btn btn-sm btn-outline-light" href="/login">登录</a>
+      {% endif %}
+      <a class="btn btn-sm btn-outline-light ms-2" href="/colleges">院校库</a>
+      <a class="btn btn-sm btn-outline-light ms-2" href="/majors">专业库</a>
+      <a class="btn btn-sm btn-outline-light ms-2" href="/skill">填报技巧</a>
+    </div>
+  </div>
+</nav>
+''',
+
+    'rows.html': '''
+{%- macro prob_badge(p) -%}
+<span class="badge {{ 'bg-success' if (p or 0) > 80 else 'bg-warning' if (p or 0) > 40 else 'bg-danger' }}">{{ '-' if p is none else p }}%</span>
+{%- endmacro %}
+
+{%- macro query_rows(rows, probs) -%}
+{% for r in rows %}
+        <tr>
+          <td><a href="/college/{{ r.college_name }}">{{ r.college_name }}</a></td>
+          <td><a href="/major/{{ r.major_name }}">{{ r.major_name }}</a></td>
+          <td>{{ r.category }}</td><td>{{ r.min_score or '' }}</td><td>{{ r.avg_score or '' }}</td>
+          <td>{{ prob_badge(probs[loop.index0]) }}</td>
+        </tr>
+{%- endfor %}
+{%- endmacro %}
+
+{%- macro score_range(s) -%}
+{{ s.min_score or '' }}{{ '~' if s.min_score or s.max_score else '' }}{{ s.max_score or '' }}
+{%- endmacro %}
+
+{%- macro college_rows(rows) -%}
+{% for r in rows %}<tr>
+      <td><a href="/college/{{ r.name }}">{{ r.name }}</a></td>
+      <td>{{ r.code or '' }}</td><td>{{ r.city or '' }}</td><td>{{ r.count }}</td>
+      <td>{{ score_range(r) }}</td>
+    </tr>
+{% endfor %}
+{%- endmacro %}
+
+{%- macro major_rows(rows) -%}
+{% for r in rows %}<tr>
+      <td><a href="/major/{{ r.name }}">{{ r.name }}</a></td>
+      <td>{{ r.code or '' }}</td><td>{{ r.count }}</td>
+      <td>{{ score_range(r) }}</td>
+    </tr>
+{% endfor %}
+{%- endmacro %}
+
+{#- 趋势：位次每年变化（正数 = 越来越好进）、近三年最低分标准差；没有为 - #}
+{%- macro trend_cells(t) -%}
+<td>{% if t.rank_drift is none %}-{% else %}<span class="{{ 'text-success' if t.rank_drift > 0 else 'text-danger' if t.rank_drift < 0 else '' }}">{{ '%+d' % t.rank_drift }}/年</span>{% endif %}</td>
+      <td>{{ '-' if t.score_volatility is none else '±%.1f' % t.score_volatility }}</td>
+{%- endmacro %}
+
+{#- 详情页的招生专业 / 开设院校表：link 为 'major' 或 'college'，trends 与 rows 一一对应 #}
+{%- macro programme_rows(rows, link, trends) -%}
+{% for r in rows %}{% set name = r.major_name if link == 'major' else r.college_name %}<tr>
+      <td><a href="/{{ link }}/{{ name }}">{{ name }}</a></td><td>{{ r.category }}</td><td>{{ r.requirement }}</td>
+      <td>{{ r.min_score or '' }}</td><td>{{ r.avg_score or '' }}</td>
+      {{ trend_cells(trends[loop.index0]) }}
+    </tr>
+{% endfor %}
+{%- endmacro %}
+
+{#- 详情页概况卡片：d 为 details.Detail，unit 为“招生专业”/“开设院校”，labels / counts 为最低分分布 #}
+{%- macro entity_stats(d, unit, labels, counts) -%}
+<div class="card mb-4">
+  <div class="card-body">
+    <h5>{{ d.year }} 年概况</h5>
+    <p><strong>{{ unit }}：</strong>{{ d.programmes }} 个{% for c, n in d.by_category.items() %}　{{ c }} {{ n }}{% endfor %}</p>
+    <p><strong>最低分：</strong>{{ d.min_score or '-' }}　<strong>平均分：</strong>{{ d.avg_score or '-' }}　<strong>最高分：</strong>{{ d.max_score or '-' }}</p>
+    <p><strong>最低位次：</strong>{{ d.min_rank or '' }}{{ '~' if d.min_rank else '-' }}{{ d.max_rank or '' }}</p>
+{%- if labels %}
+    <canvas id="scoreHist" height="70"></canvas>
+    <script>
+new Chart(document.getElementById('scoreHist').getContext('2d'), {type: 'bar',
+  data: {labels: {{ labels|tojson }}, datasets: [{label: '最低分分布（{{ unit }}数）', data: {{ counts|tojson }}, backgroundColor: '#0d6efd'}]},
+  options: {plugins: {legend: {display: false}}}});
+    </script>
+{%- endif %}
+  </div>
+</div>
+{%- endmacro %}
+
+{%- macro plan_rows(rows, tiers, probs) -%}
+{% for r in rows %}
+        <tr class="{{ {'冲': 'table-danger', '稳': 'table-warning', '保': 'table-success', '垫': 'table-info'}[tiers[loop.index0]] }}">
+          <td>{{ loop.index }}</td><td>{{ tiers[loop.index0] }}</td>
+          <td><a href="/college/{{ r.college_name }}">{{ r.college_name }}</a></td>
+          <td><a href="/major/{{ r.major_name }}">{{ r.major_name }}</a></td>
+          <td>{{ r.requirement }}</td><td>{{ r.city }}</td><td>{{ r.tuition }}</td>
+          <td>{{ r.min_score or '' }}</td><td>{{ r.min_rank or '' }}</td><td>{{ r.avg_score or '' }}</td>
+          <td>{{ prob_badge(probs[loop.index0]) }}</td>
+        </tr>
+{%- endfor %}
+{%- endmacro %}
+
+{%- macro user_rows(users) -%}
+{% for u in users %}
+    <tr>
+      <td>{{ u.id }}</td><td>{{ u.username }}</td><td>{{ u.role }}</td>
+      <td>
+        <a class="btn btn-sm btn-warning" href="/admin/user/edit/{{ u.id }}">编辑</a>
+        <a class="btn btn-sm btn-danger" href="/admin/user/del/{{ u.id }}" onclick="return confirm('确定删除吗？')">删除</a>
+      </td>
+    </tr>
+{%- endfor %}
+{%- endmacro %}
+
+{%- macro admin_data_rows(rows) -%}
+{% for r in rows %}
+    <tr>
+      <td>{{ r.id }}</td><td>{{ r.college_name }}</td><td>{{ r.major_name }}</td><td>{{ r.category }}</td><td>{{ r.min_score or '' }}</td>
+      <td>
+        <a class="btn btn-sm btn-warning" href="/admin/data/edit/{{ r.id }}">编辑</a>
+        <a class="btn btn-sm btn-danger" href="/admin/data/del/{{ r.id }}" onclick="return confirm('确定删除吗？')">删除</a>
+      </td>
+    </tr>
+{%- endfor %}
+{%- endmacro %}
+
+{%- macro timing_rows(rows) -%}
+{% for endpoint, (n, total, render, worst) in rows %}
+    <tr><td>{{ endpoint }}</td><td>{{ n }}</td><td>{{ '%.2f' % (total / n) }}</td><td>{{ '%.2f' % (render / n) }}</td><td>{{ '%.2f' % worst }}</td></tr>
+{%- endfor %}
+{%- endmacro %}
+''',
+}
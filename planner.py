@@ -0,0 +1,100 @@
+# ==================== 冲 / 稳 / 保 / 垫 志愿方案 ====================
+"""
+按填报指南的“四字诀”自动排一张完整志愿表：
+
+1. 候选过滤（整列）：科类、选科要求、城市、学费上限。选科要求和学费都是
+   字典编码列，只对去重后的取值判断一次，再按 codes 展开成掩码。
+2. 分档：有位次用 min_rank / 考生位次，没有就用 考生分数 - 平均分，落到 TIERS 的区间里。
+3. 贪心挑选：每档按“概率↓、平均分↓、id↑”排好，依次取，同一院校最多 per_college 个；
+   某档凑不满，空位顺延给下一档（更稳的一档），最后按 冲→稳→保→垫 输出。
+"""
+import re
+import numpy as np
+from admission_index import order_keys
+
+TIERS         = ('冲', '稳', '保', '垫')
+TIER_PARAMS   = {'冲': 'chong', '稳': 'wen', '保': 'bao', '垫': 'dian'}   # 每档志愿数的请求参数名
+DEFAULT_SLOTS = {'冲': 8, '稳': 20, '保': 8, '垫': 4}   # 指南：冲 10-20%、稳 40-50%、保 15-20%、垫 10% 左右
+PER_COLLEGE   = 3                                       # 同一院校最多填几个专业
+MAX_SLOTS     = 96                                      # 福建本科批最多 96 个志愿
+
+# 每档的下限（含）/ 上限（不含），None 表示不封顶
+SCORE_BANDS = ((-25, 0), (0, 15), (15, 40), (40, None))        # 考生分数 - 平均分
+RANK_BANDS  = ((0.8, 1.0), (1.0, 1.2), (1.2, 1.6), (1.6, None))  # min_rank / 考生位次
+
+SUBJECTS = '化生地政'                 # 再选科目（首选物理/历史由科类决定）
+
+
+def parse_subjects(text):
+    """'化,生' / '化学 生物' / '化生' -> {'化', '生'}"""
+    return {c for c in (text or '') if c in SUBJECTS}
+
+
+def requirement_ok(requirement, subjects):
+    """选科要求是否满足：'不限'；'化'；'化且生' 全都要；'化或生' 任一即可"""
+    if not requirement or requirement == '不限':
+        return True
+    if '或' in requirement or '/' in requirement:
+        return any(requirement_ok(r, subjects) for r in re.split('[或/]', requirement))
+    return all(c in subjects for c in requirement if c in SUBJECTS)
+
+
+def parse_tuition(text):
+    """学费文本 -> 元；'501O' 这类录入错误按 O=0 处理，解析不了返回 None"""
+    m = re.search(r'\d+', (text or '').replace('O', '0').replace('o', '0'))
+    return int(m.group()) if m else None
+
+
+def _value_mask(col, test):
+    """字典列上按取值判断一次，再按 codes 展开成行掩码"""
+    return np.fromiter((bool(test(v)) for v in col.values), dtype=bool, count=len(col.values))[col.codes]
+
+
+def candidates(idx, category, subjects=None, cities=None, tuition_max=None):
+    """满足硬条件的行位置；subjects 为 None 表示不按选科过滤"""
+    m = idx.texts['category'].equals(category)
+    if subjects is not None:
+        m &= _value_mask(idx.texts['requirement'], lambda r: requirement_ok(r, subjects))
+    if cities:
+        m &= _value_mask(idx.texts['city'], lambda c: c in cities)
+    if tuition_max:
+        # 学费没填 / 解析不了的不排除
+        m &= _value_mask(idx.texts['tuition'], lambda t: (parse_tuition(t) or 0) <= tuition_max)
+    return np.flatnonzero(m)
+
+
+def margins(idx, pos, score=0, rank=0):
+    """(余量, 分档区间)：有位次按位次比，否则按分差；没有对应数据的行为 NaN"""
+    if rank:
+        min_rank = idx.ints['min_rank'][pos]
+        return np.where(min_rank > 0, min_rank / rank, np.nan), RANK_BANDS
+    avg = idx.scores(pos)[1]
+    return np.where(avg > 0, score - avg.astype(np.float64), np.nan), SCORE_BANDS
+
+
+def tiers_of(margin, bands):
+    """每行所属档位下标，不在任何一档为 -1"""
+    conds = [(margin >= lo) & (True if hi is None else margin < hi) for lo, hi in bands]
+    return np.select(conds, np.arange(len(bands)), -1)
+
+
+def select(idx, pos, tier, prob, slots, per_college=PER_COLLEGE):
+    """贪心：返回 [(pos 里的下标, 档位下标), ...]，按 冲→稳→保→垫、档内按排序键"""
+    colleges = idx.texts['college_name'].codes[pos]
+    keys = order_keys(prob, idx.scores(pos)[1], idx.ids[pos])
+    used, plan, carry = {}, [], 0
+    for t, name in enumerate(TIERS):
+        want = slots.get(name, 0) + carry
+        got = 0
+        cand = np.flatnonzero(tier == t)
+        for i in cand[np.argsort(keys[cand])].tolist():
+            if got >= want:
+                break
+            c = colleges[i]
+            if used.get(c, 0) >= per_college:
+                continue
+            used[c] = used.get(c, 0) + 1
+            plan.append((i, t))
+            got += 1
+        carry = want - got
+    return plan
@@ -0,0 +1,113 @@
+# ==================== 位次概率模型（一分一段表 + min_rank） ====================
+"""
+填报指南：“位次比分数更重要，每年分数线浮动，但高校录取的位次相对稳定”。
+
+1. 一分一段表：按科类存“分数升序数组 + 该分数及以上的累计人数”，分数换位次用 bisect，O(log n)。
+   优先读 SCORE_RANK_FILE（CSV：科类,分数,人数 或 科类,分数,累计人数）；
+   没有这个文件时，用录取数据里的 (最低分, 最低位次) 点拟合一张近似表。
+2. 打分：考生位次与各专业 min_rank 整列比较，一次算完：
+   min_rank / 考生位次 >= 1.3 -> 95；>= 1.0 -> 70；>= 0.8 -> 40；否则 10；没有位次数据 -> 0。
+3. 趋势模型：min_rank 先按近三年的位次漂移（trends.py）外推一年再打分，
+   近三年最低分标准差超过 VOLATILE_STD 的降一档；没有趋势数据的行与位次模型相同。
+"""
+import os
+from bisect import bisect_left
+import numpy as np
+import pandas as pd
+
+SCORE_RANK_FILE = os.getenv('SCORE_RANK_FILE', '一分一段.csv')
+
+# min_rank / 考生位次 的分档（对应分差模型的 +25 / 0 / -25）
+RANK_BANDS = ((1.3, 95), (1.0, 70), (0.8, 40))
+RANK_FLOOR = 10
+VOLATILE_STD = 10           # 分
+
+_CATEGORY_MAP = {'物理': '物理类', '历史': '历史类'}
+
+
+class ScoreRankTable:
+    def __init__(self, tables, source=''):
+        # 科类 -> (分数升序 list, 该分数及以上累计人数 ndarray)
+        self.tables = tables
+        self.source = source
+
+    @classmethod
+    def from_csv(cls, path):
+        df = pd.read_csv(path)
+        df['科类'] = df['科类'].astype(str).str.strip().replace(_CATEGORY_MAP)
+        tables = {}
+        for cat, g in df.groupby('科类'):
+            g = g.sort_values('分数', ascending=False)
+            cum = g['累计人数'] if '累计人数' in g else g['人数'].cumsum()
+            tables[cat] = (g['分数'].astype(int).tolist()[::-1], cum.to_numpy(dtype=np.int64)[::-1])
+        return cls(tables, path)
+
+    @classmethod
+    def from_admissions(cls, categories, scores, ranks):
+        """用录取数据的 (最低分, 最低位次) 拟合：同分取最大位次，分数越高位次不增，中间分数线性插值"""
+        df = pd.DataFrame({'cat': categories, 'score': scores, 'rank': ranks})
+        df = df[(df['score'] > 0) & (df['rank'] > 0)]
+        tables = {}
+        for cat, g in df.groupby('cat'):
+            pts = g.groupby('score')['rank'].max().sort_index(ascending=False)
+            fitted = np.maximum.accumulate(pts.to_numpy())
+            xs = pts.index.to_numpy()[::-1]
+            dense = np.arange(xs[0], xs[-1] + 1)
+            tables[cat] = (dense.tolist(), np.round(np.interp(dense, xs, fitted[::-1])).astype(np.int64))
+        return cls(tables, 'admissions')
+
+    @classmethod
+    def load(cls, index):
+        """有一分一段表文件就用文件，否则从内存索引拟合"""
+        if os.path.exists(SCORE_RANK_FILE):
+            return cls.from_csv(SCORE_RANK_FILE)
+        return cls.from_admissions(index.text('category', slice(None)), index.ints['min_score'],
+                                   index.ints['min_rank'])
+
+    def rank(self, category, score):
+        """分数 -> 全省位次（该分数及以上人数）；科类不在表里返回 0"""
+        t = self.tables.get(category)
+        if t is None:
+            return 0
+        scores, cum = t
+        i = bisect_left(scores, score)
+        if i == len(scores):
+            return 1
+        return int(cum[i])
+
+
+def rank_probabilities(student_rank, min_rank):
+    """整列打分：student_rank 可以是标量或与 min_rank 等长的数组（0 表示没有位次）"""
+    student_rank = np.asarray(student_rank, dtype=np.float64)
+    min_rank = np.asarray(min_rank)
+    ratio = min_rank / np.where(student_rank > 0, student_rank, np.inf)
+    prob = np.select([ratio >= r for r, _ in RANK_BANDS], [p for _, p in RANK_BANDS], RANK_FLOOR)
+    return np.where((min_rank == 0) | (student_rank == 0), 0, prob)
+
+
+def _student_ranks(table, user_score, index, pos):
+    """按每行自己的科类查考生位次（每个科类只查一次）"""
+    col = index.texts['category']
+    student = np.asarray([table.rank(c, user_score) for c in col.values], dtype=np.int64)
+    return student[col.codes[pos]]
+
+
+def probabilities(table, user_score, index, pos):
+    """按每行自己的科类查考生位次，再对 min_rank 整列打分"""
+    return rank_probabilities(_student_ranks(table, user_score, index, pos), index.ints['min_rank'][pos])
+
+
+def trend_probabilities(table, user_score, index, pos):
+    """位次模型 + 近三年趋势（index.trends 里没有趋势列时与位次模型相同）"""
+    min_rank = index.ints['min_rank'][pos].astype(np.float64)
+    drift = index.trends.get('rank_drift')
+    if drift is not None:
+        d = drift[pos]
+        min_rank = np.where((min_rank > 0) & ~np.isnan(d), np.maximum(min_rank + d, 1), min_rank)
+    prob = rank_probabilities(_student_ranks(table, user_score, index, pos), min_rank)
+    vol = index.trends.get('score_volatility')
+    if vol is not None:
+        levels = [p for _, p in RANK_BANDS] + [RANK_FLOOR]
+        lower = np.select([prob == p for p in levels[:-1]], levels[1:], prob)
+        prob = np.where(vol[pos] > VOLATILE_STD, lower, prob)
+    return prob
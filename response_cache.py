@@ -0,0 +1,112 @@
+# ==================== 公开只读页面的响应缓存 ====================
+"""
+/query、/analysis、/colleges、/majors 和详情页只取决于请求参数和录取数据，
+这里按“规范化参数 + 数据版本号”缓存渲染好的响应。
+
+- 一级：每个 worker 一份有界 LRU（带 TTL）
+- 二级（可选）：RESPONSE_CACHE_DIR 指定的共享目录，多个 worker / 实例共用
+- 数据版本号一变（管理员改数据）旧条目全部作废：键里带版本号，LRU 直接清空，
+  共享目录里旧版本的文件顺手删掉
+"""
+import os
+import glob
+import time
+import pickle
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data   = OrderedDict()
+        self._lock   = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileCache:
+    """一个键一个文件；键形如 v<版本>-<哈希>，方便按版本清理"""
+
+    def __init__(self, path, ttl=300):
+        self.path = path
+        self.ttl  = ttl
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, key):
+        return os.path.join(self.path, key + '.pkl')
+
+    def get(self, key):
+        try:
+            with open(self._file(key), 'rb') as f:
+                expires, value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        return value if expires >= time.time() else None
+
+    def set(self, key, value):
+        tmp = f'{self._file(key)}.{os.getpid()}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                pickle.dump((time.time() + self.ttl, value), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._file(key))
+        except OSError:
+            pass
+
+    def prune(self, keep_prefix):
+        for p in glob.glob(os.path.join(self.path, 'v*.pkl')):
+            if not os.path.basename(p).startswith(keep_prefix):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+
+class ResponseCache:
+    def __init__(self, maxsize=512, ttl=300, path=None):
+        self.memory  = LRUCache(maxsize, ttl)
+        self.shared  = FileCache(path, ttl) if path else None
+        self.version = None
+
+    def sync_version(self, version):
+        """数据版本变了就把旧条目清掉"""
+        if version != self.version:
+            self.version = version
+            self.memory.clear()
+            if self.shared:
+                self.shared.prune(f'v{version}-')
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is None and self.shared:
+            value = self.shared.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.shared:
+            self.shared.set(key, value)
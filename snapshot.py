@@ -0,0 +1,147 @@
+# ==================== 录取数据快照（按 Excel 内容哈希缓存） ====================
+"""
+把专家版 Excel 清洗一次后存成列式二进制快照，之后冷启动直接 mmap 读取，
+不再走 openpyxl。
+
+目录结构：<SNAPSHOT_DIR>/<xlsx 的 sha256>/
+    meta.json            行数、列类型、格式版本
+    <列>.npy             整数列：int32，-1 表示空
+    <列>.codes.npy       文本列：字典编码（int32）
+    <列>.strings.json    文本列：字典表
+
+Excel 内容变了哈希就变，自动重建；旧快照不会被误用。
+
+    python snapshot.py <xlsx>      # 预先生成（Dockerfile 构建镜像时调用）
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+import ingest
+
+SNAPSHOT_DIR = os.getenv('GAOKAO_SNAPSHOT_DIR', '.snapshot')
+FORMAT  = 1
+INT_NA  = -1
+
+
+def file_hash(path, chunk=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(chunk), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Snapshot:
+    """只读快照：ints[列] 是 int32 数组，strs[列] 是 (codes, 字典表)"""
+
+    def __init__(self, path, meta, ints, strs):
+        self.path = path
+        self.meta = meta
+        self.ints = ints
+        self.strs = strs
+
+    def __len__(self):
+        return self.meta['rows']
+
+    @property
+    def source_hash(self):
+        return self.meta['source_hash']
+
+    def column(self, name):
+        """文本列解码成 object 数组；整数列原样返回"""
+        if name in self.ints:
+            return self.ints[name]
+        codes, values = self.strs[name]
+        return np.asarray(values, dtype=object)[codes]
+
+    def to_frame(self):
+        """还原成 ingest.normalize() 同样的 DataFrame"""
+        out = {}
+        for name in self.meta['columns']:
+            if name in self.ints:
+                arr = np.asarray(self.ints[name], dtype=np.int64)
+                out[name] = pd.arrays.IntegerArray(arr, arr == INT_NA)
+            else:
+                codes, values = self.strs[name]
+                out[name] = pd.Categorical.from_codes(codes, values).astype('string')
+        return pd.DataFrame(out)
+
+
+def save(frame, dest, source_hash=''):
+    """把清洗后的表写成快照目录（先写临时目录再 rename，写到一半不会被读到）"""
+    parent = os.path.dirname(os.path.abspath(dest))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    columns = {}
+    try:
+        for name in frame.columns:
+            s = frame[name]
+            if pd.api.types.is_integer_dtype(s):
+                arr = s.fillna(INT_NA).to_numpy(dtype=np.int32)
+                np.save(os.path.join(tmp, f'{name}.npy'), arr)
+                columns[name] = 'int'
+            else:
+                codes, values = pd.factorize(s.fillna(''), sort=True)
+                np.save(os.path.join(tmp, f'{name}.codes.npy'), codes.astype(np.int32))
+                with open(os.path.join(tmp, f'{name}.strings.json'), 'w', encoding='utf-8') as f:
+                    json.dump([str(v) for v in values], f, ensure_ascii=False)
+                columns[name] = 'str'
+        meta = {'format': FORMAT, 'source_hash': source_hash, 'rows': len(frame), 'columns': columns}
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        try:
+            os.rename(tmp, dest)
+        except OSError:                     # 别的进程抢先建好了
+            shutil.rmtree(tmp, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return dest
+
+
+def load(path, mmap=True):
+    """读快照目录；格式不对返回 None"""
+    try:
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('format') != FORMAT:
+        return None
+    mode = 'r' if mmap else None
+    ints, strs = {}, {}
+    for name, kind in meta['columns'].items():
+        if kind == 'int':
+            ints[name] = np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode)
+        else:
+            codes = np.load(os.path.join(path, f'{name}.codes.npy'), mmap_mode=mode)
+            with open(os.path.join(path, f'{name}.strings.json'), encoding='utf-8') as f:
+                strs[name] = (codes, json.load(f))
+    return Snapshot(path, meta, ints, strs)
+
+
+def load_or_build(xlsx, cache_dir=None):
+    """按 Excel 内容哈希取快照，没有就现建"""
+    cache_dir = cache_dir or SNAPSHOT_DIR
+    digest = file_hash(xlsx)
+    path = os.path.join(cache_dir, digest)
+    snap = load(path)
+    if snap is None:
+        shutil.rmtree(path, ignore_errors=True)
+        save(ingest.normalize(ingest.read_workbook(xlsx)), path, digest)
+        snap = load(path)
+    return snap
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit('用法：python snapshot.py <xlsx>')
+    t0 = time.perf_counter()
+    snap = load_or_build(sys.argv[1])
+    print(f'快照 {snap.path}：{len(snap)} 行，用时 {time.perf_counter() - t0:.2f}s')
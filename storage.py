@@ -0,0 +1,237 @@
+# ==================== SQLite 存储层：PRAGMA、迁移、索引检查 ====================
+"""
+1. configure(engine)：每个新连接都设一遍 PRAGMA（WAL、synchronous=NORMAL、mmap、页缓存……）。
+   WAL 下读不挡写、写不挡读，后台导入时查询照常。
+2. migrate(engine)：按 PRAGMA user_version 顺序执行 MIGRATIONS 里还没跑过的步骤，
+   整个过程在 BEGIN IMMEDIATE 里，多个 worker 同时启动也只有一个真正执行。
+   db.create_all() 只建缺的表，已有库加索引 / 改结构都写成新的一步追加到 MIGRATIONS 末尾。
+   全新的库由 create_all 直接按最新模型建表（模型里声明了迁移加的全部索引），stamp(engine) 记成最新版本。
+3. check_plans(engine)：对 HOT_QUERIES 跑 EXPLAIN QUERY PLAN，确认热点查询走了预期的索引：
+
+    python storage.py [--db /tmp/gaokao.db] [--check] [--vacuum]
+"""
+import os
+import sys
+import argparse
+from sqlalchemy import event
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous':  'NORMAL',             # WAL 下 NORMAL 不会损坏库，只可能丢最后一次提交
+    'busy_timeout': 5000,                 # 毫秒；写锁被占时等一会儿而不是直接报 locked
+    'cache_size':   -64 * 1024,           # 负数单位 KB：64MB 页缓存
+    'mmap_size':    int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'temp_store':   'MEMORY',
+    'foreign_keys': 'ON',
+}
+
+COLLEGE_KEY = ('college_name', 'college_code', 'city', 'college_info')
+MAJOR_KEY   = ('major_name', 'major_code', 'major_info')
+
+
+def _split_entities(con):
+    """admission_records 宽表拆成 colleges / majors 实体表 + 窄表，id 一一保留（见 entities.py）；
+    老库里已不用的 probability 列（概率改为按请求现算）不带到新表"""
+    columns = {row[1] for row in con.execute('PRAGMA table_info(admission_records)')}
+    if 'college_id' in columns:
+        return
+    con.execute('CREATE TABLE IF NOT EXISTS colleges (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL, '
+                'code VARCHAR(20) NOT NULL, city VARCHAR(50) NOT NULL, info TEXT NOT NULL)')
+    con.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_college ON colleges (name, code, city, info)')
+    con.execute('CREATE TABLE IF NOT EXISTS majors (id INTEGER NOT NULL PRIMARY KEY, name VARCHAR(100) NOT NULL, '
+                'code VARCHAR(20) NOT NULL, info TEXT NOT NULL)')
+    con.execute('CREATE UNIQUE INDEX IF NOT EXISTS ux_major ON majors (name, code, info)')
+    # 每种取值组合一行，按首次出现的顺序编号；空值统一成 ''
+    for table, key in (('colleges', COLLEGE_KEY), ('majors', MAJOR_KEY)):
+        cols = ', '.join(f"ifnull({k}, '')" for k in key)
+        con.execute(f'INSERT OR IGNORE INTO {table} ({", ".join(k.split("_")[-1] for k in key)}) '
+                    f'SELECT {cols} FROM admission_records GROUP BY {cols} ORDER BY min(id)')
+    con.execute('CREATE TABLE admission_records_new (id INTEGER NOT NULL PRIMARY KEY, year VARCHAR(10), '
+                'batch VARCHAR(50), category VARCHAR(50), requirement VARCHAR(100), '
+                'college_id INTEGER NOT NULL REFERENCES colleges (id), major_id INTEGER NOT NULL REFERENCES majors (id), '
+                'min_score INTEGER, min_rank INTEGER, avg_score INTEGER, max_score INTEGER, tuition VARCHAR(50))')
+    match = lambda alias, key: ' AND '.join(f"{alias}.{k.split('_')[-1]} = ifnull(r.{k}, '')" for k in key)
+    con.execute('INSERT INTO admission_records_new '
+                'SELECT r.id, r.year, r.batch, r.category, r.requirement, c.id, m.id, '
+                'r.min_score, r.min_rank, r.avg_score, r.max_score, r.tuition FROM admission_records r '
+                f'JOIN colleges c ON {match("c", COLLEGE_KEY)} JOIN majors m ON {match("m", MAJOR_KEY)}')
+    con.execute('DROP TABLE admission_records')           # 旧索引随表一起删
+    con.execute('ALTER TABLE admission_records_new RENAME TO admission_records')
+    for sql in ('CREATE INDEX ix_admission_category_avg ON admission_records (category, avg_score)',
+                'CREATE INDEX ix_admission_college_category ON admission_records (college_id, category)',
+                'CREATE INDEX ix_admission_records_major_id ON admission_records (major_id)',
+                'CREATE INDEX ix_admission_natural_key ON admission_records (year, category, college_id, major_id)'):
+        con.execute(sql)
+
+
+# (版本号, 说明, [SQL 或 callable(sqlite3 连接)])；只能追加，不能改已发布的步骤
+MIGRATIONS = [
+    (1, '按真实访问路径加复合索引', [
+        # /analysis、导出：科类内按平均分区间扫
+        'CREATE INDEX IF NOT EXISTS ix_admission_category_avg ON admission_records (category, avg_score)',
+        # 详情页 / API：某院校（某科类）的全部专业
+        'CREATE INDEX IF NOT EXISTS ix_admission_college_category ON admission_records (college_name, category)',
+        # 专业详情页（create_all 建过的库已有，老库补上）
+        'CREATE INDEX IF NOT EXISTS ix_admission_records_major_name ON admission_records (major_name)',
+        # 后台上传按自然键比对 / 趋势按专业跨年对齐
+        'CREATE INDEX IF NOT EXISTS ix_admission_natural_key '
+        'ON admission_records (year, category, college_code, major_code)',
+    ]),
+    (2, '趋势表按自然键查', [
+        'CREATE INDEX IF NOT EXISTS ix_trend_key ON programme_trends (year, category, college_code, major_code)',
+    ]),
+    (3, '详情汇总按名称重算', [
+        'CREATE INDEX IF NOT EXISTS ix_entity_detail_name ON entity_details (kind, name)',
+    ]),
+    (4, '院校 / 专业拆成去重的实体表，招生行只留窄列 + 外键', [
+        _split_entities,
+        # 按名称查院校 / 专业要先走实体表再走外键索引，没有统计信息时规划器会选错
+        'PRAGMA analysis_limit = 1000',
+        'ANALYZE',
+    ]),
+]
+
+# 热点查询 -> (SQL, 参数, 可接受的索引)
+HOT_QUERIES = {
+    '分数窗口':   ('SELECT id FROM admission_records WHERE category = ? AND avg_score BETWEEN ? AND ?',
+                   ('物理类', 575, 625), ('ix_admission_category_avg',)),
+    '院校详情':   ('SELECT r.* FROM admission_records r JOIN colleges c ON c.id = r.college_id '
+                   'WHERE c.name = ? AND r.category = ?',
+                   ('厦门大学', '物理类'), ('ix_admission_college_category',)),
+    '院校信息':   ("SELECT info FROM colleges WHERE name = ? AND info != '' LIMIT 1",
+                   ('厦门大学',), ('ux_college',)),
+    '专业详情':   ('SELECT r.* FROM admission_records r JOIN majors m ON m.id = r.major_id WHERE m.name = ?',
+                   ('经济学类',), ('ix_admission_records_major_id',)),
+    '自然键':     ('SELECT id FROM admission_records WHERE year = ? AND category = ? AND college_id = ? AND major_id = ?',
+                   ('2025', '物理类', 1, 1), ('ix_admission_natural_key',)),
+}
+
+
+def configure(engine):
+    """给 engine 的每个新连接设 PRAGMAS（只对 SQLite 生效）"""
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for name, value in PRAGMAS.items():
+            cur.execute(f'PRAGMA {name} = {value}')
+        cur.close()
+
+
+def migrate(engine, migrations=MIGRATIONS):
+    """执行还没跑过的迁移，返回这次执行了的版本号列表"""
+    raw = engine.raw_connection()
+    con = raw.driver_connection
+    isolation, con.isolation_level = con.isolation_level, None     # 事务自己管
+    applied = []
+    try:
+        con.execute('BEGIN IMMEDIATE')
+        try:
+            current = con.execute('PRAGMA user_version').fetchone()[0]
+            for version, _note, steps in migrations:
+                if version <= current:
+                    continue
+                for step in steps:
+                    if callable(step):
+                        step(con)
+                    else:
+                        con.execute(step)
+                con.execute(f'PRAGMA user_version = {int(version)}')
+                applied.append(version)
+            con.execute('COMMIT')
+        except BaseException:
+            con.execute('ROLLBACK')
+            raise
+    finally:
+        con.isolation_level = isolation
+        raw.close()
+    return applied
+
+
+def analyze(conn):
+    """大批量写入之后刷新查询规划器的统计信息（analysis_limit：大表也只抽样，很快）"""
+    conn.exec_driver_sql('PRAGMA analysis_limit = 1000')
+    conn.exec_driver_sql('ANALYZE')
+
+
+def stamp(engine, version=None):
+    """把库记成已迁移到 version（默认最新）：只用于 create_all 刚按最新模型建好的新库"""
+    version = MIGRATIONS[-1][0] if version is None else version
+    raw = engine.raw_connection()
+    try:
+        raw.driver_connection.execute(f'PRAGMA user_version = {int(version)}')
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def vacuum(engine):
+    """整库重写，回收删表 / 拆表后留下的空页（要独占库，别在高峰期跑）"""
+    raw = engine.raw_connection()
+    con = raw.driver_connection
+    isolation, con.isolation_level = con.isolation_level, None     # VACUUM 不能在事务里
+    try:
+        con.execute('VACUUM')
+        con.execute('PRAGMA wal_checkpoint(TRUNCATE)')             # WAL 模式下写回主文件才真正变小
+    finally:
+        con.isolation_level = isolation
+        raw.close()
+
+
+def schema_version(engine):
+    raw = engine.raw_connection()
+    try:
+        return raw.driver_connection.execute('PRAGMA user_version').fetchone()[0]
+    finally:
+        raw.close()
+
+
+def explain(engine, sql, params=()):
+    """EXPLAIN QUERY PLAN 的 detail 列"""
+    raw = engine.raw_connection()
+    try:
+        return [row[-1] for row in raw.driver_connection.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    finally:
+        raw.close()
+
+
+def check_plans(engine, queries=HOT_QUERIES):
+    """{查询名: (是否用到预期索引, 查询计划)}"""
+    out = {}
+    for name, (sql, params, indexes) in queries.items():
+        plan = explain(engine, sql, params)
+        out[name] = (any(f'INDEX {i} ' in step + ' ' for step in plan for i in indexes), plan)
+    return out
+
+
+# ==================== 命令行 ====================
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='SQLite 迁移 / 查询计划检查')
+    ap.add_argument('--db', default=None, help='SQLite 文件，默认 /tmp/gaokao.db')
+    ap.add_argument('--check', action='store_true', help='检查热点查询是否走索引（不通过时退出码 1）')
+    ap.add_argument('--vacuum', action='store_true', help='VACUUM 回收空页（迁移拆表之后跑一次）')
+    args = ap.parse_args(argv)
+
+    if args.db:
+        os.environ['GAOKAO_DB'] = args.db
+    os.environ.setdefault('GAOKAO_AUTO_IMPORT', '0')
+    from main import app, db                # import 时 create_app 已经跑过 migrate
+
+    with app.app_context():
+        print(f'schema 版本：{schema_version(db.engine)}（最新 {MIGRATIONS[-1][0]}）')
+        if args.vacuum:
+            before = os.path.getsize(db.engine.url.database)
+            vacuum(db.engine)
+            print(f'VACUUM：{before >> 10} KB -> {os.path.getsize(db.engine.url.database) >> 10} KB')
+        if args.check:
+            ok = True
+            for name, (used, plan) in check_plans(db.engine).items():
+                ok &= used
+                print(f'{"OK " if used else "未走索引"} {name}: {" / ".join(plan)}')
+            sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
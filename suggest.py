@@ -0,0 +1,80 @@
+# ==================== 输入联想：排序数组 + 二分前缀查找 ====================
+"""
+/query 的院校、专业输入框边打字边提示，不再每敲一次整页 LIKE 查一遍。
+
+对当年去重后的院校名 / 专业名建一张键表：每个名称挂上
+名称本身、全拼（厦门大学 -> xiamendaxue）、拼音首字母（xmdx）三种键，
+所有 (键, 名称下标) 按键排序成两个并列数组。前缀查找就是两次 bisect 取出一段，
+段内按招生专业数（开设院校数）取前 limit 个。中文输入前缀命中不够时，
+再用已有的子串倒排索引（ngram_index.py）补上“包含”匹配。
+
+拼音用 pypinyin（requirements.txt 里已列出）：全拼、首字母匹配是输入联想的主要用法，不再是可选的。
+"""
+from bisect import bisect_left
+import numpy as np
+
+from pypinyin import lazy_pinyin, Style
+
+LIMIT     = 10
+MAX_LIMIT = 50
+_END      = '\U0010ffff'            # 比任何字符都大：[q, q + _END) 即所有以 q 开头的键
+_pinyin_cache = {}                  # 名称 -> (全拼, 首字母)；数据改了重建键表时不用重算拼音
+
+
+def normalize(q):
+    """查询词 / 键统一成小写、去空白"""
+    return ''.join(q.split()).lower()
+
+
+def pinyin_keys(name):
+    """(全拼, 首字母)；非汉字原样保留（小写）"""
+    keys = _pinyin_cache.get(name)
+    if keys is None:
+        full = normalize(''.join(lazy_pinyin(name, errors='default')))
+        initials = normalize(''.join(lazy_pinyin(name, style=Style.FIRST_LETTER, errors='default')))
+        keys = _pinyin_cache[name] = (full, initials)
+    return keys
+
+
+class Suggester:
+    def __init__(self, names, counts, column=None):
+        """names：去重后的名称；counts：对应的招生专业数；column：同一字段的 StrColumn（补子串匹配用）"""
+        self.names  = list(names)
+        self.counts = np.asarray(counts, dtype=np.int64)
+        self.column = column
+        self._pos   = {n: i for i, n in enumerate(self.names)}
+        pairs = sorted({(k, i) for i, n in enumerate(self.names)
+                        for k in (normalize(n), *pinyin_keys(n)) if k})
+        self.keys = [k for k, _ in pairs]
+        self.ids  = np.fromiter((i for _, i in pairs), dtype=np.int32, count=len(pairs))
+
+    @classmethod
+    def from_summary(cls, table, column=None):
+        """从 SummaryTable（院校 / 专业汇总）建：只含当年有招生的名称"""
+        entries = list(table.entries.values())
+        return cls([e.name for e in entries], [e.count for e in entries], column)
+
+    def _top(self, ids, limit, exclude=()):
+        """ids 去重、去掉 exclude，按招生数降序、名称升序取前 limit 个"""
+        ids = np.unique(ids)
+        if len(exclude):
+            ids = ids[~np.isin(ids, exclude)]
+        if len(ids) > limit:
+            # 先按招生数粗选（含并列的），再精确排序
+            cut = np.partition(self.counts[ids], len(ids) - limit)[len(ids) - limit]
+            ids = ids[self.counts[ids] >= cut]
+        order = sorted(ids.tolist(), key=lambda i: (-self.counts[i], self.names[i]))
+        return np.asarray(order[:limit], dtype=np.int32)
+
+    def search(self, q, limit=LIMIT):
+        """[(名称, 招生数), ...]：先前缀（名称 / 全拼 / 首字母），不够再补子串匹配"""
+        q = normalize(q)
+        if not q:
+            return []
+        lo = bisect_left(self.keys, q)
+        hi = bisect_left(self.keys, q + _END, lo)
+        top = self._top(self.ids[lo:hi], limit)
+        if len(top) < limit and self.column is not None and not q.isascii():
+            more = [self._pos[n] for n in self.column.matching(q) if n in self._pos]
+            top = np.concatenate([top, self._top(np.asarray(more, dtype=np.int32), limit - len(top), top)])
+        return [(self.names[i], int(self.counts[i])) for i in top.tolist()]
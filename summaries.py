@@ -0,0 +1,121 @@
+# ==================== 院校 / 专业汇总（增量维护） ====================
+"""
+/colleges、/majors 原来每次 GROUP BY 全表。这里按院校名 / 专业名常驻一份汇总：
+代码、城市、招生专业数、最低分、最高分。
+
+汇总表跟着内存索引走：索引重建时整列 groupby 一次；管理员增删改时
+只对涉及的那一两个条目做加减（AdmissionIndex.with_row / without 里调用）。
+每个条目用 Counter 记各取值出现次数，删行时也能准确回退最值和代码。
+"""
+from collections import Counter
+import pandas as pd
+
+
+class Summary:
+    __slots__ = ('name', 'count', 'codes', 'cities', 'mins', 'maxs', 'code', 'city',
+                 'min_score', 'max_score')
+
+    def __init__(self, name, codes=None, cities=None, mins=None, maxs=None):
+        self.name   = name
+        self.codes  = codes or Counter()
+        self.cities = cities or Counter()
+        self.mins   = mins or Counter()          # 最低分 -> 行数（不含空）
+        self.maxs   = maxs or Counter()          # 最高分（空则平均分/最低分）-> 行数
+        self._refresh()
+
+    def _refresh(self):
+        self.count     = sum(self.codes.values())
+        self.code      = _mode(self.codes)
+        self.city      = _mode(self.cities)
+        self.min_score = min(self.mins) if self.mins else None
+        self.max_score = max(self.maxs) if self.maxs else None
+
+    def changed(self, row, sign):
+        """加 / 减一行后的新条目（原条目不动，旧索引照常可读）"""
+        new = Summary.__new__(Summary)
+        new.name = self.name
+        new.codes, new.cities, new.mins, new.maxs = (Counter(self.codes), Counter(self.cities),
+                                                     Counter(self.mins), Counter(self.maxs))
+        low, high = _scores(row)
+        for counter, value in ((new.codes, row['code']), (new.cities, row['city']),
+                               (new.mins, low), (new.maxs, high)):
+            if value is None:
+                continue
+            counter[value] += sign
+            if counter[value] <= 0:
+                del counter[value]
+        new._refresh()
+        return new
+
+
+def _mode(counter):
+    """出现最多的取值；并列取最小的，保证增量更新和整表重建结果一样"""
+    return min(counter.items(), key=lambda kv: (-kv[1], kv[0]))[0] if counter else ''
+
+
+def _scores(row):
+    high = row['max_score'] or row['avg_score'] or row['min_score']
+    return row['min_score'] or None, high or None
+
+
+class SummaryTable:
+    def __init__(self, key, code_field, city_field, entries):
+        self.key        = key
+        self.code_field = code_field
+        self.city_field = city_field
+        self.entries    = entries               # 名称 -> Summary
+
+    @classmethod
+    def build(cls, index, key, code_field, city_field=None):
+        """从内存索引整列 groupby 建表"""
+        df = pd.DataFrame({
+            'name': index.text(key, slice(None)),
+            'code': index.text(code_field, slice(None)),
+            'city': index.text(city_field, slice(None)) if city_field else '',
+            'min':  index.ints['min_score'],
+            'max':  index.ints['max_score'],
+            'avg':  index.ints['avg_score'],
+        })
+        df = df[df['name'] != '']
+        df['max'] = df['max'].where(df['max'] > 0, df['avg'].where(df['avg'] > 0, df['min']))
+        counts = {}
+        for col, field in (('code', 'codes'), ('city', 'cities'), ('min', 'mins'), ('max', 'maxs')):
+            sub = df[['name', col]]
+            if col in ('min', 'max'):
+                sub = sub[sub[col] > 0].astype({col: int})
+            for (name, value), n in sub.value_counts().items():
+                counts.setdefault(name, {}).setdefault(field, Counter())[value] = n
+        entries = {name: Summary(name, **c) for name, c in counts.items()}
+        return cls(key, code_field, city_field, entries)
+
+    def _row(self, index, pos):
+        return {
+            'name': index.text(self.key, pos),
+            'code': index.text(self.code_field, pos),
+            'city': index.text(self.city_field, pos) if self.city_field else '',
+            'min_score': int(index.ints['min_score'][pos]),
+            'max_score': int(index.ints['max_score'][pos]),
+            'avg_score': int(index.ints['avg_score'][pos]),
+        }
+
+    def patched(self, old_index, old_pos, new_index, new_pos):
+        """一行变动后的新表：old_pos / new_pos 为 None 表示新增 / 删除"""
+        entries = dict(self.entries)
+        for index, pos, sign in ((old_index, old_pos, -1), (new_index, new_pos, 1)):
+            if pos is None:
+                continue
+            row = self._row(index, pos)
+            if not row['name']:
+                continue
+            entry = entries.get(row['name']) or Summary(row['name'])
+            entry = entry.changed(row, sign)
+            if entry.count:
+                entries[row['name']] = entry
+            else:
+                entries.pop(row['name'], None)
+        return SummaryTable(self.key, self.code_field, self.city_field, entries)
+
+    def list(self, names=None):
+        """按名称排序（与原 GROUP BY 的输出顺序一致）；names 为关键字命中的名称"""
+        keys = self.entries.keys() if names is None else [n for n in names if n in self.entries]
+        return [self.entries[n] for n in sorted(keys)]
@@ -0,0 +1,82 @@
+# ==================== 测试公共夹具：临时库 + 仓库自带的专家版数据 ====================
+"""
+main 在 import 时就按环境变量打开数据库、跑 create_app，所以环境变量必须在这里（收集测试之前）设好：
+库、快照都放进临时目录，不碰 /tmp/gaokao.db；bcrypt 用最低工作因子，建默认账号不拖慢测试。
+
+    python -m pytest -q
+"""
+import os
+import sys
+import shutil
+import tempfile
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TMP  = tempfile.mkdtemp(prefix='gaokao-test-')
+
+os.environ['GAOKAO_DB']           = os.path.join(TMP, 'gaokao.db')
+os.environ['GAOKAO_SNAPSHOT_DIR'] = os.path.join(TMP, 'snapshot')
+os.environ['GAOKAO_AUTO_IMPORT']  = '0'
+os.environ['BCRYPT_ROUNDS']       = '4'
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def web():
+    """导入好专家版数据的 main 模块（整个测试会话共用一个库；改数据的测试自己改回去）"""
+    import main
+    import ingest
+    with main.app.app_context():
+        frame = ingest.load_frame(os.path.join(ROOT, main.XLSX))
+        ingest.import_frame(main.db.engine, main.admissions, frame, replace=True)
+        main.refresh_derived()
+        main.data_version.bump()
+        main.get_index()
+    yield main
+    shutil.rmtree(TMP, ignore_errors=True)
+
+
+@pytest.fixture
+def client(web):
+    return web.app.test_client()
+
+
+@pytest.fixture
+def admin(client):
+    """已登录管理员的 test client"""
+    with client.session_transaction() as s:
+        s['username'], s['role'] = 'admin', 'admin'
+    return client
+
+
+# 后台新增 / 编辑一行招生记录的表单
+RECORD_FORM = {'year': '2025', 'batch': '本科批', 'category': '物理类', 'requirement': '化', 'college_name': '测试大学',
+               'college_code': '9999', 'college_info': '测试标签', 'major_name': '测试专业', 'major_code': '99',
+               'major_info': '', 'min_score': '601', 'min_rank': '12000', 'avg_score': '605', 'max_score': '610',
+               'tuition': '5000', 'city': '福州'}
+
+
+@pytest.fixture
+def record_form():
+    return dict(RECORD_FORM)
+
+
+@pytest.fixture
+def add_record(web, admin):
+    """add_record(**改动)：经后台新增一行（RECORD_FORM 加改动），返回 id；测完删掉"""
+    added = []
+
+    def add(**changes):
+        assert admin.post('/admin/data/add', data={**RECORD_FORM, **changes}).status_code == 302
+        with web.app.app_context():
+            added.append(int(web.get_index().ids.max()))
+        return added[-1]
+    yield add
+    for rid in added:
+        admin.get(f'/admin/data/del/{rid}')
+
+
+@pytest.fixture
+def ctx(web):
+    with web.app.app_context():
+        yield
@@ -0,0 +1,60 @@
+"""admission_index.py：后台改数据后本进程就地打补丁的索引，与从库里整表重建的结果一致"""
+import numpy as np
+import pytest
+
+
+def summary_view(idx, key):
+    return {n: (s.count, s.code, s.city, s.min_score, s.max_score) for n, s in idx.summary(key).entries.items()}
+
+
+def assert_same_as_rebuilt(web):
+    """web._index 是打过补丁的；和 load_index() 从库里重建的逐列比"""
+    with web.app.app_context():
+        patched, rebuilt = web.get_index(), web.load_index()
+    assert patched.version == rebuilt.version
+    assert patched.ids.tolist() == rebuilt.ids.tolist()
+    everything = np.arange(len(rebuilt))
+    assert patched.rows(everything) == rebuilt.rows(everything)
+    for key in ('college_name', 'major_name'):
+        assert summary_view(patched, key) == summary_view(rebuilt, key)
+    year = rebuilt.current_year
+    assert patched.partition(year).ids.tolist() == rebuilt.partition(year).ids.tolist()
+
+
+@pytest.fixture
+def added(web, add_record):
+    """新增一行，测完删掉"""
+    with web.app.app_context():
+        web.get_index().partition(web.get_index().current_year)      # 先建好分区，看补丁有没有带过去
+    return add_record()
+
+
+def test_add_patches_index(web, added):
+    assert web.get_index().rows(np.flatnonzero(web.get_index().ids == added))[0].college_name == '测试大学'
+    assert_same_as_rebuilt(web)
+
+
+def test_edit_patches_index(web, admin, added, record_form):
+    form = dict(record_form, college_name='测试学院', min_score='590', avg_score='', category='历史类')
+    assert admin.post(f'/admin/data/edit/{added}', data=form).status_code == 302
+    assert '测试大学' not in web.get_index().summary('college_name').entries
+    assert_same_as_rebuilt(web)
+
+
+def test_delete_patches_index(web, admin, added):
+    assert admin.get(f'/admin/data/del/{added}').status_code == 302
+    assert added not in web.get_index().ids
+    assert_same_as_rebuilt(web)
+
+
+def test_unknown_year_partitions_are_not_cached(web, client, ctx):
+    """随便给的年份不建缓存分区；页面回 404 而不是空结果"""
+    idx = web.get_index()
+    cached = set(idx._partitions)
+    for year in range(1000, 1200):
+        assert client.get(f'/query?year={year}').status_code == 404
+        assert len(idx.partition(str(year))) == 0
+    assert set(idx._partitions) == cached
+    assert client.get('/query?year=2025').status_code == 200
+    assert client.get('/query?year=1999&stream=1').status_code == 404
+    assert client.get('/colleges?year=1999').status_code == 404
@@ -0,0 +1,41 @@
+"""/analysis：分数±25 窗口 + 部分选择取前 30，与逐行算概率、整表排序的朴素做法一致"""
+import pytest
+from sqlalchemy import select
+
+
+def naive_top(web, score, category='', college='', limit=30):
+    """直接查库：逐行 calc_probability，按 (概率降序, id) 整表排序"""
+    w = web.admissions.wide
+    with web.db.engine.connect() as conn:
+        rows = conn.execute(select(w.c.id, w.c.category, w.c.college_name, w.c.min_score, w.c.avg_score)
+                            .where(w.c.year == web.year_index().year)).all()
+    hits = []
+    for rid, cat, name, min_s, avg_s in rows:
+        avg = avg_s or min_s or 0
+        if not score - 25 <= avg <= score + 25:
+            continue
+        if (category and cat != category) or (college and college not in name):
+            continue
+        hits.append((-web.calc_probability(score, min_s, avg), rid))
+    hits.sort()
+    return [(rid, -p) for p, rid in hits[:limit]]
+
+
+@pytest.mark.parametrize('score, category, college', [(600, '', ''), (620, '物理类', ''), (560, '历史类', ''),
+                                                      (600, '', '大学'), (670, '', ''), (300, '', '')])
+def test_matches_naive_reference(web, ctx, score, category, college):
+    idx = web.year_index()
+    top, probs = web.analysis_top(idx, score, college=college, category=category)
+    assert list(zip(idx.ids[top].tolist(), probs.tolist())) == naive_top(web, score, category, college)
+
+
+def test_page(client):
+    html = client.get('/analysis?score=600').get_data(as_text=True)
+    assert '您的分数：<strong>600</strong>' in html and 'probChart' in html
+
+
+def test_bad_score_is_400(client):
+    resp = client.get('/analysis', query_string={'score': '<b>abc</b>'})
+    assert resp.status_code == 400
+    html = resp.get_data(as_text=True)
+    assert '高考分数必须是整数' in html and '<b>abc</b>' not in html
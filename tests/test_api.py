@@ -0,0 +1,72 @@
+"""JSON API（/api/v1/*）：字段投影、按列返回、游标分页、参数错误"""
+import pytest
+
+
+def test_query_cursor_walks_all_rows(web, ctx, client):
+    args = {'score': 600, 'category': '物理类', 'page_size': 50, 'fields': 'id,probability'}
+    ids, after = [], None
+    while True:
+        body = client.get('/api/v1/query', query_string={**args, **({'after': after} if after else {})}).get_json()
+        ids += [r['id'] for r in body['rows']]
+        after = body['next']
+        if after is None:
+            break
+    idx = web.year_index()
+    pos, _, keys = web.query_matches(idx, 600, category='物理类', college='', major='', requirement='')
+    assert body['total'] == len(pos)
+    assert ids == idx.ids[pos[web.page_after(keys)]].tolist()
+
+
+def test_fields_and_columns(client):
+    rows = client.get('/api/v1/query?college=厦门大学&fields=college_name,min_score').get_json()
+    assert rows['fields'] == ['college_name', 'min_score']
+    assert rows['rows'] and all(set(r) == {'college_name', 'min_score'} for r in rows['rows'])
+    cols = client.get('/api/v1/query?college=厦门大学&fields=college_name,min_score&format=columns').get_json()
+    assert cols['columns']['min_score'] == [r['min_score'] for r in rows['rows']]
+    assert rows['rows'][0]['college_name'].startswith('厦门大学')
+
+
+def test_probability_null_without_score(client):
+    rows = client.get('/api/v1/query?college=厦门大学').get_json()['rows']
+    assert all(r['probability'] is None for r in rows)
+
+
+@pytest.mark.parametrize('url', ['/api/v1/query?fields=nope', '/api/v1/query?score=abc', '/api/v1/analysis',
+                                 '/api/v1/analysis?score=x', '/api/v1/suggest?field=city&q=a'])
+def test_bad_params_400(client, url):
+    r = client.get(url)
+    assert r.status_code == 400 and r.get_json()['error']
+
+
+def test_analysis_limit_and_order(client):
+    body = client.get('/api/v1/analysis?score=600&limit=10').get_json()
+    probs = [r['probability'] for r in body['rows']]
+    assert len(probs) == 10 and probs == sorted(probs, reverse=True)
+
+
+def test_entity_lookup(client):
+    body = client.get('/api/v1/college/厦门大学').get_json()
+    assert body['name'] == '厦门大学' and body['count'] == len(body['rows']) > 0
+    assert sum(body['by_category'].values()) == body['count']
+    assert client.get('/api/v1/college/不存在的大学').status_code == 404
+    assert client.get('/api/v1/major/经济学类').get_json()['count'] > 0
+
+
+def test_entity_falls_back_to_latest_year(client, add_record):
+    """当年没有招生的院校：与详情页一样退到最近有数据的一年，招生行也取那一年的"""
+    add_record(year='2024')
+    body = client.get('/api/v1/college/测试大学').get_json()
+    assert body['year'] == '2024' and body['count'] == len(body['rows']) == 1
+    assert body['rows'][0]['major_name'] == '测试专业'
+
+
+def test_entity_missing(client):
+    assert client.get('/api/v1/college/测试大学').status_code == 404
+
+
+@pytest.mark.parametrize('path', ['/api/v1/query', '/api/v1/analysis?score=600', '/api/v1/college/厦门大学',
+                                  '/api/v1/suggest?q=x', '/api/v1/plan?score=600&category=物理类'])
+def test_unknown_year_is_404(client, path):
+    resp = client.get(path + ('&' if '?' in path else '?') + 'year=1999')
+    assert resp.status_code == 404
+    assert resp.get_json()['years'] == ['2025'] and '1999' in resp.get_json()['error']
@@ -0,0 +1,107 @@
+"""batch_recommend.py：名单读入（中英文表头、科类简写、补学号），单进程 / 进程池输出一致且与 /api/v1/plan 对得上"""
+import csv
+import pytest
+from openpyxl import load_workbook
+
+import batch_recommend as br
+
+ROSTER = '''学号,姓名,分数,科类,选科,意向城市,备注
+S1,张三,600,物理,化生,,随便
+,李四,560,历史类,,福州,
+S3,王五,不知道,物理类,,,
+S4,赵六,200,历史,政地,不存在的城市,
+'''
+
+
+@pytest.fixture
+def students(tmp_path):
+    path = tmp_path / '名单.csv'
+    path.write_text('\ufeff' + ROSTER, encoding='utf-8')
+    return br.read_students(str(path))
+
+
+@pytest.fixture
+def batch(web, ctx, monkeypatch):
+    """主进程里设好索引（main() 里做的事）"""
+    monkeypatch.setattr(br, '_idx', web.year_index())
+    monkeypatch.setattr(br, '_model', 'score')
+    return br
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        rows = list(csv.reader(f))
+    return rows[0], rows[1:]
+
+
+def test_read_students(students):
+    assert [s['sid'] for s in students] == ['S1', '2', 'S3', 'S4']                # 没学号按行号编
+    assert [s['category'] for s in students] == ['物理类', '历史类', '物理类', '历史类']
+    assert students[0]['subjects'] == '化生' and students[1]['city'] == '福州'
+    assert students[0]['备注'] == '随便' and students[0]['rank'] == ''         # 多余列带上，缺的列为 ''
+
+
+def test_read_students_english_xlsx(tmp_path):
+    import pandas as pd
+    path = tmp_path / 'roster.xlsx'
+    pd.DataFrame({'id': ['A'], 'name': ['x'], 'score': ['610'], 'category': ['物理']}).to_excel(path, index=False)
+    assert br.read_students(str(path))[0] == {'sid': 'A', 'name': 'x', 'score': '610', 'rank': '', 'category': '物理类',
+                                               'subjects': '', 'city': '', 'tuition_max': ''}
+
+
+def test_run_matches_api(batch, students, client, tmp_path):
+    out = tmp_path / '推荐.csv'
+    progress = []
+    n, lines = batch.run(students, str(out), workers=1, chunk=2, progress=lambda d, t: progress.append((d, t)))
+    header, rows = read_csv(out)
+    assert header == br.OUTPUT_HEADER and n == 4 and lines == len(rows)
+    assert progress == [(2, 4), (4, 4)]
+    col = {h: i for i, h in enumerate(header)}
+    by_sid = {}
+    for r in rows:
+        by_sid.setdefault(r[0], []).append(r)
+
+    for s in students[:2]:
+        args = {k: s[k] for k in ('score', 'category', 'subjects', 'city') if s[k]}
+        api = client.get('/api/v1/plan', query_string={**args, 'fields': 'college_name,major_name,probability'}).get_json()
+        got = by_sid[s['sid']]
+        assert [r[col['序号']] for r in got] == [str(i) for i in range(1, len(got) + 1)]
+        assert [(r[col['档位']], r[col['院校']], r[col['专业']], r[col['录取概率']]) for r in got] == \
+            [(a['tier'], a['college_name'], a['major_name'], str(a['probability'])) for a in api['rows']]
+        assert all(r[col['姓名']] == s['name'] and r[col['备注']] == '' for r in got)
+
+    assert by_sid['S3'] == [['S3', '王五', '不知道', '物理类'] + [''] * 11 + ['高考分数必须是整数']]
+    assert by_sid['S4'][0][-1] == '没有符合条件的专业' and len(by_sid['S4']) == 1
+
+
+def test_pool_output_same_as_serial(batch, students, tmp_path):
+    """fork 出的进程池（块完成顺序不定）写出的行，排序后与单进程完全一样"""
+    serial, pooled = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    batch.run(students * 5, str(serial), workers=1, chunk=3)
+    n, lines = batch.run(students * 5, str(pooled), workers=2, chunk=3)
+    assert n == 20
+    assert sorted(read_csv(pooled)[1]) == sorted(read_csv(serial)[1]) and lines == len(read_csv(serial)[1])
+
+
+def test_xlsx_output(batch, students, tmp_path):
+    out = tmp_path / '推荐.xlsx'
+    n, lines = batch.run(students[:1], str(out), workers=1)
+    rows = list(load_workbook(out, read_only=True).active.iter_rows(values_only=True))
+    assert list(rows[0]) == br.OUTPUT_HEADER and len(rows) == lines + 1
+    assert rows[1][:5] == ('S1', '张三', '600', '物理类', 1) and rows[1][5] in '冲稳保垫'
+    assert isinstance(rows[1][br.OUTPUT_HEADER.index('录取概率')], int)
+
+
+def test_cli_rank_model(web, client, tmp_path, monkeypatch, capsys):
+    """命令行：--model rank 先按一分一段表换算位次再分档，与 /api/v1/plan?model=rank 一致"""
+    monkeypatch.setattr(br, '_idx', None)
+    monkeypatch.setattr(br, '_model', 'score')                      # main() 改的全局变量测完还原
+    roster, out = tmp_path / '名单.csv', tmp_path / '推荐.csv'
+    roster.write_text('学号,分数,科类\nS1,600,物理\n', encoding='utf-8')
+    br.main([str(roster), '-o', str(out), '--workers', '1', '--model', 'rank'])
+    assert '完成：1 名考生' in capsys.readouterr().out
+    header, rows = read_csv(out)
+    api = client.get('/api/v1/plan', query_string={'score': 600, 'category': '物理类', 'model': 'rank',
+                                                   'fields': 'college_name,major_name,probability'}).get_json()
+    assert [(r[5], r[6], r[7], r[14]) for r in rows] == \
+        [(a['tier'], a['college_name'], a['major_name'], str(a['probability'])) for a in api['rows']]
@@ -0,0 +1,21 @@
+"""院校 / 专业详情页：预算汇总和招生行取同一年"""
+
+
+def test_college_page(client):
+    html = client.get('/college/厦门大学').get_data(as_text=True)
+    assert '厦门大学 介绍' in html and '2025 年招生专业' in html and '（0 个）' not in html
+    assert client.get('/college/不存在的大学').status_code == 404
+
+
+def test_major_page(client):
+    html = client.get('/major/经济学类').get_data(as_text=True)
+    assert '2025 年开设院校' in html and '（0 所）' not in html
+
+
+def test_falls_back_to_latest_year(client, add_record):
+    """当年没有招生：汇总和下面的招生行都换成最近有数据的那一年"""
+    add_record(year='2024')
+    html = client.get('/college/测试大学').get_data(as_text=True)
+    assert '2024 年招生专业（1 个）' in html and '测试专业' in html
+    html = client.get('/major/测试专业').get_data(as_text=True)
+    assert '2024 年开设院校（1 所）' in html and '测试大学' in html
@@ -0,0 +1,80 @@
+"""docs_cache.py：/guide、/skill 按角色共用一份预压缩页面，ETag / 304、按 Accept-Encoding 选编码"""
+import os
+import gzip
+import pytest
+
+import docs_cache
+
+
+def login(client, username, role='user'):
+    with client.session_transaction() as s:
+        s['username'], s['role'] = username, role
+    return client
+
+
+def test_identity_and_etag(client):
+    resp = client.get('/guide', headers={'Accept-Encoding': 'identity'})
+    assert resp.status_code == 200 and 'Content-Encoding' not in resp.headers
+    assert '填报指南' in resp.get_data(as_text=True)
+    etag = resp.headers['ETag']
+    again = client.get('/guide', headers={'Accept-Encoding': 'identity', 'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag and not again.data
+
+
+def test_gzip_negotiation(client):
+    plain = client.get('/guide', headers={'Accept-Encoding': 'identity'})
+    resp = client.get('/guide', headers={'Accept-Encoding': 'gzip, deflate'})
+    assert resp.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in resp.headers['Vary']
+    assert gzip.decompress(resp.data) == plain.data
+    assert resp.headers['ETag'] != plain.headers['ETag']            # 每种编码各自的 ETag
+    # 别的编码的 ETag 不算命中
+    assert client.get('/guide', headers={'Accept-Encoding': 'gzip', 'If-None-Match': plain.headers['ETag']}).status_code == 200
+    refused = client.get('/guide', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'Content-Encoding' not in refused.headers and refused.data == plain.data
+
+
+@pytest.mark.skipif(docs_cache.brotli is None, reason='没装 brotli')
+def test_brotli_preferred(client):
+    resp = client.get('/guide', headers={'Accept-Encoding': 'gzip, br'})
+    assert resp.headers['Content-Encoding'] == 'br'
+
+
+def test_users_of_a_role_share_one_copy(web, client):
+    """不同用户名同一角色：字节和 ETag 完全相同，缓存的变体数不随用户增加"""
+    bodies = set()
+    for i in range(50):
+        resp = login(web.app.test_client(), f'user{i}').get('/guide', headers={'Accept-Encoding': 'gzip'})
+        bodies.add((resp.headers['ETag'], resp.data))
+    assert len(bodies) == 1
+    anonymous = client.get('/guide', headers={'Accept-Encoding': 'gzip'})
+    assert anonymous.headers['ETag'] not in {etag for etag, _ in bodies}   # 未登录的导航栏不同
+    assert len(web.guide_doc._pages) <= 2
+    html = gzip.decompress(next(iter(bodies))[1]).decode()
+    assert 'user0' not in html and 'id="nav-user"' in html and '/whoami' in html
+
+
+def test_whoami(web, client):
+    assert client.get('/whoami').get_json() == {'username': None, 'role': None}
+    me = login(web.app.test_client(), '<b>张三</b>').get('/whoami')
+    assert me.get_json() == {'username': '<b>张三</b>', 'role': 'user'}
+    assert 'no-store' in me.headers['Cache-Control']
+
+
+def test_other_pages_still_show_username(web):
+    html = login(web.app.test_client(), '<b>张三</b>').get('/').get_data(as_text=True)
+    assert '&lt;b&gt;张三&lt;/b&gt; (user)' in html and '/whoami' not in html
+
+
+def test_reload_on_change(tmp_path):
+    path = tmp_path / 'doc.txt'
+    path.write_text('第一版', encoding='utf-8')
+    doc = docs_cache.StaticDoc(str(path), lambda text, role: f'{role}:{text}')
+    first = doc.page('user')
+    assert first.bodies['identity'] == 'user:第一版'.encode() and doc.page('user') is first
+    path.write_text('第二版！', encoding='utf-8')
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))     # 文件系统时间粒度粗时也保证 mtime 变了
+    assert doc.page('user').bodies['identity'] == 'user:第二版！'.encode()
+    path.unlink()
+    assert doc.page('user') is None
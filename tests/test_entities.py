@@ -0,0 +1,68 @@
+"""entities.py + 迁移 4：老的宽表库拆成实体表后逐行不变；narrow / prune"""
+import sqlite3
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+import storage
+
+LEGACY = ('CREATE TABLE admission_records (id INTEGER NOT NULL PRIMARY KEY, year VARCHAR(10), batch VARCHAR(50), '
+          'category VARCHAR(50), requirement VARCHAR(100), college_name VARCHAR(100), college_code VARCHAR(20), '
+          'college_info TEXT, major_name VARCHAR(100), major_code VARCHAR(20), major_info TEXT, min_score INTEGER, '
+          'min_rank INTEGER, avg_score INTEGER, max_score INTEGER, tuition VARCHAR(50), city VARCHAR(50))')
+COLUMNS = ('id', 'year', 'batch', 'category', 'requirement', 'college_name', 'college_code', 'college_info',
+           'major_name', 'major_code', 'major_info', 'min_score', 'min_rank', 'avg_score', 'max_score', 'tuition',
+           'city')
+ROWS = [
+    (3, '2024', '本科批', '物理类', '化', '厦门大学', '10384', '985 211', '经济学类', '01', '', 640, 5000, 645, 650, '5460', '厦门'),
+    (5, '2025', '本科批', '物理类', '化', '厦门大学', '10384', '985 211', '经济学类', '01', '', 642, 4800, None, None, '5460', '厦门'),
+    (8, '2025', '本科批', '历史类', '不限', '厦门大学', '10384', '985 211', '法学', '02', '含实验班', 630, 900, 633, 640, '5460', '厦门'),
+    (9, '2025', '本科批', '物理类', '不限', '福州大学', '10386', None, '经济学类', '01', '', 600, 20000, 603, 610, None, '福州'),
+    (12, '2025', '本科批', '物理类', '不限', '福州大学', '10386', '211', '经济学类', '01', None, 601, 19000, 604, 611, '5000', '福州'),
+]
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    """迁移 4 之前的宽表库：user_version = 3"""
+    path = str(tmp_path / 'legacy.db')
+    con = sqlite3.connect(path)
+    con.execute(LEGACY)
+    con.executemany(f'INSERT INTO admission_records VALUES ({", ".join("?" * len(COLUMNS))})', ROWS)
+    con.execute('PRAGMA user_version = 3')
+    con.commit()
+    con.close()
+    engine = create_engine(f'sqlite:///{path}')
+    storage.configure(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_split_keeps_every_row(web, legacy):
+    assert storage.migrate(legacy) == [4]
+    tables = web.admissions
+    with legacy.connect() as conn:
+        got = conn.execute(select(*(tables.wide.c[c] for c in COLUMNS)).order_by(tables.wide.c.id)).all()
+        assert conn.exec_driver_sql('SELECT count(*) FROM colleges').scalar() == 3     # 福州大学信息不同算两个
+        assert conn.exec_driver_sql('SELECT count(*) FROM majors').scalar() == 2       # 经济学类 '' 和 NULL 合并
+        columns = [r[1] for r in conn.exec_driver_sql('PRAGMA table_info(admission_records)')]
+        assert conn.exec_driver_sql('PRAGMA foreign_key_check').all() == []
+    expected = [tuple('' if v is None and c in storage.COLLEGE_KEY + storage.MAJOR_KEY else v
+                      for c, v in zip(COLUMNS, row)) for row in ROWS]
+    assert [tuple(r) for r in got] == expected
+    assert 'college_name' not in columns and {'college_id', 'major_id'} <= set(columns)
+    assert storage.migrate(legacy) == []
+
+
+def test_narrow_reuses_entities_and_prune(web, legacy):
+    storage.migrate(legacy)
+    tables = web.admissions
+    incoming = pd.DataFrame([dict(zip(COLUMNS[1:], ROWS[0][1:])),
+                             dict(zip(COLUMNS[1:], ROWS[0][1:]), college_name='新大学', college_code='99999')])
+    with legacy.begin() as conn:
+        narrow = tables.narrow(conn, incoming)
+        assert narrow['college_id'].iloc[0] == conn.execute(
+            select(tables.records.c.college_id).where(tables.records.c.id == 3)).scalar()
+        assert narrow['major_id'].nunique() == 1
+        assert tables.prune(conn) == 1                 # 新大学还没有招生行引用
+        assert conn.exec_driver_sql('SELECT count(*) FROM colleges').scalar() == 3
@@ -0,0 +1,87 @@
+"""export.py + /query/export、/plan/export：解析导出的 CSV / XLSX，逐行对回页面的结果"""
+import io
+import csv
+from urllib.parse import unquote
+import pytest
+from openpyxl import load_workbook
+
+import export
+
+
+def parse(resp, fmt):
+    """导出文件 -> (表头, 行)；单元格统一成字符串（空单元格 ''）"""
+    if fmt == 'csv':
+        text = resp.data.decode('utf-8')
+        assert text.startswith('\ufeff')                            # Excel 打开中文不乱码
+        rows = list(csv.reader(io.StringIO(text[1:])))
+    else:
+        ws = load_workbook(io.BytesIO(resp.data), read_only=True).active
+        rows = [['' if v is None else str(v) for v in r] for r in ws.iter_rows(values_only=True)]
+    return rows[0], rows[1:]
+
+
+def api_rows(client, **args):
+    """同样条件下 /api/v1/query 全部行（游标翻完）"""
+    out, after = [], None
+    while True:
+        body = client.get('/api/v1/query', query_string={**args, 'page_size': 500, 'after': after,
+                                                          'fields': 'id,college_name,major_name,min_score,probability'}).get_json()
+        out += body['rows']
+        if not body.get('next'):
+            return out
+        after = body['next']
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx'])
+def test_query_export_round_trip(client, fmt):
+    args = {'college': '大学', 'category': '物理类', 'score': '600'}
+    resp = client.get('/query/export', query_string={**args, 'format': fmt})
+    assert resp.status_code == 200 and resp.mimetype == export.FORMATS[fmt]
+    assert 'Content-Length' not in resp.headers                        # 流式，分块发出
+    disposition = resp.headers['Content-Disposition']
+    assert disposition.startswith('attachment;') and unquote(disposition).endswith(f"志愿查询-2025.{fmt}")
+    header, rows = parse(resp, fmt)
+    assert header == list(export.FIELDS.values()) + ['录取概率']
+    expected = api_rows(client, **args)
+    assert len(rows) == len(expected) > 500                          # 跨了不止一块
+    col = {h: i for i, h in enumerate(header)}
+    for row, exp in zip(rows, expected):
+        assert row[col['院校名称']] == exp['college_name'] and row[col['专业名称']] == exp['major_name']
+        assert '大学' in row[col['院校名称']] and row[col['科类']] == '物理类'
+        assert row[col['最低分']] == ('' if exp['min_score'] is None else str(exp['min_score']))
+        assert row[col['录取概率']] == str(exp['probability'])
+
+
+def test_query_export_without_score_has_no_probability(client):
+    header, rows = parse(client.get('/query/export?format=csv&major=经济学'), 'csv')
+    assert header == list(export.FIELDS.values()) and rows
+    assert all('经济学' in r[header.index('专业名称')] for r in rows)
+
+
+def test_bad_format_is_400(client):
+    assert client.get('/query/export?format=pdf').status_code == 400
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'xlsx'])
+def test_plan_export_matches_api(client, fmt):
+    args = {'score': '600', 'category': '物理类'}
+    header, rows = parse(client.get('/plan/export', query_string={**args, 'format': fmt}), fmt)
+    assert header == ['序号', '档位'] + list(export.FIELDS.values()) + ['录取概率']
+    body = client.get('/api/v1/plan', query_string={**args, 'fields': 'college_name,major_name,probability'}).get_json()
+    assert [r[0] for r in rows] == [str(i) for i in range(1, len(rows) + 1)]
+    assert [(r[1], r[header.index('院校名称')], r[header.index('专业名称')], r[-1]) for r in rows] == \
+        [(r['tier'], r['college_name'], r['major_name'], str(r['probability'])) for r in body['rows']]
+
+
+def test_iter_rows_skips_deleted_ids(web, ctx):
+    """导出途中被删掉的行跳过，lead / tail 仍与各自的行对齐"""
+    ids = web.year_index().ids[:3].tolist()
+    rows = list(export.iter_rows(web.db.engine, web.admissions.wide, [ids[0], -1, ids[2]],
+                                 lead=(['a', 'b', 'c'],), tail=([1, 2, 3],)))
+    assert [(r[0], r[-1]) for r in rows] == [('a', 1), ('c', 3)]
+
+
+def test_xlsx_strips_control_characters():
+    data = b''.join(export.xlsx_stream(['列', '数'], [['坏\x01字符', 3]]))
+    ws = load_workbook(io.BytesIO(data), read_only=True).active
+    assert list(ws.iter_rows(values_only=True)) == [('列', '数'), ('坏字符', 3)]
@@ -0,0 +1,138 @@
+"""hashing.py + 登录 / 注册：有界哈希线程池、满了回 503、登录时按新因子重算、按 IP / 用户名限流"""
+import threading
+import bcrypt
+import pytest
+
+import hashing
+
+
+@pytest.fixture
+def limits(web):
+    """每个测试从干净的限流计数开始（计数在进程内存里，测试之间共用）"""
+    for limiter in (web.login_by_ip, web.login_failures):
+        limiter._hits.clear()
+    yield
+    for limiter in (web.login_by_ip, web.login_failures):
+        limiter._hits.clear()
+
+
+@pytest.fixture
+def user(web, ctx):
+    """库里一个考生账号，密码 secret；测完删掉"""
+    u = web.User(username='hash_tester', password=web.hash_pwd('secret'), role='user')
+    web.db.session.add(u)
+    web.db.session.commit()
+    yield u
+    web.db.session.delete(u)
+    web.db.session.commit()
+
+
+def test_hash_and_check():
+    h = hashing.Hasher(rounds=4, workers=2)
+    hashed = h.hash('密码')
+    assert hashed.startswith('$2b$04$') and h.check('密码', hashed) and not h.check('别的', hashed)
+    assert not h.needs_rehash(hashed)
+    assert hashing.Hasher(rounds=5).needs_rehash(hashed) and h.needs_rehash('不是哈希')
+
+
+def test_bounded_pool_rejects_when_full():
+    """workers=1、queue=1：一个在算、一个排队，第三个等 wait 秒拿不到名额抛 HashBusy；放开后名额归还"""
+    h = hashing.Hasher(rounds=4, workers=1, queue=1, wait=0.05)
+    gate, running, peak = threading.Event(), [], []
+
+    def job():
+        running.append(1)
+        peak.append(len(running))
+        gate.wait(5)
+        running.pop()
+        return 'ok'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(h._run(job))) for _ in range(2)]
+    for t in threads:
+        t.start()
+    while not running:
+        pass
+    with pytest.raises(hashing.HashBusy):
+        h._run(job)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert results == ['ok', 'ok'] and max(peak) == 1      # 同时在算的不超过 workers
+    assert h._run(lambda: 'again') == 'again'
+
+
+def test_busy_login_is_503(web, client, user, limits, monkeypatch):
+    busy = hashing.Hasher(rounds=4, workers=1, queue=0, wait=0.05)
+    gate = threading.Event()
+    blocker = threading.Thread(target=busy._run, args=(lambda: gate.wait(5),))
+    blocker.start()
+    monkeypatch.setattr(web, 'hasher', busy)
+    try:
+        resp = client.post('/login', data={'username': 'hash_tester', 'password': 'secret'})
+        assert resp.status_code == 503 and resp.headers['Retry-After'] == str(hashing.HashBusy.retry_after)
+        assert client.get('/whoami').get_json()['username'] is None
+    finally:
+        gate.set()
+        blocker.join(5)
+    resp = client.post('/login', data={'username': 'hash_tester', 'password': 'secret'})
+    assert resp.status_code == 302
+
+
+def test_rehash_on_login(web, client, user, limits):
+    """库里是旧工作因子的哈希：登录成功后按当前因子重算，新哈希仍能验证同一密码"""
+    user.password = bcrypt.hashpw(b'secret', bcrypt.gensalt(5)).decode()
+    web.db.session.commit()
+    assert client.post('/login', data={'username': 'hash_tester', 'password': 'wrong'}).status_code == 200
+    web.db.session.refresh(user)
+    assert user.password.startswith('$2b$05$')                  # 密码错不重算
+    assert client.post('/login', data={'username': 'hash_tester', 'password': 'secret'}).status_code == 302
+    web.db.session.refresh(user)
+    assert user.password.startswith(f"$2b${web.app.config['BCRYPT_ROUNDS']:02d}$")
+    assert bcrypt.checkpw(b'secret', user.password.encode())
+
+
+def test_rate_limiter_window(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(hashing.time, 'monotonic', lambda: now[0])
+    rl = hashing.RateLimiter(limit=3, window=60, max_keys=2)
+    for _ in range(3):
+        assert rl.retry_after('a') == 0
+        rl.hit('a')
+    assert rl.retry_after('a') == 61
+    now[0] += 30
+    assert rl.retry_after('a') == 31
+    now[0] += 31
+    assert rl.retry_after('a') == 0                              # 窗口滑过去了
+    rl.hit('b')
+    rl.hit('c')                                                  # 超过 max_keys，最久没动的 a 被淘汰
+    assert set(rl._hits) == {'b', 'c'}
+    rl.reset('b')
+    assert rl.retry_after('b') == 0 and 'b' not in rl._hits
+
+
+def test_login_limited_per_ip(web, client, limits):
+    """同一 IP 每分钟最多 LOGIN_LIMIT_IP 次，超了 429；别的 IP 不受影响"""
+    limit = web.app.config['LOGIN_LIMIT_IP']
+    env = {'REMOTE_ADDR': '10.0.0.1'}
+    for i in range(limit):
+        resp = client.post('/login', data={'username': f'nobody{i}', 'password': 'x'}, environ_base=env)
+        assert resp.status_code == 200
+    resp = client.post('/login', data={'username': 'nobody', 'password': 'x'}, environ_base=env)
+    assert resp.status_code == 429 and int(resp.headers['Retry-After']) > 0
+    assert client.post('/register', data={'username': 'nobody', 'password': 'x'}, environ_base=env).status_code == 429
+    other = client.post('/login', data={'username': 'nobody', 'password': 'x'}, environ_base={'REMOTE_ADDR': '10.0.0.2'})
+    assert other.status_code == 200
+
+
+def test_login_failures_limited_per_user(web, client, user, limits):
+    """同一用户名连续失败 LOGIN_LIMIT_USER 次后，正确密码也要等；成功登录清零"""
+    limit = web.app.config['LOGIN_LIMIT_USER']
+    for i in range(limit):
+        env = {'REMOTE_ADDR': f'10.0.1.{i}'}                     # 换 IP 也按用户名计数
+        assert client.post('/login', data={'username': 'hash_tester', 'password': 'bad'}, environ_base=env).status_code == 200
+    resp = client.post('/login', data={'username': 'hash_tester', 'password': 'secret'})
+    assert resp.status_code == 429
+    web.login_failures.reset('hash_tester')
+    assert client.post('/login', data={'username': 'hash_tester', 'password': 'secret'}).status_code == 302
+    assert web.login_failures.retry_after('hash_tester') == 0
@@ -0,0 +1,70 @@
+"""ingest.normalize：表头别名（按候选顺序取）、科类简写、默认年份、整数 / 代码列清洗、缺列补空"""
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+import ingest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def raw(**cols):
+    base = {'年份': ['2024', None, np.nan], '科类': ['物理', '历史', '物理类'], '院校名称': ['甲大学', '乙学院', '丙大学'],
+            '院校代码': [1001.0, np.nan, 1003.0], '专业名称': ['数学', '历史学', '法学'], '最低分1': [601.7, '-', None],
+            '平均分': [610, None, None]}
+    base.update(cols)
+    return pd.DataFrame(base)
+
+
+def test_categories_years_and_ints():
+    out = ingest.normalize(raw())
+    assert list(out.columns) == list(ingest.RECORD_FIELDS)
+    assert out['category'].tolist() == ['物理类', '历史类', '物理类']
+    assert out['year'].tolist() == ['2024', '2025', '2025']             # 空年份按 2025
+    assert out['college_code'].tolist() == ['1001', '', '1003']          # 浮点代码去掉 .0
+    assert out['min_score'].tolist() == [601, pd.NA, pd.NA]             # 小数截断，非数字为空
+    assert out['avg_score'].tolist() == [610, pd.NA, pd.NA]
+    assert str(out['min_score'].dtype) == 'Int64'
+
+
+def test_avg_falls_back_to_min():
+    out = ingest.normalize(raw(**{'最低分1': [600, 550, None], '平均分': [None, None, None]}))
+    assert out['avg_score'].tolist() == [600, 550, pd.NA]
+
+
+@pytest.mark.parametrize('field, headers', [(f, h) for f, h in ingest.COLUMN_ALIASES.items() if len(h) > 1])
+def test_aliases_first_present_wins(field, headers):
+    """每个别名单独都能认出；几个同时在时取候选里靠前的"""
+    value = (lambda i: 500 + i) if field in ingest.INT_FIELDS else (lambda i: f'值{i}')
+    for i, header in enumerate(headers):
+        df = raw().drop(columns=['最低分1', '平均分']).assign(**{header: value(i)})
+        assert ingest.normalize(df)[field].tolist() == [value(i)] * 3
+    df = raw().drop(columns=['最低分1', '平均分']).assign(**{h: value(i) for i, h in enumerate(headers)})
+    assert ingest.normalize(df)[field].tolist() == [value(0)] * 3
+
+
+def test_missing_columns_and_rows():
+    df = raw()
+    df.loc[1, '院校名称'] = None
+    out = ingest.normalize(df.drop(columns=['科类']))
+    assert len(out) == 2 and out['college_name'].tolist() == ['甲大学', '丙大学']   # 没院校名的行丢掉
+    assert out['category'].tolist() == ['', ''] and out['max_score'].isna().all()
+    assert out['min_score'].tolist() == [601, pd.NA]                    # 丢行后索引重排，整数列仍对齐
+    with pytest.raises(ValueError, match='院校名称'):
+        ingest.normalize(df.drop(columns=['院校名称']))
+
+
+def test_text_is_stripped():
+    out = ingest.normalize(raw(**{'城市': [' 福州 ', None, '厦门'], '专业代码': ['  080101', 80102, None]}))
+    assert out['city'].tolist() == ['福州', '', '厦门']
+    assert out['major_code'].tolist() == ['080101', '80102', '']
+
+
+def test_real_workbook(web):
+    out = ingest.normalize(ingest.read_workbook(os.path.join(ROOT, web.XLSX)))
+    assert len(out) > 1000 and set(out['category']) <= {'物理类', '历史类'}
+    assert (out['year'] != '').all() and (out['college_name'] != '').all()
+    assert out['min_score'].notna().mean() > 0.9
+    with web.app.app_context():
+        assert len(out) == web.db.session.query(web.AdmissionRecord).count()
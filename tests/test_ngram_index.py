@@ -0,0 +1,39 @@
+"""ngram_index.py：子串搜索结果与 SQLite 的 LIKE '%kw%' 一致"""
+import sqlite3
+import pytest
+from ngram_index import NgramIndex
+
+EXTRA = ['MBA 中心', 'mba中心', 'Abc_100%', '中外合作(ABC)', '', '学']
+NEEDLES = ['大学', '学', '厦门大学', '福建医科', '不存在的院校', 'mba', 'MBA', 'b', 'c_1', '100%', '%', '_',
+           '大%院', '(面向', '中外合作(', ' ']
+
+
+@pytest.fixture(scope='module')
+def names(web):
+    return sorted(set(web.get_index().texts['college_name'].values) | set(EXTRA))
+
+
+def like(values, needle):
+    con = sqlite3.connect(':memory:')
+    con.execute('CREATE TABLE t (i INTEGER, v TEXT)')
+    con.executemany('INSERT INTO t VALUES (?, ?)', enumerate(values))
+    return [i for (i,) in con.execute("SELECT i FROM t WHERE v LIKE '%' || ? || '%' ORDER BY i", (needle,))]
+
+
+@pytest.mark.parametrize('needle', NEEDLES)
+def test_search_matches_like(names, needle):
+    assert NgramIndex(names).search(needle).tolist() == like(names, needle)
+
+
+def test_empty_needle_matches_all(names):
+    assert NgramIndex(names).search('').tolist() == list(range(len(names)))
+
+
+@pytest.mark.parametrize('field, needle', [('college_name', '大学'), ('major_name', '工程'), ('requirement', '化')])
+def test_index_filter_matches_sql(web, ctx, field, needle):
+    """索引上的过滤与原来 SQL 的 LIKE 过滤命中同样的行"""
+    idx = web.get_index()
+    w = web.admissions.wide
+    ids = web.db.session.execute(web.db.select(w.c.id).where(w.c[field].like(f'%{needle}%')).order_by(w.c.id)).scalars().all()
+    key = {'college_name': 'college', 'major_name': 'major', 'requirement': 'requirement'}[field]
+    assert idx.ids[idx.filter(**{key: needle})].tolist() == ids
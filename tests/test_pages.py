@@ -0,0 +1,86 @@
+"""pages.py：模板启动时都能编译，宏 / 导航栏的输出与转义，正文不经过模板引擎"""
+from types import SimpleNamespace as NS
+import pytest
+
+import pages
+
+XSS = '<script>alert(1)</script>'
+
+
+@pytest.fixture
+def req(web):
+    with web.app.test_request_context():
+        yield web
+
+
+def test_all_templates_compile(web):
+    for name in pages.TEMPLATES:
+        tmpl = web.app.jinja_env.get_template(name)
+        assert tmpl.environment.autoescape(name)                 # .html 模板默认转义
+    macros = web.app.jinja_env.get_template('rows.html').module
+    for name in ('prob_badge', 'query_rows', 'college_rows', 'major_rows', 'plan_rows', 'programme_rows',
+                 'entity_stats', 'user_rows', 'admin_data_rows', 'timing_rows'):
+        assert callable(getattr(macros, name))
+
+
+def test_query_rows_escape_and_badges(req):
+    rows = [NS(college_name=XSS, major_name='"引号"', category='物理类', min_score=600, avg_score=None)] * 3
+    html = req.rows_macro('query_rows', rows, [90, 50, None])
+    assert type(html) is str
+    assert XSS not in html and '&lt;script&gt;alert(1)&lt;/script&gt;' in html
+    assert 'href="/college/&lt;script&gt;' in html and '&#34;引号&#34;' in html
+    assert html.count('<tr>') == 3
+    assert ['bg-success' in html, 'bg-warning' in html, 'bg-danger' in html] == [True] * 3
+    assert '>-%</span>' in html                                  # 没有概率
+
+
+def test_summary_rows_and_score_range(req):
+    rows = [NS(name='甲<b>', code='1', city=None, count=3, min_score=500, max_score=600),
+            NS(name='乙', code=None, city='', count=1, min_score=None, max_score=None)]
+    html = req.rows_macro('college_rows', rows)
+    assert '甲&lt;b&gt;' in html and '<b>' not in html
+    assert '<td>500~600</td>' in html and '<td></td>' in html and 'None' not in html
+    assert '<td></td><td>1</td>\n      <td></td>' in req.rows_macro('major_rows', rows[1:])   # 空代码、空分数段
+
+
+def test_plan_and_admin_rows(req):
+    r = NS(id=7, college_name=XSS, major_name='专业', requirement='化', city='福州', tuition=5000, category='物理类',
+           min_score=600, min_rank=12000, avg_score=605)
+    html = req.rows_macro('plan_rows', [r, r], ['冲', '保'], [30, 85])
+    assert 'table-danger' in html and 'table-success' in html and XSS not in html
+    html = req.rows_macro('admin_data_rows', [r])
+    assert '/admin/data/edit/7' in html and XSS not in html
+    html = req.rows_macro('user_rows', [NS(id=1, username=XSS, role='user')])
+    assert XSS not in html
+
+
+def test_entity_stats_tojson_is_script_safe(req):
+    d = NS(year='2025', programmes=2, by_category={'物理类': 2}, min_score=600, avg_score=None, max_score=610,
+           min_rank=None, max_rank=None)
+    html = req.rows_macro('entity_stats', d, '招生专业', ['</script><b>'], [1])
+    assert '</script><b>' not in html and '\\u003c/script\\u003e' in html
+    assert '平均分：</strong>-' in html and '最低位次：</strong>-' in html
+    assert 'scoreHist' not in req.rows_macro('entity_stats', d, '招生专业', [], [])
+
+
+def test_navbar_variants(req):
+    anon = req.navbar((None, None))
+    assert '/login' in anon and '/logout' not in anon
+    named = req.navbar((XSS, 'user'))
+    assert '/logout' in named and XSS not in named and '&lt;script&gt;alert(1)&lt;/script&gt; (user)' in named
+    assert '/whoami' not in named
+    shared = req.navbar(('', 'admin'))
+    assert 'id="nav-user"></span>' in shared and '/whoami' in shared and 'textContent' in shared
+    assert req.navbar((XSS, 'user')) is named                    # 渲染一次后缓存
+
+
+def test_body_is_not_a_template(client):
+    """页面正文直接拼字符串，用户输入里的模板语法不会被执行"""
+    html = client.get('/colleges', query_string={'search': '{{ 7 * 7 }}{% if 1 %}X{% endif %}'}).get_data(as_text=True)
+    assert '{{ 7 * 7 }}' in html and '>49<' not in html
+    assert html.startswith(pages.SHELL_HEAD) and html.endswith(pages.SHELL_TAIL)
+
+
+def test_render_time_recorded(client):
+    resp = client.get('/colleges?search=厦门')
+    assert 'render;dur=' in resp.headers.get('Server-Timing', '')
@@ -0,0 +1,45 @@
+"""游标分页（admission_index.page_after / order_keys）与 /query 的分页、流式输出"""
+import re
+import numpy as np
+import pytest
+from admission_index import order_keys, page_after
+
+
+def walk(keys, limit):
+    """按游标一页页取完，返回拼起来的下标"""
+    out, after = [], None
+    while True:
+        page = page_after(keys, after, limit)
+        out += page.tolist()
+        if len(page) < limit:
+            return out
+        after = keys[page[-1]]
+
+
+@pytest.mark.parametrize('limit', [1, 7, 50, 10000])
+def test_pages_cover_sorted_order_once(limit):
+    rng = np.random.default_rng(0)
+    keys = order_keys(rng.integers(0, 100, 1000), rng.integers(400, 700, 1000), np.arange(1000))
+    assert walk(keys, limit) == np.argsort(keys, kind='stable').tolist()
+
+
+def test_order_keys_priority():
+    """概率高在前，同概率平均分高在前，再同按 id 升序"""
+    keys = order_keys(np.array([70, 95, 70, 70]), np.array([600, 500, 610, 600]), np.array([4, 3, 2, 1]))
+    assert page_after(keys).tolist() == [1, 2, 3, 0]
+
+
+def test_query_pages_match_full_listing(web, client):
+    args = {'score': 600, 'category': '物理类', 'page_size': 20}
+    stream = {k: v for k, v in args.items() if k != 'page_size'}       # 流式不给 page_size 就是全部
+    full = client.get('/query', query_string={**stream, 'stream': 1}).get_data(as_text=True)
+    seen, after = [], None
+    for _ in range(1000):
+        html = client.get('/query', query_string={**args, **({'after': after} if after else {})}).get_data(as_text=True)
+        seen += re.findall(r'<tr>.*?</tr>', html[html.index('<tbody>'):], re.S)
+        m = re.search(r'after=(\d+)[^"]*">下一页', html)
+        if not m:
+            break
+        after = m.group(1)
+    assert seen == re.findall(r'<tr>.*?</tr>', full[full.index('<tbody>'):], re.S)
+    assert len(seen) > args['page_size']
@@ -0,0 +1,66 @@
+"""整数参数（/plan 及其导出 / API、/query、后台数据管理）：不对时给带字段名的提示，回显的用户输入都转义"""
+import pytest
+
+XSS = '<script>alert(1)</script>'
+
+
+@pytest.mark.parametrize('field, label', [('score', '高考分数'), ('rank', '全省位次'),
+                                          ('tuition_max', '学费上限'), ('per_college', '同校最多'),
+                                          ('chong', '冲档志愿数')])
+def test_bad_integer_names_the_field(client, field, label):
+    args = {'score': '600', 'category': '物理类', field: XSS}
+    html = client.get('/plan', query_string=args).get_data(as_text=True)
+    assert f'{label}必须是整数' in html
+    assert XSS not in html and '&lt;script&gt;' in html      # 表单回显已转义
+    assert 'invalid literal' not in html
+
+    resp = client.get('/api/v1/plan', query_string=args)
+    assert resp.status_code == 400 and resp.get_json()['error'] == f'{label}必须是整数'
+
+    resp = client.get('/plan/export', query_string=args)
+    assert resp.status_code == 400 and resp.get_data(as_text=True) == f'{label}必须是整数'
+
+
+def test_text_fields_are_escaped(client):
+    html = client.get('/plan', query_string={'score': '600', 'category': '物理类', 'city': f'"{XSS}',
+                                             'subjects': XSS}).get_data(as_text=True)
+    assert XSS not in html and 'value="&#34;' in html
+
+
+def test_plan_still_works(client):
+    html = client.get('/plan', query_string={'score': '600', 'category': '物理类'}).get_data(as_text=True)
+    assert '共 ' in html and 'alert-danger' not in html
+
+
+@pytest.mark.parametrize('path, field', [('/query', 'college'), ('/query', 'major'), ('/query', 'requirement'),
+                                         ('/colleges', 'search'), ('/majors', 'search')])
+def test_search_echo_is_escaped(client, path, field):
+    html = client.get(path, query_string={field: f'"{XSS}'}).get_data(as_text=True)
+    assert XSS not in html
+
+
+def test_query_bad_score(client):
+    resp = client.get('/query', query_string={'score': XSS})
+    assert resp.status_code == 400
+    html = resp.get_data(as_text=True)
+    assert '高考分数必须是整数' in html and XSS not in html
+    assert client.get('/query/export', query_string={'score': 'x'}).status_code == 400
+    resp = client.get('/api/v1/query', query_string={'page_size': 'x'})
+    assert resp.status_code == 400 and resp.get_json()['error'] == '每页条数必须是整数'
+
+
+def test_admin_data_bad_page(admin):
+    resp = admin.get('/admin/data', query_string={'page': XSS})
+    assert resp.status_code == 400
+    html = resp.get_data(as_text=True)
+    assert '页码必须是整数' in html and XSS not in html
+    assert admin.get('/admin/data?page=2').status_code == 200
+
+
+def test_admin_record_form_bad_score(web, admin, record_form):
+    before = len(web.get_index())
+    resp = admin.post('/admin/data/add', data={**record_form, 'min_score': '六百'})
+    assert resp.status_code == 400 and '最低分必须是整数' in resp.get_data(as_text=True)
+    assert len(web.get_index()) == before
+    resp = admin.post('/admin/data/edit/1', data={**record_form, 'min_rank': 'x'})
+    assert resp.status_code == 400 and '最低位次必须是整数' in resp.get_data(as_text=True)
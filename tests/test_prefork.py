@@ -0,0 +1,86 @@
+"""gunicorn 预加载：before_fork 把只读结构建好并断开连接，after_fork 换新连接池 / 哈希线程池；gunicorn.conf.py 的钩子"""
+import os
+import json
+import runpy
+import pytest
+
+import hashing
+
+CONF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gunicorn.conf.py')
+
+
+@pytest.fixture
+def prefork(web, monkeypatch):
+    """before_fork 之后的状态；测完换回原来的哈希线程池"""
+    monkeypatch.setattr(web, 'hasher', web.hasher)
+    web.before_fork()
+    return web
+
+
+def test_before_fork_warms_everything(prefork):
+    web = prefork
+    with web.app.app_context():
+        assert web.db.engine.pool.checkedin() == 0                # master 不留连接给 worker 继承
+        idx = web.get_index()
+        part = web.year_index()
+        assert set(idx.years) <= set(idx._partitions) and part is idx._partitions[idx.current_year]
+        assert set(part._summaries) == {'college_name', 'major_name'} and '' in part._by_avg
+        assert web._rank_table[0] == (part.version, part.year)
+        assert {k[2] for k in web._suggesters if k[:2] == (part.version, part.year)} == set(web.SUGGEST_FIELDS.values())
+        assert web._details[0] == web.data_version.get()
+
+
+def test_after_fork_in_child(prefork):
+    """真 fork 一个子进程：after_fork 后能查库、能算哈希，索引直接用继承来的那份"""
+    web = prefork
+    with web.app.app_context():
+        parent_idx = web.get_index()
+        expected = web.db.session.query(web.AdmissionRecord).count()
+    parent_hasher = web.hasher
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:                                                 # 子进程：任何情况都 _exit，不回到 pytest
+        code = 1
+        try:
+            web.after_fork()
+            with web.app.app_context():
+                out = {'count': web.db.session.query(web.AdmissionRecord).count(),
+                       'same_index': web.get_index() is parent_idx,
+                       'new_hasher': web.hasher is not parent_hasher,
+                       'hash_ok': web.hasher.check('pw', web.hash_pwd('pw'))}
+            os.write(write, json.dumps(out).encode())
+            code = 0
+        finally:
+            os._exit(code)
+    os.close(write)
+    _, status = os.waitpid(pid, 0)
+    with os.fdopen(read) as f:
+        out = json.loads(f.read() or '{}')
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert out == {'count': expected, 'same_index': True, 'new_hasher': True, 'hash_ok': True}
+    with web.app.app_context():                                  # 父进程的连接也照常可用
+        assert web.db.session.query(web.AdmissionRecord).count() == expected
+
+
+def test_after_fork_replaces_hasher(web, monkeypatch):
+    monkeypatch.setattr(web, 'hasher', web.hasher)
+    old = web.hasher
+    web.after_fork()
+    assert web.hasher is not old and isinstance(web.hasher, hashing.Hasher)
+    assert web.hasher.rounds == web.app.config['BCRYPT_ROUNDS']
+    with web.app.app_context():
+        assert web.db.session.query(web.User).count() >= 1
+
+
+def test_gunicorn_conf_hooks(web, monkeypatch):
+    conf = runpy.run_path(CONF)
+    assert conf['preload_app'] is True and conf['worker_class'] == 'gthread' and conf['threads'] >= 1
+    calls = []
+    monkeypatch.setattr(web, 'before_fork', lambda: calls.append('before_fork'))
+    monkeypatch.setattr(web, 'after_fork', lambda: calls.append('after_fork'))
+    fake_gc = type('gc', (), {'collect': staticmethod(lambda: calls.append('collect')),
+                              'freeze': staticmethod(lambda: calls.append('freeze'))})
+    conf['when_ready'].__globals__['gc'] = fake_gc               # 别真的 freeze 测试进程
+    conf['when_ready'](None)
+    conf['post_fork'](None, None)
+    assert calls == ['before_fork', 'collect', 'freeze', 'after_fork']
@@ -0,0 +1,52 @@
+"""分差模型：calc_probabilities（整列）与逐行的 calc_probability 逐个一致；老库的 probability 列迁移后去掉"""
+import sqlite3
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+import storage
+
+
+@pytest.mark.parametrize('user_score', [575, 600, 625, 650])
+def test_vector_matches_scalar_on_boundaries(web, user_score):
+    # 分差正好 25 / 0 / -25 及两侧，外加最低分、平均分为空（0）的组合
+    avg = np.array([600 + d for d in (-26, -25, -24, -1, 0, 1, 24, 25, 26)] * 3 + [0, 0, 600], dtype=np.int32)
+    min_s = np.array([590] * 9 + [0] * 9 + [700] * 9 + [0, 590, 0], dtype=np.int32)
+    got = web.calc_probabilities(user_score, min_s, avg).tolist()
+    assert got == [web.calc_probability(user_score, int(m), int(a)) for m, a in zip(min_s, avg)]
+
+
+def test_bands(web):
+    assert web.calc_probabilities(625, [590, 590, 590, 590], [600, 625, 650, 651]).tolist() == [95, 70, 40, 10]
+    assert web.calc_probability(600, None, 600) == 0 and web.calc_probability(600, 590, None) == 0
+
+
+def test_vector_matches_scalar_on_real_data(web, ctx):
+    idx = web.year_index()
+    pos = np.arange(len(idx))
+    min_s, avg_s = idx.scores(pos)
+    for score in (450, 560, 600, 640):
+        got = web.calc_probabilities(score, min_s, avg_s)
+        assert got.tolist() == [web.calc_probability(score, int(m), int(a)) for m, a in zip(min_s, avg_s)]
+
+
+def test_legacy_probability_column_dropped(web, tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    con = sqlite3.connect(path)
+    con.execute('CREATE TABLE admission_records (id INTEGER NOT NULL PRIMARY KEY, year VARCHAR(10), '
+                'batch VARCHAR(50), category VARCHAR(50), requirement VARCHAR(100), college_name VARCHAR(100), '
+                'college_code VARCHAR(20), college_info TEXT, major_name VARCHAR(100), major_code VARCHAR(20), '
+                'major_info TEXT, min_score INTEGER, min_rank INTEGER, avg_score INTEGER, max_score INTEGER, '
+                'tuition VARCHAR(50), city VARCHAR(50), probability INTEGER)')
+    con.execute("INSERT INTO admission_records VALUES (1, '2025', '本科批', '物理类', '', '厦门大学', '10384', '', "
+                "'经济学类', '01', '', 640, 5000, 645, 650, '5460', '厦门', 70)")
+    con.execute('PRAGMA user_version = 3')
+    con.commit()
+    con.close()
+    engine = create_engine(f'sqlite:///{path}')
+    assert storage.migrate(engine) == [4]
+    with engine.connect() as conn:
+        columns = [r[1] for r in conn.exec_driver_sql('PRAGMA table_info(admission_records)')]
+        assert 'probability' not in columns
+        assert conn.exec_driver_sql('SELECT min_score, avg_score FROM admission_records').all() == [(640, 645)]
+    engine.dispose()
@@ -0,0 +1,53 @@
+"""rank_model.py：一分一段表查位次、位次概率分档、趋势模型降档"""
+import numpy as np
+import pytest
+import rank_model
+from rank_model import ScoreRankTable, rank_probabilities, RANK_FLOOR
+
+
+def test_rank_probability_bands():
+    min_rank = np.array([13000, 12999, 10000, 9999, 8000, 7999, 0])
+    assert rank_probabilities(10000, min_rank).tolist() == [95, 70, 70, 40, 40, RANK_FLOOR, 0]
+    assert rank_probabilities(0, min_rank).tolist() == [0] * len(min_rank)
+
+
+def test_table_from_csv(tmp_path):
+    path = tmp_path / '一分一段.csv'
+    path.write_text('科类,分数,人数\n物理,700,5\n物理,699,10\n物理,698,20\n历史,650,3\n', encoding='utf-8')
+    table = ScoreRankTable.from_csv(str(path))
+    assert [table.rank('物理类', s) for s in (701, 700, 699, 698, 600)] == [1, 5, 15, 35, 35]
+    assert table.rank('历史类', 650) == 3
+    assert table.rank('不存在', 650) == 0
+
+
+def test_fitted_table_is_monotonic(web, ctx):
+    idx = web.year_index()
+    table = ScoreRankTable.load(idx)
+    assert table.source == 'admissions'
+    for cat, (scores, cum) in table.tables.items():
+        assert scores == sorted(scores)
+        assert (np.diff(cum) <= 0).all(), f'{cat}：分数越高位次应越靠前'
+
+
+@pytest.mark.parametrize('model', ['rank', 'trend'])
+def test_models_score_every_row(web, ctx, model):
+    idx = web.year_index()
+    pos = idx.filter(category='物理类')
+    prob = web.score_probabilities(idx, pos, 600, model)
+    assert len(prob) == len(pos)
+    assert set(np.unique(prob)) <= {0, 10, 40, 70, 95}
+    no_rank = idx.ints['min_rank'][pos] == 0
+    assert (prob[no_rank] == 0).all()
+
+
+def test_trend_volatility_lowers_one_band(web, ctx):
+    idx = web.year_index()
+    pos = idx.filter(category='物理类')[:50]
+    table = web.get_rank_table(idx)
+    base = rank_model.probabilities(table, 600, idx, pos)
+    volatile = type(idx).__new__(type(idx))
+    volatile.__dict__.update(idx.__dict__)
+    volatile.trends = {'score_volatility': np.full(len(idx), rank_model.VOLATILE_STD + 1.0)}
+    lowered = rank_model.trend_probabilities(table, 600, volatile, pos)
+    step = {95: 70, 70: 40, 40: RANK_FLOOR, RANK_FLOOR: RANK_FLOOR, 0: 0}
+    assert lowered.tolist() == [step[p] for p in base.tolist()]
@@ -0,0 +1,40 @@
+"""公开页面缓存（main.cached_view）：ETag / 304、参数规范化、数据版本号变了就失效"""
+URL = '/colleges'
+
+
+def test_etag_and_304(client):
+    first = client.get(URL)
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and etag.startswith('"v')
+    again = client.get(URL, headers={'If-None-Match': etag})
+    assert again.status_code == 304 and again.headers['ETag'] == etag and not again.data
+    assert client.get(URL, headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_cached_body_identical(client):
+    assert client.get(URL).data == client.get(URL).data
+
+
+def test_param_order_and_empty_values_share_key(client):
+    a = client.get('/query?score=600&category=物理类&college=')
+    b = client.get('/query?category=物理类&score=600')
+    assert a.headers['ETag'] == b.headers['ETag']
+    assert a.headers['ETag'] != client.get('/query?score=601&category=物理类').headers['ETag']
+
+
+def test_login_state_in_key(client, admin):
+    anonymous = client.application.test_client().get(URL).headers['ETag']
+    assert admin.get(URL).headers['ETag'] != anonymous
+
+
+def test_version_bump_invalidates(web, client):
+    etag = client.get(URL).headers['ETag']
+    with web.app.app_context():
+        web.index_changed(lambda idx, v: idx._retag(v))
+    fresh = client.get(URL, headers={'If-None-Match': etag})
+    assert fresh.status_code == 200 and fresh.headers['ETag'] != etag
+
+
+def test_post_and_stream_not_cached(client):
+    assert 'ETag' not in client.post('/query', data={'score': 600}).headers
+    assert 'ETag' not in client.get('/query?score=600&stream=1').headers
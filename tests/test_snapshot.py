@@ -0,0 +1,95 @@
+"""snapshot.py：写入再读回与 normalize 的结果一致，按 Excel 内容哈希命中 / 失效，坏快照自动重建"""
+import os
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+
+import ingest
+import snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEADER = ['年份', '科类', '院校名称', '院校代码', '专业名称', '最低分1', '平均分', '最低位次', '城市']
+
+
+def write_xlsx(path, rows):
+    """专家版格式：前两行标题，第 3 行表头"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(['福建高考志愿'])
+    ws.append([])
+    ws.append(HEADER)
+    for r in rows:
+        ws.append(r)
+    wb.save(path)
+
+
+ROWS = [['2025', '物理', '甲大学', 1001, '数学', 601, 610, 12000, '福州'],
+        [None, '历史', '乙学院', None, '历史学', None, None, None, None],
+        ['2024', '物理', '甲大学', 1001, '法学', 580, None, 20000, '福州']]
+
+
+@pytest.fixture
+def xlsx(tmp_path):
+    path = tmp_path / 'data.xlsx'
+    write_xlsx(path, ROWS)
+    return str(path)
+
+
+def test_round_trip(xlsx, tmp_path):
+    frame = ingest.normalize(ingest.read_workbook(xlsx))
+    snap = snapshot.load(snapshot.save(frame, str(tmp_path / 'snap'), 'abc'))
+    assert len(snap) == 3 and snap.source_hash == 'abc'
+    restored = snap.to_frame()
+    # 表里没有的列 normalize 给的是 object 型 ''，读回来是 string 型，值一样
+    pd.testing.assert_frame_equal(restored, frame, check_dtype=False)
+    assert all(str(restored[c].dtype) == 'Int64' for c in ingest.INT_FIELDS)
+    assert isinstance(snap.ints['min_score'], np.memmap) and snap.ints['min_score'].dtype == np.int32
+    assert snap.ints['min_score'].tolist() == [601, snapshot.INT_NA, 580]
+    assert snap.column('college_name').tolist() == ['甲大学', '乙学院', '甲大学']
+    assert snap.strs['college_name'][1] == ['乙学院', '甲大学']         # 字典表排好序、去重
+    assert not [p for p in os.listdir(tmp_path) if p.startswith('.tmp-')]
+
+
+def test_hit_and_invalidate(xlsx, tmp_path, monkeypatch):
+    cache = str(tmp_path / 'cache')
+    first = snapshot.load_or_build(xlsx, cache)
+    assert os.path.basename(first.path) == snapshot.file_hash(xlsx) == first.source_hash
+
+    with monkeypatch.context() as m:                                 # 内容没变：直接读快照
+        m.setattr(ingest, 'read_workbook', lambda path: pytest.fail('不该再解析 Excel'))
+        again = snapshot.load_or_build(xlsx, cache)
+    assert again.path == first.path
+    pd.testing.assert_frame_equal(again.to_frame(), first.to_frame())
+
+    write_xlsx(xlsx, ROWS[:2] + [['2024', '物理', '丙大学', 1003, '法学', 590, None, 18000, '厦门']])
+    changed = snapshot.load_or_build(xlsx, cache)                    # 内容变了：哈希变，重建
+    assert changed.path != first.path
+    assert changed.column('college_name').tolist()[-1] == '丙大学' and changed.ints['min_score'][-1] == 590
+    assert first.column('college_name').tolist()[-1] == '甲大学'       # 旧快照原样留着，不会被误用
+
+
+@pytest.mark.parametrize('damage', ['format', 'missing', 'garbage'])
+def test_bad_snapshot_rebuilt(xlsx, tmp_path, damage):
+    cache = str(tmp_path / 'cache')
+    path = snapshot.load_or_build(xlsx, cache).path
+    meta = os.path.join(path, 'meta.json')
+    if damage == 'format':
+        with open(meta, 'w', encoding='utf-8') as f:
+            json.dump({'format': snapshot.FORMAT + 1}, f)
+    elif damage == 'missing':
+        os.remove(meta)
+    else:
+        with open(meta, 'w', encoding='utf-8') as f:
+            f.write('{不是 json')
+    assert snapshot.load(path) is None
+    snap = snapshot.load_or_build(xlsx, cache)
+    assert snap.path == path and len(snap) == 3 and snap.meta['format'] == snapshot.FORMAT
+
+
+def test_real_workbook_matches_normalize(web):
+    path = os.path.join(ROOT, web.XLSX)
+    snap = snapshot.load_or_build(path)                              # 会话开始导入时已建好
+    assert os.path.dirname(snap.path) == snapshot.SNAPSHOT_DIR
+    pd.testing.assert_frame_equal(snap.to_frame(), ingest.normalize(ingest.read_workbook(path)))
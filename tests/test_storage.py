@@ -0,0 +1,20 @@
+"""storage.py：PRAGMA、迁移版本、热点查询走索引"""
+import storage
+
+
+def test_pragmas(web, ctx):
+    with web.db.engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA journal_mode').scalar() == 'wal'
+        assert conn.exec_driver_sql('PRAGMA foreign_keys').scalar() == 1
+
+
+def test_schema_is_latest(web, ctx):
+    assert storage.schema_version(web.db.engine) == storage.MIGRATIONS[-1][0]
+    assert storage.migrate(web.db.engine) == []          # 再跑一遍什么都不做
+
+
+def test_hot_queries_use_indexes(web, ctx):
+    plans = storage.check_plans(web.db.engine)
+    assert set(plans) == set(storage.HOT_QUERIES)
+    bad = {name: plan for name, (used, plan) in plans.items() if not used}
+    assert not bad, f'没走预期索引：{bad}'
@@ -0,0 +1,71 @@
+"""suggest.py：名称 / 全拼 / 首字母前缀、按招生数排序、子串补齐、单次查找耗时"""
+import time
+import pytest
+
+import suggest
+
+NAMES  = ['厦门大学', '厦门理工学院', '西安交通大学', '福州大学', '福建师范大学', '集美大学']
+COUNTS = [120, 80, 200, 150, 150, 90]
+
+
+@pytest.fixture(scope='module')
+def small():
+    return suggest.Suggester(NAMES, COUNTS)
+
+
+def names(items):
+    return [n for n, _ in items]
+
+
+def test_pinyin_keys():
+    assert suggest.pinyin_keys('厦门大学') == ('xiamendaxue', 'xmdx')
+    assert suggest.pinyin_keys('C9 联盟') == ('c9lianmeng', 'c9lm')
+
+
+@pytest.mark.parametrize('q, expected', [
+    ('厦门', ['厦门大学', '厦门理工学院']),        # 名称前缀，按招生数降序
+    ('xiamen', ['厦门大学', '厦门理工学院']),      # 全拼前缀
+    ('xmdx', ['厦门大学']),                        # 首字母
+    ('XM DX', ['厦门大学']),                       # 大小写、空白不影响
+    ('fz', ['福州大学']),
+    ('xa', ['西安交通大学']),
+])
+def test_prefix_matches(small, q, expected):
+    assert names(small.search(q)) == expected
+
+
+def test_ranking_by_count_then_name(small):
+    # x 开头：西安交大 200、厦大 120、厦门理工 80；f 开头两个并列 150 按名称
+    assert small.search('x') == [('西安交通大学', 200), ('厦门大学', 120), ('厦门理工学院', 80)]
+    assert names(small.search('f')) == sorted(['福州大学', '福建师范大学'])
+    assert names(small.search('x', limit=2)) == ['西安交通大学', '厦门大学']
+    assert small.search('') == [] and small.search('zzz') == []
+
+
+def test_api_on_real_data(client):
+    body = client.get('/api/v1/suggest', query_string={'field': 'college', 'q': 'xmdx'}).get_json()
+    got = [i['name'] for i in body['items']]
+    assert '厦门大学' in got and all(n.startswith('厦门大学') for n in got)
+    counts = [i['count'] for i in client.get('/api/v1/suggest?field=college&q=f&limit=20').get_json()['items']]
+    assert counts == sorted(counts, reverse=True) and len(counts) == 20
+    items = client.get('/api/v1/suggest', query_string={'field': 'major', 'q': '经济'}).get_json()['items']
+    assert items and all(i['name'].startswith('经济') or '经济' in i['name'] for i in items)
+    assert client.get('/api/v1/suggest?field=city&q=x').status_code == 400
+
+
+def test_substring_fills_up(web, ctx):
+    """中文前缀不够 limit 个时，用子串匹配补上（前缀命中的排前面）"""
+    idx = web.year_index()
+    s = web.get_suggester(idx, 'college_name')
+    got = names(s.search('大学', limit=5))
+    assert len(got) == 5 and all('大学' in n for n in got)
+
+
+def test_latency(web, ctx):
+    """单次查找（键表已建好）平均在 1 毫秒以内"""
+    s = web.get_suggester(web.year_index(), 'college_name')
+    queries = ['x', 'xm', 'xmdx', 'fu', 'fuzhou', '厦门', 'b', 'zhongguo'] * 50
+    t0 = time.perf_counter()
+    for q in queries:
+        s.search(q)
+    assert (time.perf_counter() - t0) / len(queries) < 1e-3
@@ -0,0 +1,74 @@
+"""summaries.py：/colleges、/majors 的常驻汇总与按 SQL GROUP BY 现算的结果一致，增删改后打补丁的汇总与整表重建一致"""
+from collections import Counter, defaultdict
+import pytest
+from sqlalchemy import select, func, and_
+
+from admission_index import SUMMARY_SPECS
+from summaries import SummaryTable
+
+
+def sql_summary(web, key):
+    """按名称 GROUP BY 现算：行数、出现最多的代码 / 城市（并列取最小）、最低分、最高分（空则平均分 / 最低分）"""
+    w = web.admissions.wide.c
+    code_field, city_field = SUMMARY_SPECS[key]
+    name, year = w[key], web.year_index().year
+    out = {}
+    with web.db.engine.connect() as conn:
+        high = func.coalesce(func.nullif(w.max_score, 0), func.nullif(w.avg_score, 0), func.nullif(w.min_score, 0))
+        for n, cnt, low, top in conn.execute(
+                select(name, func.count(), func.min(func.nullif(w.min_score, 0)), func.max(high))
+                .where(and_(w.year == year, func.coalesce(name, '') != '')).group_by(name)):
+            out[n] = {'count': cnt, 'min_score': low, 'max_score': top}
+        for field, col in (('code', code_field), ('city', city_field)):
+            tally = defaultdict(Counter)
+            if col:
+                for n, v, cnt in conn.execute(
+                        select(name, func.coalesce(w[col], ''), func.count())
+                        .where(and_(w.year == year, func.coalesce(name, '') != '')).group_by(name, w[col])):
+                    tally[n][v] += cnt
+            for n in out:
+                out[n][field] = min(tally[n].items(), key=lambda kv: (-kv[1], kv[0]))[0] if tally[n] else ''
+    return out
+
+
+def as_dict(table):
+    return {n: {'count': s.count, 'code': s.code, 'city': s.city, 'min_score': s.min_score, 'max_score': s.max_score}
+            for n, s in table.entries.items()}
+
+
+@pytest.mark.parametrize('key', list(SUMMARY_SPECS))
+def test_matches_group_by(web, ctx, key):
+    got = as_dict(web.year_index().summary(key))
+    assert len(got) > 100
+    assert got == sql_summary(web, key)
+
+
+def test_list_sorted_and_filtered(web, ctx):
+    idx = web.year_index()
+    table = idx.summary('college_name')
+    assert [s.name for s in table.list()] == sorted(table.entries)
+    hits = table.list(idx.matching('college_name', '厦门'))
+    assert hits and all('厦门' in s.name for s in hits)
+
+
+@pytest.mark.parametrize('key', list(SUMMARY_SPECS))
+def test_patched_equals_rebuilt(web, admin, add_record, record_form, key):
+    """新增（新名称 / 已有名称）、编辑、删除之后，补丁出来的汇总和整表重建、SQL 现算的都一样"""
+    with web.app.app_context():
+        web.year_index().summary(key)                        # 先建好，后面的改动走补丁
+    add_record()
+    add_record(min_score='580', avg_score='', max_score='')
+    rid = add_record(college_name='厦门大学', major_name='经济学', college_code='0000', city='')
+    assert admin.post(f'/admin/data/edit/{rid}', data={
+        **record_form, 'college_name': '厦门大学', 'college_code': '0000', 'major_name': '经济学',
+        'min_score': '700', 'max_score': '701'}).status_code == 302
+    gone = add_record(college_name='只出现一次的大学', major_name='只出现一次的专业')
+    admin.get(f'/admin/data/del/{gone}')
+    with web.app.app_context():
+        idx = web.year_index()
+        assert key in idx._summaries                         # 是补丁带过来的，不是这里现建的
+        patched = as_dict(idx.summary(key))
+        assert patched == as_dict(SummaryTable.build(idx, key, *SUMMARY_SPECS[key]))
+        assert patched == sql_summary(web, key)
+        assert '只出现一次的大学' not in patched and '只出现一次的专业' not in patched
+    assert patched.get('测试大学', patched.get('测试专业'))['count'] == 2
@@ -0,0 +1,135 @@
+"""upsert.py：按自然键比对、每批一个事务写库、上传任务的登记"""
+import sqlite3
+import pandas as pd
+import pytest
+from sqlalchemy import select
+
+import ingest
+import upsert
+
+YEAR = '2099'
+
+
+def record(code, major, min_score, **kw):
+    row = {'year': YEAR, 'batch': '本科批', 'category': '物理类', 'requirement': '不限', 'college_name': '测试大学',
+           'college_code': code, 'college_info': '', 'major_name': major, 'major_code': major[-2:],
+           'major_info': '', 'min_score': min_score, 'min_rank': 100000 - min_score * 100, 'avg_score': None,
+           'max_score': None, 'tuition': 5000, 'city': '福州'}
+    row.update(kw)
+    return row
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=list(ingest.RECORD_FIELDS))
+
+
+def test_diff_stats():
+    existing = frame([record('9001', '专业01', 600), record('9001', '专业02', 590)])
+    existing.insert(0, 'id', [1, 2])
+    incoming = frame([record('9001', '专业01', 600),                  # 不变
+                      record('9001', '专业02', 580),                  # 改了分数
+                      record('9001', '专业03', 570),                  # 新行
+                      record('9001', '专业03', 575)])                 # 同一自然键重复，留后一行
+    inserts, updates, stats = upsert.diff(existing, incoming)
+    assert stats == {'total': 3, 'inserted': 1, 'updated': 1, 'unchanged': 1, 'duplicates': 1}
+    assert updates['id'].tolist() == [2] and updates['min_score'].tolist() == [580]
+    assert inserts['major_code'].tolist() == ['03'] and inserts['min_score'].tolist() == [575]
+
+
+@pytest.fixture
+def cleanup(web):
+    yield
+    with web.db.engine.begin() as conn:
+        records = web.admissions.records
+        conn.execute(records.delete().where(records.c.year == YEAR))
+        web.admissions.prune(conn)
+
+
+def wide_rows(web):
+    w = web.admissions.wide
+    with web.db.engine.connect() as conn:
+        return conn.execute(select(w.c.major_name, w.c.min_score).where(w.c.year == YEAR)
+                            .order_by(w.c.major_name)).all()
+
+
+def test_apply_commits_each_batch(web, ctx, cleanup):
+    """每批提交后写锁就放掉：另一个连接（timeout=0，不等锁）在批与批之间能拿到写锁；
+    发布之前正式表里看不到任何一行"""
+    inserts = frame([record('9002', f'专业{i:02d}', 500 + i) for i in range(10)])
+    free = []
+
+    def progress(done, total):
+        assert wide_rows(web) == []
+        con = sqlite3.connect(web.DB_FILE, timeout=0)
+        try:
+            con.execute('BEGIN IMMEDIATE')
+            con.rollback()
+            free.append(done)
+        finally:
+            con.close()
+
+    assert upsert.apply(web.db.engine, web.admissions, inserts, inserts.iloc[:0], batch_size=3,
+                        progress=progress) == 10
+    assert free == [3, 6, 9, 10]
+    assert wide_rows(web) == [(f'专业{i:02d}', 500 + i) for i in range(10)]
+
+
+def test_apply_updates_and_prunes(web, ctx, cleanup):
+    upsert.apply(web.db.engine, web.admissions, frame([record('9003', '专业01', 600)]), frame([]))
+    w = web.admissions.wide
+    with web.db.engine.connect() as conn:
+        rid = conn.execute(select(w.c.id).where(w.c.year == YEAR)).scalar()
+    renamed = frame([record('9003', '专业01', 610, college_name='改名大学')])
+    renamed.insert(0, 'id', [rid])
+    upsert.apply(web.db.engine, web.admissions, frame([]), renamed)
+    assert wide_rows(web) == [('专业01', 610)]
+    colleges = web.admissions.colleges
+    with web.db.engine.connect() as conn:
+        names = conn.execute(select(colleges.c.name).where(colleges.c.code == '9003')).scalars().all()
+    assert names == ['改名大学']                        # 旧名字没人引用了，被清掉
+
+
+def test_claim_is_exclusive(tmp_path):
+    path = str(tmp_path / 'upload.json')
+    first = upsert.claim(path, 'a.xlsx')
+    assert first is not None
+    assert upsert.claim(path, 'b.xlsx') is None        # 前一个还在跑
+    assert upsert.current(path)['id'] == first.id
+    first.update(stage='done')
+    second = upsert.claim(path, 'c.xlsx')
+    assert second is not None and second.id != first.id
+
+
+def staging_exists(web):
+    with web.db.engine.connect() as conn:
+        return web.db.inspect(conn).has_table(upsert.staging.name)
+
+
+def test_failed_publish_rolls_back(web, ctx, cleanup, monkeypatch):
+    """发布事务中途出错：插入的行、新建的实体都回滚，暂存表删掉"""
+    def broken(conn):
+        raise RuntimeError('boom')
+    monkeypatch.setattr(web.admissions, 'prune', broken)
+    with pytest.raises(RuntimeError):
+        upsert.apply(web.db.engine, web.admissions, frame([record('9004', '专业01', 600, college_name='回滚大学')]),
+                     frame([]))
+    assert wide_rows(web) == [] and not staging_exists(web)
+    colleges = web.admissions.colleges
+    with web.db.engine.connect() as conn:
+        assert conn.execute(select(colleges.c.id).where(colleges.c.name == '回滚大学')).first() is None
+
+
+def test_failed_upload_does_not_bump(web, ctx, cleanup, tmp_path, monkeypatch):
+    """run_upload 失败：不换版本号，本进程索引还是原来那份"""
+    monkeypatch.setattr(web.ingest, 'read_workbook', lambda path: None)
+    monkeypatch.setattr(web.ingest, 'normalize', lambda raw: frame([record('9005', '专业01', 600)]))
+    monkeypatch.setattr(upsert, 'publish', lambda engine, tables: (_ for _ in ()).throw(RuntimeError('boom')))
+    upload = tmp_path / 'upload.xlsx'
+    upload.write_bytes(b'')
+    job = upsert.UploadJob(str(tmp_path / 'state.json'), 'upload.xlsx')
+    before = web.data_version.get()
+    with pytest.raises(RuntimeError):
+        web.run_upload(job, str(upload))
+    assert web.data_version.get() == before and not upload.exists()
+    assert job.state['stage'] == 'publishing'
+    assert wide_rows(web) == [] and not staging_exists(web)
@@ -0,0 +1,80 @@
+# ==================== 近三年趋势（导入时计算） ====================
+"""
+同一专业（科类 + 院校代码 + 专业代码）跨年份比较，给每个 (年份, 专业) 算：
+
+- trend_years：近三年（含当年）有数据的年数
+- rank_drift：最低位次每年的变化量（最小二乘斜率）；正数表示位次数变大、一年比一年好进
+- score_volatility：近三年最低分的标准差；越大越难预测
+
+整表向量化计算，结果写进 programme_trends 表。导入 / 上传 / 管理员改数据后重算一次，
+请求里只读（AdmissionIndex.with_trends 挂到内存索引上）。
+"""
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+TREND_YEARS   = 3
+PROGRAMME_KEY = ('category', 'college_code', 'major_code')
+COLUMNS       = ('year',) + PROGRAMME_KEY + ('trend_years', 'rank_drift', 'score_volatility')
+
+
+def compute(frame):
+    """frame：year + PROGRAMME_KEY + min_score + min_rank（每年每专业一行，多的取第一行）"""
+    df = frame.copy()
+    df['y'] = pd.to_numeric(df['year'], errors='coerce')
+    df = df.dropna(subset=['y']).drop_duplicates(list(PROGRAMME_KEY) + ['y'])
+    if not len(df):
+        return pd.DataFrame(columns=list(COLUMNS))
+    key = list(PROGRAMME_KEY) + ['y']
+    base = df[key + ['year']].reset_index(drop=True)
+    # 第 k 列是 k 年前的数据：把往年表按 y + k 对齐到当年
+    scores, ranks = [], []
+    for k in range(TREND_YEARS):
+        past = df[key + ['min_score', 'min_rank']].assign(y=df['y'] + k)
+        got = base[key].merge(past, on=key, how='left')
+        scores.append(pd.to_numeric(got['min_score'], errors='coerce').to_numpy(dtype=np.float64))
+        ranks.append(pd.to_numeric(got['min_rank'], errors='coerce').to_numpy(dtype=np.float64))
+    S, R = np.column_stack(scores), np.column_stack(ranks)
+    S[S <= 0] = np.nan
+    R[R <= 0] = np.nan
+    present = ~np.isnan(S) | ~np.isnan(R)
+    ns, nr = np.sum(~np.isnan(S), axis=1), np.sum(~np.isnan(R), axis=1)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 位次斜率：x 为年份偏移（0, -1, -2），只用有位次的点，至少两个点
+        x = np.where(np.isnan(R), np.nan, -np.arange(TREND_YEARS, dtype=np.float64))
+        dx = x - (np.nansum(x, axis=1) / nr)[:, None]
+        dr = R - (np.nansum(R, axis=1) / nr)[:, None]
+        drift = np.where(nr >= 2, np.nansum(dx * dr, axis=1) / np.nansum(dx * dx, axis=1), np.nan)
+        # 最低分标准差，至少两个点
+        ds = S - (np.nansum(S, axis=1) / ns)[:, None]
+        vol = np.where(ns >= 2, np.sqrt(np.nansum(ds * ds, axis=1) / ns), np.nan)
+
+    out = base[['year'] + list(PROGRAMME_KEY)].copy()
+    out['trend_years'] = present.sum(axis=1)
+    out['rank_drift'] = np.round(drift, 1)
+    out['score_volatility'] = np.round(vol, 1)
+    return out
+
+
+def rebuild(engine, records, table):
+    """从 admission_records 整表重算 programme_trends（一个事务），返回行数"""
+    cols = [records.c.year, *(records.c[f] for f in PROGRAMME_KEY), records.c.min_score, records.c.min_rank]
+    with engine.begin() as conn:
+        rows = conn.execute(select(*cols).order_by(records.c.id)).all()
+        frame = pd.DataFrame(rows, columns=['year', *PROGRAMME_KEY, 'min_score', 'min_rank'])
+        for f in ('year',) + PROGRAMME_KEY:
+            frame[f] = frame[f].fillna('')
+        out = compute(frame)
+        conn.execute(table.delete())
+        if len(out):
+            obj = out.astype(object).where(out.notna(), None)
+            conn.execute(table.insert(), [dict(zip(COLUMNS, r)) for r in obj[list(COLUMNS)].itertuples(index=False, name=None)])
+    return len(out)
+
+
+def load(engine, table):
+    """programme_trends 整表（给 AdmissionIndex.with_trends 用）"""
+    with engine.connect() as conn:
+        rows = conn.execute(select(*(table.c[f] for f in COLUMNS))).all()
+    return pd.DataFrame(rows, columns=list(COLUMNS))
@@ -0,0 +1,206 @@
+# ==================== 后台增量导入（按自然键 upsert） ====================
+"""
+管理员上传新一年的专家版 Excel：按自然键（年份、科类、院校代码、专业代码）和库里现有数据比对，
+只插入新行、只更新有变化的行，库里有而表里没有的行保留不动。
+
+- 解析、比对、写库都在收到上传的那个 worker 的后台线程里做，上传请求立即返回进度页；
+  解析和比对（占 CPU，不碰写锁）在写库之前做完
+- 写库分两步：
+  1. stage：要插入 / 更新的行（原样的宽表字段）分批写进暂存表 upload_staging，每批 batch_size 行一个事务。
+     SQLite 的写锁只在一批之内持有，后台改数据最多等一批（远小于 busy_timeout）；正式表一行没动，
+     这期间谁 bump 了版本号、哪个 worker 重建索引，看到的都还是旧数据
+  2. publish：一个事务里用几条 INSERT ... SELECT / UPDATE ... FROM 把暂存表并进正式表
+     （缺的院校 / 专业实体先补上），清掉没人引用的实体，删暂存表。整段是集合运算，写锁只持有很短时间；
+     提交之后才重算派生表、bump 版本号，各 worker 一次性换到新数据
+  任何一步失败：publish 的事务整体回滚，暂存表删掉，不 bump，正式数据和上传前完全一样
+- 同一时间只能有一个任务：claim() 在文件锁里检查并登记，多个 worker 同时收到上传也只有一个登记上
+- 进度写在 DB 旁边的 JSON 文件里（原子替换），哪个 worker 收到进度页请求都能读到
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import pandas as pd
+from sqlalchemy import MetaData, Table, Column, Integer, Text, select, and_, func
+from ingest import RECORD_FIELDS, INT_FIELDS, BATCH_SIZE
+from dataversion import file_lock
+from entities import COLLEGE, MAJOR
+
+NATURAL_KEY = ('year', 'category', 'college_code', 'major_code')
+STALE_AFTER = 120            # 秒；运行中的任务这么久没更新进度，视为已经死掉
+
+STAGES = {'queued': '排队中', 'parsing': '解析表格', 'diffing': '比对数据', 'writing': '写入暂存表',
+          'publishing': '发布新数据', 'done': '完成', 'failed': '失败'}
+
+# 暂存表：target 为要更新的行 id（插入为 NULL），其余是宽表字段；每次导入前重建，发布后删掉
+staging = Table('upload_staging', MetaData(),
+                Column('seq', Integer, primary_key=True),
+                Column('target', Integer),
+                *(Column(f, Integer if f in INT_FIELDS else Text) for f in RECORD_FIELDS))
+
+
+def _normalized(frame):
+    """统一类型以便比较：整数列 Int64，文本列空值 -> ''"""
+    out = frame.copy()
+    for f in RECORD_FIELDS:
+        if f in INT_FIELDS:
+            out[f] = pd.to_numeric(out[f], errors='coerce').astype('Int64')
+        else:
+            out[f] = out[f].astype('string').fillna('')
+    return out
+
+
+def diff(existing, incoming):
+    """existing：库里的行（带 id）；incoming：清洗后的上传表
+    返回 (要插入的表, 要更新的表（带 id）, 统计)"""
+    existing, incoming = _normalized(existing), _normalized(incoming)
+    dup = incoming.duplicated(list(NATURAL_KEY), keep='last')
+    incoming = incoming[~dup]
+    # 库里同一自然键有多行时，只更新 id 最小的那行
+    existing = existing.sort_values('id').drop_duplicates(list(NATURAL_KEY), keep='first')
+    merged = incoming.merge(existing, on=list(NATURAL_KEY), how='left', suffixes=('', '_old'),
+                            indicator=True)
+    new = merged['_merge'] == 'left_only'
+    changed = pd.Series(False, index=merged.index)
+    for f in RECORD_FIELDS:
+        if f in NATURAL_KEY:
+            continue
+        a, b = merged[f], merged[f + '_old']
+        if f in INT_FIELDS:
+            a, b = a.fillna(-1), b.fillna(-1)
+        changed |= (a != b).fillna(True)
+    changed &= ~new
+    inserts = merged.loc[new, list(RECORD_FIELDS)]
+    updates = merged.loc[changed, ['id'] + list(RECORD_FIELDS)].astype({'id': 'int64'})
+    stats = {'total': len(incoming), 'inserted': len(inserts), 'updated': len(updates),
+             'unchanged': int((~new & ~changed).sum()), 'duplicates': int(dup.sum())}
+    return inserts.reset_index(drop=True), updates.reset_index(drop=True), stats
+
+
+def _params(frame):
+    """<NA> -> None 的 executemany 参数"""
+    obj = frame.astype(object).where(frame.notna(), None)
+    return [dict(zip(obj.columns, row)) for row in obj.itertuples(index=False, name=None)]
+
+
+def drop_staging(engine):
+    with engine.begin() as conn:
+        staging.drop(conn, checkfirst=True)
+
+
+def stage(engine, inserts, updates, batch_size=BATCH_SIZE, progress=None):
+    """重建暂存表，先 updates 后 inserts 分批写入，每批一个事务；progress(done, total) 每批回调一次"""
+    total, done = len(inserts) + len(updates), 0
+    with engine.begin() as conn:
+        staging.drop(conn, checkfirst=True)
+        staging.create(conn)
+    for frame in (updates, inserts):
+        for start in range(0, len(frame), batch_size):
+            params = _params(frame.iloc[start:start + batch_size])
+            for p in params:
+                p['target'] = p.pop('id', None)
+            with engine.begin() as conn:
+                conn.execute(staging.insert(), params)
+            done += len(params)
+            if progress:
+                progress(done, total)
+    return done
+
+
+def _entities(tables):
+    return (('college_id', tables.colleges, COLLEGE), ('major_id', tables.majors, MAJOR))
+
+
+def publish(engine, tables):
+    """一个事务里把暂存表并进正式表：补实体 -> 更新 -> 插入 -> 清理实体 -> 删暂存表；失败整体回滚"""
+    s = staging.c
+    joined = staging
+    ids = {}
+    for fk, table, fields in _entities(tables):
+        joined = joined.join(table, and_(*(table.c[attr] == func.ifnull(s[f], '') for f, attr in fields.items())))
+        ids[fk] = table.c.id
+    narrow = [c.name for c in tables.records.c if c.name != 'id']
+    values = [ids[f] if f in ids else s[f] for f in narrow]
+    records = tables.records
+    with engine.begin() as conn:
+        for fk, table, fields in _entities(tables):
+            keys = [func.ifnull(s[f], '') for f in fields]
+            conn.execute(table.insert().prefix_with('OR IGNORE').from_select(
+                list(fields.values()), select(*keys).distinct()))
+        rows = select(s.target, *(v.label(f) for f, v in zip(narrow, values))).select_from(joined).subquery()
+        conn.execute(records.update().where(records.c.id == rows.c.target)
+                     .values({f: rows.c[f] for f in narrow}))
+        conn.execute(records.insert().from_select(
+            narrow, select(*values).select_from(joined).where(s.target.is_(None)).order_by(s.seq)))
+        tables.prune(conn)                  # 更新后不再被引用的旧院校 / 专业取值
+        staging.drop(conn)
+
+
+def apply(engine, tables, inserts, updates, batch_size=BATCH_SIZE, progress=None, on_publish=None):
+    """stage + publish；on_publish() 在开始发布前回调（进度页换阶段用）。任何一步失败都删掉暂存表再抛出"""
+    try:
+        done = stage(engine, inserts, updates, batch_size, progress)
+        if on_publish:
+            on_publish()
+        publish(engine, tables)
+    except BaseException:
+        drop_staging(engine)
+        raise
+    return done
+
+
+class UploadJob:
+    """一次上传任务的进度；每次更新都整份写进 path（JSON）"""
+
+    def __init__(self, path, filename):
+        self.path  = path
+        self.state = {'id': uuid.uuid4().hex[:12], 'file': filename, 'stage': 'queued', 'done': 0,
+                      'total': 0, 'stats': {}, 'error': '', 'started': time.time(), 'updated': time.time()}
+
+    @property
+    def id(self):
+        return self.state['id']
+
+    def update(self, **kw):
+        self.state.update(kw, updated=time.time())
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def start(self, work):
+        """work(job) 在后台线程里跑；抛异常记为失败"""
+        def run():
+            try:
+                work(self)
+            except Exception as e:
+                self.update(stage='failed', error=f'{type(e).__name__}: {e}')
+        self.update()
+        threading.Thread(target=run, name=f'upload-{self.id}', daemon=True).start()
+
+
+def claim(path, filename):
+    """登记一个新任务并返回；已有任务在跑返回 None。检查和登记在同一把文件锁里，不会两个都登记上"""
+    with file_lock(path + '.lock'):
+        if running(path):
+            return None
+        job = UploadJob(path, filename)
+        job.update()
+        return job
+
+
+def current(path):
+    """最近一次任务的进度（没有返回 None）"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def running(path):
+    """是否有还活着的任务在跑"""
+    state = current(path)
+    return bool(state) and state['stage'] not in ('done', 'failed') \
+        and time.time() - state['updated'] < STALE_AFTER